@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_email_alter_user_phone_number'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['ranking'], name='user_stats_ranking_a081fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-tournaments_won', '-total_earnings', '-matches_won', '-win_rate', 'user'], name='user_stats_ranking_order_idx'),
+        ),
+    ]
@@ -97,11 +97,21 @@ class UserStats(models.Model):
         default=0
     )
     ranking = models.PositiveIntegerField('رتبه', default=0)
+
+    # Global leaderboard order (see recalculate_rankings)
+    RANKING_ORDER = ['-tournaments_won', '-total_earnings', '-matches_won', '-win_rate', 'user_id']
     
     class Meta:
         db_table = 'user_stats'
         verbose_name = 'آمار کاربر'
         verbose_name_plural = 'آمار کاربران'
+        indexes = [
+            models.Index(fields=['ranking']),
+            models.Index(
+                fields=['-tournaments_won', '-total_earnings', '-matches_won', '-win_rate', 'user'],
+                name='user_stats_ranking_order_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Stats for {self.user.username}"
@@ -110,4 +120,47 @@ class UserStats(models.Model):
         """Calculate and update win rate"""
         if self.total_matches > 0:
             self.win_rate = (self.matches_won / self.total_matches) * 100
-            self.save(update_fields=['win_rate'])
\ No newline at end of file
+            self.save(update_fields=['win_rate'])
+
+    @classmethod
+    def recalculate_rankings(cls, batch_size: int = 1000) -> int:
+        """
+        Recompute the global ranking of every user
+
+        Ranks come from a single ROW_NUMBER() window query in
+        ``RANKING_ORDER``; only the rows whose rank changed are written,
+        in chunked bulk updates.
+
+        Args:
+            batch_size: Rows per UPDATE statement
+
+        Returns:
+            Number of rankings that changed
+        """
+        from django.db.models import Window
+        from django.db.models.functions import RowNumber
+
+        # Every user gets a place, including the ones without stats yet
+        missing_user_ids = User.objects.filter(stats__isnull=True).values_list('id', flat=True)
+        cls.objects.bulk_create(
+            [cls(user_id=user_id) for user_id in missing_user_ids.iterator()],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+
+        ranks = cls.objects.annotate(
+            new_ranking=Window(RowNumber(), order_by=cls.RANKING_ORDER)
+        ).values_list('id', 'ranking', 'new_ranking')
+
+        changed = [
+            cls(id=stats_id, ranking=new_ranking)
+            for stats_id, ranking, new_ranking in ranks.iterator(chunk_size=batch_size)
+            if ranking != new_ranking
+        ]
+
+        # UPDATE only `ranking` of the fetched rows (a user deleted meanwhile
+        # just matches nothing). One transaction per chunk keeps row locks short.
+        for start in range(0, len(changed), batch_size):
+            cls.objects.bulk_update(changed[start:start + batch_size], ['ranking'])
+
+        return len(changed)
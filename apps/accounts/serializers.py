@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from .models import User
+from .models import User, UserStats
 
 
 class UserBasicSerializer(serializers.ModelSerializer):
@@ -353,4 +353,21 @@ class CompleteRegistrationSerializer(serializers.ModelSerializer):
         # Clear OTP verification cache
         cache.delete(f"otp_verified_{phone_number}")
 
-        return user
\ No newline at end of file
+        return user
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """Serializer for global leaderboard rows"""
+    user_id = serializers.IntegerField(source='user.id', read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    profile_picture = serializers.ImageField(source='user.profile_picture', read_only=True)
+    clash_royale_tag = serializers.CharField(source='user.clash_royale_tag', read_only=True)
+
+    class Meta:
+        model = UserStats
+        fields = [
+            'ranking', 'user_id', 'username', 'profile_picture', 'clash_royale_tag',
+            'tournaments_played', 'tournaments_won', 'total_matches',
+            'matches_won', 'win_rate', 'total_earnings'
+        ]
+        read_only_fields = fields
@@ -1,6 +1,13 @@
+import logging
+
 import requests
 from celery import shared_task
 
+from .models import UserStats
+
+
+logger = logging.getLogger(__name__)
+
 
 @shared_task
 def send_sms_otp(to):
@@ -12,3 +19,20 @@ def send_sms_otp(to):
         json=data,
     )
     return {"response": response.json(), "status_code": response.status_code}
+
+
+@shared_task(bind=True, max_retries=3)
+def update_user_rankings(self):
+    """
+    Recompute the global ranking of all users (UserStats.ranking)
+    Runs daily at 2 AM
+    """
+    try:
+        changed = UserStats.recalculate_rankings()
+
+        logger.info(f"Updated global ranking of {changed} users")
+        return changed
+
+    except Exception as e:
+        logger.error(f"Failed to update user rankings: {str(e)}")
+        raise self.retry(exc=e, countdown=300)
@@ -4,7 +4,7 @@ from .views import (
     RegisterView, LoginView, LogoutView,
     UserProfileView, ChangePasswordView, UserStatsView,
     UpdateProfileView, UploadProfilePictureView, SendOTPView,
-    VerifyOTPAndLoginView, CompleteRegistrationView
+    VerifyOTPAndLoginView, CompleteRegistrationView, GlobalLeaderboardView
 )
 
 app_name = 'accounts'
@@ -29,4 +29,5 @@ urlpatterns = [
     path('profile/picture/', UploadProfilePictureView.as_view(), name='profile_picture'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('stats/', UserStatsView.as_view(), name='stats'),
+    path('leaderboard/', GlobalLeaderboardView.as_view(), name='leaderboard'),
 ]
\ No newline at end of file
@@ -6,12 +6,15 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 
+from .models import UserStats
 from .tasks import send_sms_otp
 from .serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer,
     ChangePasswordSerializer, UserProfileSerializer,
-    UpdateProfileSerializer, CompleteRegistrationSerializer
+    UpdateProfileSerializer, CompleteRegistrationSerializer,
+    LeaderboardEntrySerializer
 )
+from .pagination import LeaderboardPagination
 
 User = get_user_model()
 
@@ -151,6 +154,25 @@ class UserStatsView(APIView):
             'ranking': stats.ranking
         })
 
+
+class GlobalLeaderboardView(generics.ListAPIView):
+    """
+    Global Player Leaderboard
+    GET /api/auth/leaderboard/
+
+    Served from UserStats.ranking, materialized by the daily
+    update_user_rankings task.
+    """
+    serializer_class = LeaderboardEntrySerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = LeaderboardPagination
+
+    def get_queryset(self):
+        return UserStats.objects.filter(
+            ranking__gt=0
+        ).select_related('user').order_by('ranking')
+
+
 class UpdateProfileView(generics.UpdateAPIView):
     """
     Update User Profile
@@ -0,0 +1,193 @@
+"""
+Live events over Server-Sent Events
+Events are published to Redis pub/sub and fanned out to the streams of every ASGI worker
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from typing import Dict, Iterable, List, Optional, Set
+
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+
+CHANNEL_PREFIX = 'live'
+
+
+def tournament_channel(tournament_id: int) -> str:
+    """Public tournament events (ranking updates)"""
+    return f"{CHANNEL_PREFIX}:tournament:{tournament_id}"
+
+
+def tournament_chat_channel(tournament_id: int) -> str:
+    """Tournament chat messages (participants only)"""
+    return f"{CHANNEL_PREFIX}:tournament:{tournament_id}:chat"
+
+
+def user_channel(user_id: int) -> str:
+    """Private events of one user (notifications)"""
+    return f"{CHANNEL_PREFIX}:user:{user_id}"
+
+
+def publish_live_event(channel: str, event: str, data):
+    """
+    Publish an event to every stream subscribed to a channel
+
+    Sent once the current transaction commits, so subscribers never hear
+    about rows they can't read yet. Delivery is best effort: a stream that
+    reconnects should refetch instead of expecting missed events.
+
+    Args:
+        channel: Channel name (see tournament_channel, user_channel...)
+        event: SSE event name
+        data: JSON serializable payload
+    """
+    message = json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+
+    def publish():
+        try:
+            get_redis_connection('default').publish(channel, message)
+        except RedisError as e:
+            logger.warning(f"Failed to publish live event {event} to {channel}: {str(e)}")
+
+    transaction.on_commit(publish)
+
+
+def publish_notification(notification):
+    """Push a notification to its user's live streams"""
+    from .serializers import NotificationListSerializer
+
+    publish_live_event(
+        user_channel(notification.user_id),
+        'notification',
+        NotificationListSerializer(notification).data
+    )
+
+
+class LiveEventHub:
+    """
+    One Redis pub/sub connection shared by all streams of an event loop
+
+    Each stream gets a bounded queue; channels are subscribed while at
+    least one stream listens to them. A stream that falls too far behind
+    is cut off (``overflowed``) and reconnects instead of buffering forever.
+    """
+
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self._redis = aioredis.from_url(settings.CACHES['default']['LOCATION'])
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._queues: Dict[str, Set[asyncio.Queue]] = {}
+        self._lock = asyncio.Lock()
+        self._reader: Optional[asyncio.Task] = None
+
+    async def subscribe(self, channels: Iterable[str]) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        queue.overflowed = False
+
+        async with self._lock:
+            new_channels = []
+            for channel in channels:
+                if channel not in self._queues:
+                    self._queues[channel] = set()
+                    new_channels.append(channel)
+                self._queues[channel].add(queue)
+
+            if new_channels:
+                await self._pubsub.subscribe(*new_channels)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+
+        return queue
+
+    async def unsubscribe(self, queue: asyncio.Queue, channels: Iterable[str]):
+        async with self._lock:
+            unused_channels = []
+            for channel in channels:
+                listeners = self._queues.get(channel)
+                if listeners is None:
+                    continue
+                listeners.discard(queue)
+                if not listeners:
+                    del self._queues[channel]
+                    unused_channels.append(channel)
+
+            if unused_channels:
+                await self._pubsub.unsubscribe(*unused_channels)
+
+    async def _read(self):
+        while self._queues:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except RedisError as e:
+                logger.warning(f"Live event subscription failed: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+
+            if message is None or message['type'] != 'message':
+                continue
+
+            channel = message['channel'].decode()
+            for queue in list(self._queues.get(channel, ())):
+                try:
+                    queue.put_nowait(message['data'])
+                except asyncio.QueueFull:
+                    queue.overflowed = True
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_live_event_hub() -> LiveEventHub:
+    """Get the hub of the running event loop"""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = LiveEventHub()
+    return hub
+
+
+def _format_event(event: str, data: str) -> str:
+    return f"id: {int(time.time() * 1000)}\nevent: {event}\ndata: {data}\n\n"
+
+
+async def stream_live_events(channels: List[str]):
+    """
+    Server-Sent Events stream of the given channels
+
+    Sends a comment every ``LIVE_EVENTS_HEARTBEAT_SECONDS`` to keep proxies
+    from closing the connection, and ends after
+    ``LIVE_EVENTS_MAX_STREAM_SECONDS`` so clients reconnect and spread
+    over the workers again.
+    """
+    hub = get_live_event_hub()
+    queue = await hub.subscribe(channels)
+    heartbeat = settings.LIVE_EVENTS_HEARTBEAT_SECONDS
+    deadline = time.monotonic() + settings.LIVE_EVENTS_MAX_STREAM_SECONDS
+
+    try:
+        yield f"retry: {settings.LIVE_EVENTS_RETRY_MS}\n\n"
+
+        while time.monotonic() < deadline and not queue.overflowed:
+            try:
+                raw = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+
+            message = json.loads(raw)
+            yield _format_event(message['event'], json.dumps(message['data']))
+
+    finally:
+        await hub.unsubscribe(queue, channels)
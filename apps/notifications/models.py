@@ -106,6 +106,7 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read', '-created_at']),
+            models.Index(fields=['user', '-created_at']),
             models.Index(fields=['user', 'notification_type']),
             models.Index(fields=['priority', '-created_at']),
             models.Index(fields=['expires_at']),
@@ -157,6 +158,8 @@ class Notification(models.Model):
     @classmethod
     def bulk_create_notifications(cls, users, notification_type, title, message, **kwargs):
         """Create notifications for multiple users"""
+        from .live import publish_notification
+
         notifications = [
             cls(
                 user=user,
@@ -167,7 +170,12 @@ class Notification(models.Model):
             )
             for user in users
         ]
-        return cls.objects.bulk_create(notifications)
+        notifications = cls.objects.bulk_create(notifications)
+
+        # bulk_create doesn't send post_save
+        for notification in notifications:
+            publish_notification(notification)
+        return notifications
     
     @classmethod
     def delete_expired(cls):
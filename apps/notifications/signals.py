@@ -0,0 +1,17 @@
+"""
+Signals for pushing new notifications to live streams.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .live import publish_notification
+from .models import Notification
+
+
+@receiver(post_save, sender=Notification)
+def publish_new_notification(sender, instance, created, **kwargs):
+    """
+    Push a newly created notification to the user's live streams.
+    """
+    if created:
+        publish_notification(instance)
@@ -1,10 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import NotificationViewSet, NotificationPreferenceViewSet, NotificationTemplateViewSet
+from .views import (
+    NotificationViewSet, NotificationPreferenceViewSet, NotificationTemplateViewSet,
+    live_event_stream
+)
 
 router = DefaultRouter()
 router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'preferences', NotificationPreferenceViewSet, basename='notification-preference')
 router.register(r'templates', NotificationTemplateViewSet, basename='notification-template')
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('stream/', live_event_stream, name='live-event-stream'),
+] + router.urls
@@ -4,8 +4,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
+from django.db import transaction
 from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from apps.tournaments.pagination import HybridCursorPagination
+
+from .live import stream_live_events, tournament_channel, tournament_chat_channel, user_channel
 
 from .models import Notification, NotificationPreference, NotificationTemplate
 from .serializers import (
@@ -23,6 +32,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['notification_type', 'priority', 'is_read']
     ordering_fields = ['created_at', 'priority']
     ordering = ['-created_at']
+    pagination_class = HybridCursorPagination
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -160,3 +170,88 @@ class NotificationTemplateViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['notification_type', 'is_active']
+
+
+def _live_stream_user(request):
+    """
+    Authenticate a live stream request
+
+    EventSource can't send headers, so the JWT access token may also be
+    passed as the ``token`` query parameter.
+    """
+    authentication = JWTAuthentication()
+    raw_token = request.GET.get('token')
+
+    if raw_token is None:
+        header = authentication.get_header(request)
+        if header is None:
+            return None
+        raw_token = authentication.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+    validated_token = authentication.get_validated_token(raw_token)
+    return authentication.get_user(validated_token)
+
+
+def _live_stream_channels(user, tournament_slug):
+    """Channels a live stream subscribes to (None if the tournament doesn't exist)"""
+    from apps.tournaments.models import Tournament
+
+    channels = []
+
+    if user is not None:
+        channels.append(user_channel(user.id))
+
+    if tournament_slug:
+        tournament = Tournament.objects.filter(slug=tournament_slug).only('id').first()
+        if tournament is None:
+            return None
+
+        channels.append(tournament_channel(tournament.id))
+
+        # Chat is only readable by confirmed participants
+        if user is not None and (
+            user.is_staff
+            or tournament.participants.filter(user=user, status='confirmed').exists()
+        ):
+            channels.append(tournament_chat_channel(tournament.id))
+
+    return channels
+
+
+# ATOMIC_REQUESTS can't wrap async views (and a stream must not hold a transaction)
+@transaction.non_atomic_requests
+async def live_event_stream(request):
+    """
+    Server-Sent Events stream of live updates
+
+    Events:
+        ranking       tournament rankings changed (refetch the leaderboard)
+        chat          new tournament chat message (confirmed participants)
+        chat_deleted  tournament chat message deleted
+        notification  new notification of the user
+
+    Query params:
+        tournament: Tournament slug to follow
+        token: JWT access token (alternative to the Authorization header)
+
+    Requires an ASGI server; the stream is not replayed on reconnect, so
+    clients should refetch what they display after reconnecting.
+    """
+    try:
+        user = await sync_to_async(_live_stream_user)(request)
+    except (InvalidToken, TokenError):
+        return JsonResponse({'error': 'توکن نامعتبر است'}, status=401)
+
+    channels = await sync_to_async(_live_stream_channels)(user, request.GET.get('tournament'))
+
+    if channels is None:
+        return JsonResponse({'error': 'تورنمنت یافت نشد'}, status=404)
+    if not channels:
+        return JsonResponse({'error': 'برای دریافت رویدادها وارد شوید یا تورنمنت را مشخص کنید'}, status=400)
+
+    response = StreamingHttpResponse(stream_live_events(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
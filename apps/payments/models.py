@@ -4,7 +4,7 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.db import transaction
 from apps.accounts.models import User
-from apps.tournaments.models import Tournament
+from apps.tournaments.models import Tournament, TournamentParticipant
 import uuid
 
 
@@ -174,6 +174,7 @@ class Payment(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'status', '-created_at']),
+            models.Index(fields=['user', '-created_at']),
             models.Index(fields=['payment_type', 'status']),
             models.Index(fields=['gateway', '-created_at']),
         ]
@@ -267,6 +268,8 @@ class Payment(models.Model):
         self.status = 'failed'
         self.description = f"{self.description}\nFailed: {reason}".strip()
         self.save(update_fields=['status', 'description'])
+
+        self._release_tournament_registration()
         
         # Send notification
         self._send_failure_notification(reason)
@@ -314,6 +317,13 @@ class Payment(models.Model):
         """Retry failed payment"""
         if not self.can_retry:
             return False
+
+        # A failed entry fee gave its tournament place back; the user registers again
+        if self.payment_type == 'tournament_entry' and not TournamentParticipant.objects.filter(
+            payment=self,
+            status='pending'
+        ).exists():
+            return False
         
         self.retry_count += 1
         self.status = 'pending'
@@ -330,8 +340,19 @@ class Payment(models.Model):
         self.status = 'cancelled'
         self.description = f"{self.description}\nCancelled: {reason}".strip()
         self.save(update_fields=['status', 'description'])
+
+        self._release_tournament_registration()
         
         return True
+
+    def _release_tournament_registration(self):
+        """Cancel the pending tournament registration of an entry fee that won't be paid"""
+        if self.payment_type != 'tournament_entry':
+            return
+
+        participant = TournamentParticipant.objects.filter(payment=self, status='pending').first()
+        if participant:
+            participant.cancel_unpaid()
     
     def _send_completion_notification(self):
         """Send payment completion notification"""
@@ -364,11 +385,16 @@ class Payment(models.Model):
     @classmethod
     def expire_old_payments(cls):
         """Expire old pending payments"""
-        return cls.objects.filter(
+        expired = cls.objects.filter(
             status='pending',
             expires_at__lt=timezone.now()
         ).update(status='expired')
 
+        # The update skips signals: give the places of unpaid registrations back
+        TournamentParticipant.cancel_unpaid_registrations()
+
+        return expired
+
 
 class Withdrawal(models.Model):
     """Withdrawal requests from wallet"""
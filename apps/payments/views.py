@@ -7,6 +7,8 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db.models import Q, Sum
 from django.shortcuts import get_object_or_404
 
+from apps.tournaments.pagination import HybridCursorPagination
+
 from .models import Payment, Withdrawal, Transaction, Coupon, CouponUsage, PaymentGatewayConfig
 from .serializers import (
     PaymentSerializer, PaymentListSerializer, PaymentCreateSerializer,
@@ -26,6 +28,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
     search_fields = ['transaction_id', 'gateway_tracking_code', 'user__username']
     ordering_fields = ['created_at', 'amount', 'completed_at']
     ordering = ['-created_at']
+    pagination_class = HybridCursorPagination
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -260,6 +263,7 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['transaction_type', 'user']
     ordering_fields = ['created_at', 'amount']
     ordering = ['-created_at']
+    pagination_class = HybridCursorPagination
 
     def get_queryset(self):
         """Filter queryset based on user"""
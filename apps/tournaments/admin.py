@@ -8,7 +8,7 @@ from django.utils import timezone
 from .models import (
     Tournament, TournamentParticipant,
     TournamentInvitation, PlayerBattleLog,
-    TournamentRanking, TournamentChat
+    TournamentRanking, TournamentRankingSnapshot, TournamentChat
 )
 
 
@@ -43,7 +43,7 @@ class TournamentAdmin(admin.ModelAdmin):
     
     list_filter = (
         'status', 'game_mode', 'pricable',
-        'is_featured', 'created_at',
+        'scoring_profile', 'is_featured', 'created_at',
         'start_date', 'level_cap'
     )
     
@@ -53,7 +53,7 @@ class TournamentAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = (
-        'slug', 'total_participants', 'total_matches',
+        'slug', 'total_participants', 'reserved_slots', 'total_matches',
         'created_at', 'updated_at',
         'banner_preview', 'last_battle_sync_time',
         'tracking_started_at', 'auto_tracking_enabled',
@@ -79,7 +79,8 @@ class TournamentAdmin(admin.ModelAdmin):
                 'best_of',
                 'level_cap',
                 'max_losses',
-                'time_duration'
+                'time_duration',
+                'scoring_profile'
             )
         }),
         ('تنظیمات مالی', {
@@ -114,7 +115,7 @@ class TournamentAdmin(admin.ModelAdmin):
             'description': 'تنظیمات اتصال به تورنمنت Clash Royale'
         }),
         ('تنظیمات اضافی', {
-            'fields': ('is_featured',),
+            'fields': ('is_featured', 'queued_registration'),
             'classes': ('collapse',)
         }),
         ('وضعیت', {
@@ -125,7 +126,7 @@ class TournamentAdmin(admin.ModelAdmin):
         }),
         ('آمار', {
             'fields': (
-                'total_participants', 'total_matches'
+                'total_participants', 'reserved_slots', 'total_matches'
             ),
             'classes': ('collapse',)
         }),
@@ -275,7 +276,18 @@ class TournamentAdmin(admin.ModelAdmin):
         """Auto-set created_by on create"""
         if not change:  # فقط موقع ساخت
             obj.created_by = request.user
-        super().save_model(request, obj, form, change)
+            super().save_model(request, obj, form, change)
+        else:
+            # The participant counters may have moved since the form was loaded
+            obj.save(update_fields=[
+                field.name for field in obj._meta.concrete_fields
+                if not field.primary_key and field.name not in obj.COUNTER_FIELDS
+            ])
+
+        # Existing scores were computed with the old formula
+        if change and {'scoring_profile', 'max_losses'} & set(form.changed_data):
+            from .tasks import request_ranking_update
+            request_ranking_update(obj.id)
     
     def status_badge(self, obj):
         """Display status with color"""
@@ -896,12 +908,12 @@ class TournamentRankingAdmin(admin.ModelAdmin):
 
     def recalculate_rankings(self, request, queryset):
         """Recalculate rankings for selected entries"""
-        from .tasks import calculate_tournament_rankings
+        from .tasks import request_ranking_update
 
         tournaments = set(queryset.values_list('tournament_id', flat=True))
 
         for tournament_id in tournaments:
-            calculate_tournament_rankings.delay(tournament_id)
+            request_ranking_update(tournament_id)
 
         self.message_user(
             request,
@@ -915,6 +927,27 @@ class TournamentRankingAdmin(admin.ModelAdmin):
         return qs.select_related('tournament', 'participant__user')
 
 
+@admin.register(TournamentRankingSnapshot)
+class TournamentRankingSnapshotAdmin(admin.ModelAdmin):
+    """Tournament ranking history snapshots admin (read only)"""
+
+    list_display = ('id', 'tournament', 'is_keyframe', 'participant_count', 'created_at')
+    list_filter = ('is_keyframe', 'created_at')
+    search_fields = ('tournament__title',)
+    readonly_fields = ('tournament', 'is_keyframe', 'data', 'participant_count', 'created_at')
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('tournament')
+
+
 @admin.register(TournamentChat)
 class TournamentChatAdmin(admin.ModelAdmin):
     """Tournament chat messages admin"""
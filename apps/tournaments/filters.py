@@ -75,13 +75,8 @@ class TournamentFilter(django_filters.FilterSet):
     def filter_has_space(self, queryset, name, value):
         """Filter tournaments that have available space"""
         if value:
-            from django.db.models import Count, F
-            queryset = queryset.annotate(
-                confirmed_count=Count(
-                    'participants',
-                    filter=django_filters.Q(participants__status='confirmed')
-                )
-            ).filter(confirmed_count__lt=F('max_participants'))
+            from django.db.models import F
+            queryset = queryset.filter(reserved_slots__lt=F('max_participants'))
         return queryset
     
     def filter_is_active(self, queryset, name, value):
@@ -100,17 +95,13 @@ class TournamentFilter(django_filters.FilterSet):
         """Filter tournaments that are open for registration"""
         if value:
             now = timezone.now()
-            from django.db.models import Count, F
+            from django.db.models import F
             queryset = queryset.filter(
                 status='registration',
                 registration_start__lte=now,
-                registration_end__gte=now
-            ).annotate(
-                confirmed_count=Count(
-                    'participants',
-                    filter=django_filters.Q(participants__status='confirmed')
-                )
-            ).filter(confirmed_count__lt=F('max_participants'))
+                registration_end__gte=now,
+                reserved_slots__lt=F('max_participants')
+            )
         return queryset
 
 
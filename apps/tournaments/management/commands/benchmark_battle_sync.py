@@ -0,0 +1,168 @@
+"""
+Benchmark the battle sync pipeline against the local fake Clash Royale API
+
+Creates synthetic tournaments, runs sync_single_tournament_battles on them
+(Celery eager mode, so chunked chords and ranking updates run inline) and
+reports wall time, API calls, DB queries and rows inserted per pass.
+Requires Redis (rate limiter, locks and poll state live there).
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.tournaments.models import Tournament, TournamentParticipant, PlayerBattleLog
+from apps.tournaments.services import clash_royale_client
+from apps.tournaments.services.fake_api import (
+    FakeClashRoyaleServer,
+    benchmark_player_tag,
+    benchmark_tournament_tag,
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure battle sync throughput on synthetic tournaments using a local fake API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1000], help='Tournament sizes to sync')
+        parser.add_argument('--passes', type=int, default=2, help='Syncs per tournament (later passes are incremental)')
+        parser.add_argument('--latency-ms', type=float, default=50, help='Fake API latency per request')
+        parser.add_argument('--rate-limit-rate', type=float, default=0, help='Share of requests answered with 429 (0-1)')
+        parser.add_argument('--error-rate', type=float, default=0, help='Share of requests answered with 503 (0-1)')
+        parser.add_argument(
+            '--requests-per-second', type=float, default=None,
+            help='Client rate limit (default: CLASH_ROYALE_RATE_LIMIT_PER_SECOND)'
+        )
+        parser.add_argument('--keep-data', action='store_true', help="Don't delete the synthetic tournaments")
+
+    def handle(self, *args, **options):
+        from config.celery import app as celery_app
+
+        server = FakeClashRoyaleServer(
+            ('127.0.0.1', 0),
+            latency_ms=options['latency_ms'],
+            rate_limit_rate=options['rate_limit_rate'],
+            error_rate=options['error_rate'],
+            retry_after=0.2,
+        )
+        server.start_in_thread()
+
+        rate = options['requests_per_second'] or settings.CLASH_ROYALE_RATE_LIMIT_PER_SECOND
+        overrides = override_settings(
+            CLASH_ROYALE_API_URL=server.base_url,
+            CLASH_ROYALE_API_KEYS=['benchmark'],
+            CLASH_ROYALE_RATE_LIMIT_PER_SECOND=rate,
+            CLASH_ROYALE_RATE_LIMIT_BURST=max(int(rate), 1),
+        )
+
+        was_eager = celery_app.conf.task_always_eager
+        previous_client = clash_royale_client._client_instance
+
+        self.stdout.write(
+            f"Fake API at {server.base_url} (latency {options['latency_ms']}ms, "
+            f"429 rate {options['rate_limit_rate']}, error rate {options['error_rate']}), "
+            f"client limit {rate} req/s, chunk size {settings.CLASH_ROYALE_SYNC_CHUNK_SIZE}"
+        )
+        self.stdout.write(
+            f"{'players':>8} {'pass':>5} {'wall (s)':>9} {'API calls':>10} {'429s':>6} "
+            f"{'DB queries':>11} {'rows':>7} {'rows/s':>8}"
+        )
+
+        try:
+            overrides.enable()
+            celery_app.conf.task_always_eager = True
+            clash_royale_client._client_instance = clash_royale_client.ClashRoyaleClient()
+
+            for size in options['sizes']:
+                tournament = self._create_tournament(size)
+                try:
+                    for number in range(1, options['passes'] + 1):
+                        self._run_pass(server, tournament, size, number)
+                finally:
+                    if not options['keep_data']:
+                        self._delete_tournament(tournament, size)
+        finally:
+            clash_royale_client._client_instance = previous_client
+            celery_app.conf.task_always_eager = was_eager
+            overrides.disable()
+            server.shutdown()
+            server.server_close()
+
+    def _run_pass(self, server, tournament, size, number):
+        from apps.tournaments.tasks import sync_single_tournament_battles
+
+        server.reset_stats()
+        rows_before = PlayerBattleLog.objects.filter(tournament=tournament).count()
+
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            started = time.monotonic()
+            sync_single_tournament_battles.delay(tournament.id)
+            elapsed = time.monotonic() - started
+
+        rows = PlayerBattleLog.objects.filter(tournament=tournament).count() - rows_before
+
+        self.stdout.write(
+            f"{size:>8} {number:>5} {elapsed:>9.2f} {server.stats['requests']:>10} "
+            f"{server.stats['429']:>6} {len(queries):>11} {rows:>7} {rows / elapsed if elapsed else 0:>8.0f}"
+        )
+
+    def _create_tournament(self, size):
+        now = timezone.now()
+        tournament_tag = benchmark_tournament_tag(size)
+
+        # Leftovers of an interrupted run
+        self._delete_tournament(None, size)
+        cache.delete(f"cr_tournament_{tournament_tag}")
+
+        tournament = Tournament.objects.create(
+            title=f"Benchmark {size} {now.timestamp():.0f}",
+            description='Battle sync benchmark',
+            max_participants=size,
+            level_cap=11,
+            max_losses=0,
+            entry_fee=0,
+            registration_start=now - timedelta(days=2),
+            registration_end=now - timedelta(days=1),
+            start_date=now - timedelta(days=1),
+            status='ongoing',
+            clash_royale_tournament_tag=tournament_tag,
+            auto_tracking_enabled=True,
+        )
+
+        users = User.objects.bulk_create([
+            User(
+                username=f"benchmark_{size}_{index}",
+                # Synthetic 099 range, unlikely to clash with real numbers
+                phone_number=f"099{size % 10 ** 4:04d}{index:04d}",
+                clash_royale_tag=benchmark_player_tag(size, index),
+            )
+            for index in range(size)
+        ])
+        TournamentParticipant.objects.bulk_create([
+            TournamentParticipant(tournament=tournament, user=user, status='confirmed')
+            for user in users
+        ])
+        # bulk_create skips the signals maintaining the counter
+        Tournament.objects.filter(pk=tournament.pk).update(total_participants=size)
+
+        return tournament
+
+    def _delete_tournament(self, tournament, size):
+        if tournament is not None:
+            tournament.delete()
+        else:
+            Tournament.objects.filter(clash_royale_tournament_tag=benchmark_tournament_tag(size)).delete()
+        User.objects.filter(username__startswith=f"benchmark_{size}_").delete()
@@ -0,0 +1,40 @@
+"""
+Run the local stand-in Clash Royale API
+
+Point CLASH_ROYALE_API_URL at http://<host>:<port>/v1 to sync against it.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.tournaments.services.fake_api import FakeClashRoyaleServer
+
+
+class Command(BaseCommand):
+    help = 'Serve generated Clash Royale API fixtures for local load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=50, help='Delay added to every response')
+        parser.add_argument('--rate-limit-rate', type=float, default=0, help='Share of requests answered with 429 (0-1)')
+        parser.add_argument('--error-rate', type=float, default=0, help='Share of requests answered with 503 (0-1)')
+        parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds sent with 429 responses')
+
+    def handle(self, *args, **options):
+        server = FakeClashRoyaleServer(
+            (options['host'], options['port']),
+            latency_ms=options['latency_ms'],
+            rate_limit_rate=options['rate_limit_rate'],
+            error_rate=options['error_rate'],
+            retry_after=options['retry_after'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Fake Clash Royale API listening on {server.base_url}"))
+        self.stdout.write("Tournament #B<n> has members #B<n>P0 .. #B<n>P<n-1>; request counters at /stats")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,131 @@
+"""
+Stress test tournament registration under a rush of concurrent requests
+
+Creates a free tournament with a small capacity, releases many threads at
+once that all register different users, and checks that exactly
+``capacity`` registrations were admitted and the counters agree with the
+participants. Requires Redis (registration slots live there); use a
+database with row locking (PostgreSQL) for meaningful results.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.tournaments.models import Tournament
+from apps.tournaments.services import RegistrationSlots, register_participant
+
+
+class Command(BaseCommand):
+    help = 'Check that concurrent registrations never oversubscribe a tournament'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--capacity', type=int, default=50, help='Tournament max participants')
+        parser.add_argument('--users', type=int, default=500, help='Users registering at once')
+        parser.add_argument('--threads', type=int, default=50, help='Concurrent registration threads')
+        parser.add_argument('--keep-data', action='store_true', help="Don't delete the synthetic tournament")
+
+    def handle(self, *args, **options):
+        capacity = options['capacity']
+        size = options['users']
+
+        self._delete_data(None)
+        tournament = self._create_tournament(capacity, size)
+        users = list(User.objects.filter(username__startswith='stress_registration_').order_by('id'))
+
+        results = {'admitted': 0, 'rejected': 0, 'errors': 0}
+        results_lock = threading.Lock()
+        barrier = threading.Barrier(min(options['threads'], size))
+
+        def register(user):
+            try:
+                try:
+                    barrier.wait(timeout=5)
+                except threading.BrokenBarrierError:
+                    pass
+
+                try:
+                    register_participant(Tournament.objects.get(pk=tournament.pk), user)
+                    outcome = 'admitted'
+                except ValidationError:
+                    outcome = 'rejected'
+                except Exception as e:
+                    self.stderr.write(f"{user.username}: {e}")
+                    outcome = 'errors'
+
+                with results_lock:
+                    results[outcome] += 1
+            finally:
+                connection.close()
+
+        try:
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                list(executor.map(register, users))
+            elapsed = time.monotonic() - started
+
+            tournament.refresh_from_db()
+            confirmed = tournament.participants.filter(status='confirmed').count()
+
+            self.stdout.write(
+                f"{size} users, {options['threads']} threads, capacity {capacity}: "
+                f"{results['admitted']} admitted, {results['rejected']} rejected, "
+                f"{results['errors']} errors in {elapsed:.2f}s"
+            )
+            self.stdout.write(
+                f"confirmed participants {confirmed}, total_participants {tournament.total_participants}, "
+                f"reserved_slots {tournament.reserved_slots}"
+            )
+
+            expected = min(capacity, size)
+            if not (results['admitted'] == confirmed == tournament.total_participants
+                    == tournament.reserved_slots == expected):
+                raise CommandError(f"Expected exactly {expected} registrations")
+
+            self.stdout.write(self.style.SUCCESS('Capacity held under contention'))
+
+        finally:
+            if not options['keep_data']:
+                self._delete_data(tournament)
+
+    def _create_tournament(self, capacity, size):
+        now = timezone.now()
+
+        tournament = Tournament.objects.create(
+            title=f"Registration stress {now.timestamp():.0f}",
+            description='Registration stress test',
+            max_participants=capacity,
+            level_cap=11,
+            max_losses=0,
+            entry_fee=0,
+            pricable='free',
+            registration_start=now - timedelta(hours=1),
+            registration_end=now + timedelta(hours=1),
+            start_date=now + timedelta(hours=2),
+            status='registration',
+        )
+
+        User.objects.bulk_create([
+            User(
+                username=f"stress_registration_{index}",
+                # Synthetic 0970 range, unlikely to clash with real numbers
+                phone_number=f"0970{index:07d}",
+            )
+            for index in range(size)
+        ])
+
+        return tournament
+
+    def _delete_data(self, tournament):
+        if tournament is not None:
+            slots = RegistrationSlots(tournament.id)
+            tournament.delete()
+            slots.redis.delete(slots.key)
+        User.objects.filter(username__startswith='stress_registration_').delete()
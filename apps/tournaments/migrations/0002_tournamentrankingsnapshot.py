@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TournamentRankingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_keyframe', models.BooleanField(default=False, verbose_name='کامل')),
+                ('data', models.JSONField(default=dict, verbose_name='داده\u200cها')),
+                ('participant_count', models.PositiveIntegerField(default=0, verbose_name='تعداد شرکت\u200cکنندگان')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان ثبت')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_snapshots', to='tournaments.tournament', verbose_name='تورنمنت')),
+            ],
+            options={
+                'verbose_name': 'تصویر رتبه\u200cبندی تورنمنت',
+                'verbose_name_plural': 'تصاویر رتبه\u200cبندی تورنمنت',
+                'db_table': 'tournament_ranking_snapshots',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['tournament', 'created_at'], name='tournament__tournam_ca85df_idx'), models.Index(fields=['tournament', 'is_keyframe', 'created_at'], name='tournament__tournam_40a867_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0002_tournamentrankingsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='scoring_profile',
+            field=models.CharField(choices=[('standard', 'استاندارد (برد ۳، مساوی ۱، هر ۱۰ تاج ۱)'), ('crown_heavy', 'تاج\u200cمحور (هر تاج ۱، برد ۱)'), ('win_only', 'فقط برد'), ('elimination', 'حذفی (امتیاز صفر پس از حداکثر باخت)')], default='standard', help_text='فرمول محاسبه امتیاز رتبه\u200cبندی', max_length=20, verbose_name='روش امتیازدهی'),
+        ),
+    ]
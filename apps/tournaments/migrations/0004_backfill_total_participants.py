@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:10
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_participants(apps, schema_editor):
+    Tournament = apps.get_model('tournaments', 'Tournament')
+    TournamentParticipant = apps.get_model('tournaments', 'TournamentParticipant')
+
+    confirmed = TournamentParticipant.objects.filter(
+        tournament=OuterRef('pk'),
+        status='confirmed'
+    ).order_by().values('tournament').annotate(count=Count('id')).values('count')
+
+    Tournament.objects.update(total_participants=Coalesce(Subquery(confirmed), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0003_tournament_scoring_profile'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_total_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_reserved_slots(apps, schema_editor):
+    Tournament = apps.get_model('tournaments', 'Tournament')
+    TournamentParticipant = apps.get_model('tournaments', 'TournamentParticipant')
+
+    held = TournamentParticipant.objects.filter(
+        tournament=OuterRef('pk'),
+        status__in=['pending', 'confirmed']
+    ).order_by().values('tournament').annotate(count=Count('id')).values('count')
+
+    Tournament.objects.update(reserved_slots=Coalesce(Subquery(held), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0004_backfill_total_participants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='reserved_slots',
+            field=models.PositiveIntegerField(default=0, verbose_name='ظرفیت رزرو شده'),
+        ),
+        migrations.RunPython(backfill_reserved_slots, migrations.RunPython.noop),
+    ]
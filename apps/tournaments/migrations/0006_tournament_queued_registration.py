@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0005_tournament_reserved_slots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='queued_registration',
+            field=models.BooleanField(default=False, help_text='درخواست\u200cهای ثبت\u200cنام در صف قرار می\u200cگیرند و با نرخ ثابت پردازش می\u200cشوند', verbose_name='ثبت\u200cنام صف\u200cبندی شده'),
+        ),
+    ]
@@ -51,6 +51,14 @@ class Tournament(models.Model):
         ('free', 'رایگان'),
         ('premium', 'پرمیوم'),
     ]
+
+    # Keys of apps.tournaments.services.scoring.SCORING_PROFILES
+    SCORING_PROFILE_CHOICES = [
+        ('standard', 'استاندارد (برد ۳، مساوی ۱، هر ۱۰ تاج ۱)'),
+        ('crown_heavy', 'تاج‌محور (هر تاج ۱، برد ۱)'),
+        ('win_only', 'فقط برد'),
+        ('elimination', 'حذفی (امتیاز صفر پس از حداکثر باخت)'),
+    ]
     
     title = models.CharField('عنوان', max_length=200)
     slug = models.SlugField('اسلاگ', max_length=250, unique=True)
@@ -99,6 +107,13 @@ class Tournament(models.Model):
         choices=TIME_DURATION_CHOICES,
         default='1h'
     )
+    scoring_profile = models.CharField(
+        'روش امتیازدهی',
+        max_length=20,
+        choices=SCORING_PROFILE_CHOICES,
+        default='standard',
+        help_text='فرمول محاسبه امتیاز رتبه‌بندی'
+    )
 
     # Financial
     entry_fee = models.DecimalField(
@@ -150,6 +165,11 @@ class Tournament(models.Model):
     
     # Featured
     is_featured = models.BooleanField('ویژه', default=False)
+    queued_registration = models.BooleanField(
+        'ثبت‌نام صف‌بندی شده',
+        default=False,
+        help_text='درخواست‌های ثبت‌نام در صف قرار می‌گیرند و با نرخ ثابت پردازش می‌شوند'
+    )
 
     # Clash Royale Integration
     clash_royale_tournament_tag = models.CharField(
@@ -193,6 +213,8 @@ class Tournament(models.Model):
     )
 
     total_participants = models.PositiveIntegerField('تعداد شرکت‌کننده', default=0)
+    # Places held by pending and confirmed participants
+    reserved_slots = models.PositiveIntegerField('ظرفیت رزرو شده', default=0)
     total_matches = models.PositiveIntegerField('تعداد مسابقات', default=0)
     
     created_at = models.DateTimeField('تاریخ ایجاد', auto_now_add=True, db_index=True)
@@ -223,6 +245,12 @@ class Tournament(models.Model):
             raise ValidationError('تاریخ شروع تورنومنت باید بعد از پایان ثبت‌نام باشد')
 
     
+    # Kept current by F() updates from the participant signals. A loaded
+    # instance may hold stale values, so save other changes of an existing
+    # tournament with update_fields (see TournamentAdmin.save_model) and
+    # fix drifted counters with reconcile_participant_counts.
+    COUNTER_FIELDS = ('total_participants', 'reserved_slots')
+
     def save(self, *args, **kwargs):
         if not self.slug:
             from django.utils.text import slugify
@@ -234,22 +262,83 @@ class Tournament(models.Model):
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
 
+    @classmethod
+    def reconcile_participant_counts(cls):
+        """
+        Correct ``total_participants`` (confirmed participants) and
+        ``reserved_slots`` (participants holding a place, see
+        ``TournamentParticipant.holding_place``) where they drifted, e.g.
+        after queryset updates that skip signals
+
+        Returns:
+            Number of counters corrected
+        """
+        from django.db.models import Count, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+
+        counters = {
+            'total_participants': models.Q(status='confirmed'),
+            'reserved_slots': TournamentParticipant.holding_place(),
+        }
+
+        corrected = 0
+        for field, participants in counters.items():
+            actual = TournamentParticipant.objects.filter(
+                participants,
+                tournament=OuterRef('pk')
+            ).order_by().values('tournament').annotate(count=Count('id')).values('count')
+
+            drifted = cls.objects.annotate(
+                actual=Coalesce(Subquery(actual), 0)
+            ).exclude(**{field: models.F('actual')})
+
+            for tournament_id, stored, count in drifted.values_list('id', field, 'actual'):
+                # Skip counters that moved meanwhile, the next run checks them again
+                corrected += cls.objects.filter(
+                    pk=tournament_id,
+                    **{field: stored}
+                ).update(**{field: count})
+
+        return corrected
+
+    @staticmethod
+    def with_confirmed_count(queryset):
+        """
+        Annotate ``confirmed_count`` so ``current_participants_count``
+        doesn't query per tournament
+        """
+        if 'confirmed_count' in queryset.query.annotations:
+            return queryset
+
+        from django.db.models import Count, Q
+
+        return queryset.annotate(
+            confirmed_count=Count('participants', filter=Q(participants__status='confirmed'))
+        )
+
     @property
     def current_participants_count(self):
-        return self.participants.filter(status='confirmed').count()
+        confirmed_count = getattr(self, 'confirmed_count', None)
+        if confirmed_count is not None:
+            return confirmed_count
+        return self.total_participants
 
     @property
     def is_full(self):
-        return self.current_participants_count >= self.max_participants
+        # Same capacity the registration service enforces
+        return self.reserved_slots >= self.max_participants
 
     @property
-    def can_register(self):
+    def is_registration_open(self):
         now = timezone.now()
         return (
             self.status == 'registration' and
-            self.registration_start <= now <= self.registration_end and
-            not self.is_full
+            self.registration_start <= now <= self.registration_end
         )
+
+    @property
+    def can_register(self):
+        return self.is_registration_open and not self.is_full
     
     @property
     def prize_after_commission(self):
@@ -259,9 +348,11 @@ class Tournament(models.Model):
     
     def calculate_prize_pool(self):
         """Calculate total prize pool from entry fees"""
-        confirmed_count = self.current_participants_count
-        self.prize_pool = confirmed_count * self.entry_fee
-        self.save(update_fields=['prize_pool'])
+        # From the counter in the database, this instance's copy may be stale
+        Tournament.objects.filter(pk=self.pk).update(
+            prize_pool=models.F('total_participants') * models.F('entry_fee')
+        )
+        self.refresh_from_db(fields=['prize_pool', 'total_participants'])
     
     
     @transaction.atomic
@@ -385,6 +476,58 @@ class TournamentParticipant(models.Model):
     
     def clean(self):
         """Validate participant"""
+
+    # Payment statuses that let a pending registration keep its place
+    LIVE_PAYMENT_STATUSES = ('pending', 'processing', 'verifying')
+
+    @classmethod
+    def holding_place(cls):
+        """
+        Filter of the participants that take a place in their tournament:
+        confirmed ones, and pending ones unless their payment failed,
+        expired or was cancelled
+        """
+        return models.Q(status='confirmed') | models.Q(
+            models.Q(payment__isnull=True) | models.Q(payment__status__in=cls.LIVE_PAYMENT_STATUSES),
+            status='pending'
+        )
+
+    @classmethod
+    def cancel_unpaid_registrations(cls):
+        """
+        Cancel pending registrations whose payment failed, expired or was
+        cancelled, giving their places back
+
+        Returns:
+            Number of registrations cancelled
+        """
+        unpaid = cls.objects.filter(
+            status='pending',
+            payment__isnull=False
+        ).exclude(payment__status__in=cls.LIVE_PAYMENT_STATUSES)
+
+        return sum(participant.cancel_unpaid() for participant in unpaid.iterator())
+
+    @transaction.atomic
+    def cancel_unpaid(self):
+        """
+        Cancel a pending registration that won't be paid
+
+        Saved through save() so the signals release the place.
+
+        Returns:
+            True if cancelled, False if it was no longer pending
+        """
+        if not TournamentParticipant.objects.select_for_update().filter(
+            pk=self.pk,
+            status='pending'
+        ).exists():
+            return False
+
+        self.status = 'cancelled'
+        self.save(update_fields=['status'])
+
+        return True
     
     @transaction.atomic
     def confirm_registration(self):
@@ -395,8 +538,7 @@ class TournamentParticipant(models.Model):
         self.status = 'confirmed'
         self.save(update_fields=['status'])
         
-        # Update tournament stats
-        self.tournament.total_participants = self.tournament.current_participants_count
+        # Update tournament stats (total_participants is kept by signals)
         self.tournament.calculate_prize_pool()
         
         # Update user stats
@@ -690,6 +832,53 @@ class PlayerBattleLog(models.Model):
         """Calculate crown difference"""
         return self.player_crowns - self.opponent_crowns
 
+    @classmethod
+    def ingest_battles(cls, battles):
+        """
+        Bulk insert battle logs, silently skipping ones already stored
+
+        Duplicates are dropped by the unique
+        (tournament, player_tag, battle_time, opponent_tag) constraint
+        (``bulk_create(ignore_conflicts=True)``, which can't return ids), so
+        the keys of each batch that weren't stored yet are looked up before
+        the insert and their ids read back after it. Syncs of a tournament
+        never overlap (see ``get_battle_sync_lock``), so those are exactly
+        the rows this call inserted.
+
+        Args:
+            battles: Unsaved PlayerBattleLog instances
+
+        Returns:
+            List of ids of the rows that were actually inserted
+        """
+        key_fields = ('tournament_id', 'player_tag', 'battle_time', 'opponent_tag')
+        batch_size = 500
+
+        inserted_ids = []
+        with transaction.atomic():
+            for start in range(0, len(battles), batch_size):
+                batch = battles[start:start + batch_size]
+                stored = cls.objects.filter(
+                    tournament_id__in={battle.tournament_id for battle in batch},
+                    player_tag__in={battle.player_tag for battle in batch},
+                    battle_time__in={battle.battle_time for battle in batch},
+                )
+
+                new_keys = {
+                    tuple(getattr(battle, field) for field in key_fields)
+                    for battle in batch
+                } - set(stored.values_list(*key_fields))
+                if not new_keys:
+                    continue
+
+                cls.objects.bulk_create(batch, ignore_conflicts=True)
+                inserted_ids.extend(
+                    row[0] for row in stored.values_list('id', *key_fields)
+                    if row[1:] in new_keys
+                )
+
+        return inserted_ids
+
 
 class TournamentRanking(models.Model):
     """Real-time tournament rankings based on battle logs"""
@@ -762,14 +951,13 @@ class TournamentRanking(models.Model):
 
     def calculate_score(self):
         """
-        Calculate score for ranking
-        Formula: (Wins * 3) + (Draws * 1) + (Total Crowns / 10)
+        Calculate score for ranking with the tournament's scoring profile
+        Standard formula: (Wins * 3) + (Draws * 1) + (Total Crowns / 10)
         """
-        win_points = self.total_wins * 3
-        draw_points = self.total_draws * 1
-        crown_bonus = self.total_crowns // 10  # Every 10 crowns = 1 bonus point
+        from apps.tournaments.services.scoring import get_scoring_profile
 
-        self.score = win_points + draw_points + crown_bonus
+        profile = get_scoring_profile(self.tournament.scoring_profile)
+        self.score = profile.score(self, int(self.tournament.max_losses or 0))
         return self.score
 
     def calculate_win_rate(self):
@@ -780,37 +968,95 @@ class TournamentRanking(models.Model):
             self.win_rate = (self.total_wins / self.total_battles) * 100
         return self.win_rate
 
+    @staticmethod
+    def battle_stats_aggregates():
+        """
+        Aggregate expressions computing ranking stats over PlayerBattleLog rows
+
+        Usable with ``aggregate()`` for one participant or with
+        ``values('participant_id').annotate()`` for a whole tournament.
+        """
+        from django.db.models import Count, Max, Q, Sum
+
+        return {
+            'total_battles': Count('id'),
+            'total_wins': Count('id', filter=Q(is_winner=True)),
+            'total_draws': Count('id', filter=Q(is_draw=True)),
+            'total_crowns': Sum('player_crowns'),
+            'total_crowns_lost': Sum('opponent_crowns'),
+            'last_battle_time': Max('battle_time'),
+        }
+
+    def apply_stats(self, stats):
+        """
+        Set statistics from a ``battle_stats_aggregates`` result and derive
+        losses, win rate and score (does not save)
+        """
+        self.total_battles = stats.get('total_battles') or 0
+        self.total_wins = stats.get('total_wins') or 0
+        self.total_draws = stats.get('total_draws') or 0
+        self.total_losses = self.total_battles - self.total_wins - self.total_draws
+        self.total_crowns = stats.get('total_crowns') or 0
+        self.total_crowns_lost = stats.get('total_crowns_lost') or 0
+        self.last_battle_time = stats.get('last_battle_time')
+
+        # Calculate derived stats; the score may already come from the
+        # aggregate query (see services.scoring)
+        self.calculate_win_rate()
+        if stats.get('score') is not None:
+            self.score = stats['score']
+        else:
+            self.calculate_score()
+
     def update_stats(self):
         """Update all statistics from battle logs"""
-        battles = self.participant.battle_logs.filter(
+        stats = self.participant.battle_logs.filter(
             tournament=self.tournament,
             is_counted=True
-        )
+        ).aggregate(**self.battle_stats_aggregates())
 
-        self.total_battles = battles.count()
-        self.total_wins = battles.filter(is_winner=True).count()
-        self.total_draws = battles.filter(is_draw=True).count()
-        self.total_losses = self.total_battles - self.total_wins - self.total_draws
+        self.apply_stats(stats)
 
-        # Calculate crowns
-        from django.db.models import Sum
-        crown_stats = battles.aggregate(
-            total_crowns=Sum('player_crowns'),
-            total_crowns_lost=Sum('opponent_crowns')
-        )
-        self.total_crowns = crown_stats['total_crowns'] or 0
-        self.total_crowns_lost = crown_stats['total_crowns_lost'] or 0
+        self.save()
+        return True
 
-        # Get last battle time
-        last_battle = battles.order_by('-battle_time').first()
-        self.last_battle_time = last_battle.battle_time if last_battle else None
 
-        # Calculate derived stats
-        self.calculate_win_rate()
-        self.calculate_score()
+class TournamentRankingSnapshot(models.Model):
+    """
+    Point-in-time ranking state of a tournament
 
-        self.save()
-        return True
+    Keyframes store the whole leaderboard as parallel arrays in rank order
+    (``{"p": [participant ids], "s": [scores]}``); the snapshots between
+    them only store the rows that changed since the previous snapshot
+    (``{"c": [[participant id, rank, score], ...], "r": [removed ids]}``).
+    """
+
+    tournament = models.ForeignKey(
+        Tournament,
+        on_delete=models.CASCADE,
+        related_name='ranking_snapshots',
+        verbose_name='تورنمنت'
+    )
+
+    is_keyframe = models.BooleanField('کامل', default=False)
+    data = models.JSONField('داده‌ها', default=dict)
+    participant_count = models.PositiveIntegerField('تعداد شرکت‌کنندگان', default=0)
+
+    created_at = models.DateTimeField('زمان ثبت', default=timezone.now)
+
+    class Meta:
+        db_table = 'tournament_ranking_snapshots'
+        verbose_name = 'تصویر رتبه‌بندی تورنمنت'
+        verbose_name_plural = 'تصاویر رتبه‌بندی تورنمنت'
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['tournament', 'created_at']),
+            models.Index(fields=['tournament', 'is_keyframe', 'created_at']),
+        ]
+
+    def __str__(self):
+        kind = 'کامل' if self.is_keyframe else 'تغییرات'
+        return f"{self.tournament.title} - {self.created_at:%Y-%m-%d %H:%M} ({kind})"
 
 
 class TournamentChat(models.Model):
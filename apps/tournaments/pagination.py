@@ -1,4 +1,5 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 from collections import OrderedDict
 
@@ -35,4 +36,73 @@ class ParticipantPagination(PageNumberPagination):
             ('next', self.get_next_link()),
             ('previous', self.get_previous_link()),
             ('results', data)
-        ]))
\ No newline at end of file
+        ]))
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over a fixed ordering"""
+    page_size_query_param = 'page_size'
+
+    def get_ordering(self, request, queryset, view):
+        # Positions are only stable on the indexed ordering, so ?ordering= is ignored
+        return self.ordering
+
+
+class HybridCursorPagination(BasePagination):
+    """
+    Page numbers or keyset (cursor) pagination, chosen per request
+
+    ``?cursor=`` (empty for the first page) switches to cursor pagination:
+    every page is an index range scan from the last row of the previous
+    one, without COUNT(*) or OFFSET, so deep pages cost the same as the
+    first. ``?page=`` keeps page numbers. Without either,
+    ``API_CURSOR_PAGINATION_DEFAULT`` decides.
+    """
+    page_number_class = PageNumberPagination
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 200
+
+    def uses_cursor(self, request):
+        if 'cursor' in request.query_params:
+            return True
+        if 'page' in request.query_params:
+            return False
+        return settings.API_CURSOR_PAGINATION_DEFAULT
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.uses_cursor(request):
+            self.paginator = KeysetPagination()
+            self.paginator.ordering = self.ordering
+            self.paginator.page_size = self.page_size
+            self.paginator.max_page_size = self.max_page_size
+        else:
+            self.paginator = self.page_number_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    @property
+    def display_page_controls(self):
+        paginator = getattr(self, 'paginator', None)
+        return paginator is not None and paginator.display_page_controls
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+
+class ParticipantListPagination(HybridCursorPagination):
+    """Participants, newest registrations first"""
+    page_number_class = ParticipantPagination
+    ordering = ('-joined_at', '-id')
+
+
+class BattleLogPagination(HybridCursorPagination):
+    """Battle logs, latest battles first"""
+    ordering = ('-battle_time', '-id')
+
+
+class ChatPagination(HybridCursorPagination):
+    """Chat messages in the order they were sent"""
+    ordering = ('created_at', 'id')
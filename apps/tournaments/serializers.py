@@ -51,6 +51,7 @@ class TournamentDetailSerializer(serializers.ModelSerializer):
     game_mode_display = serializers.CharField(source='get_game_mode_display', read_only=True)
     pricable_display = serializers.CharField(source='get_pricable_display', read_only=True)
     time_duration_display = serializers.CharField(source='get_time_duration_display', read_only=True)
+    scoring_profile_display = serializers.CharField(source='get_scoring_profile_display', read_only=True)
     current_participants = serializers.IntegerField(source='current_participants_count', read_only=True)
     is_full = serializers.BooleanField(read_only=True)
     can_register = serializers.BooleanField(read_only=True)
@@ -63,10 +64,10 @@ class TournamentDetailSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'description', 'banner', 'game_mode',
             'game_mode_display', 'pricable', 'pricable_display', 'max_participants',
             'current_participants', 'level_cap', 'max_losses', 'time_duration',
-            'time_duration_display', 'entry_fee', 'prize_pool', 'platform_commission',
+            'time_duration_display', 'scoring_profile', 'scoring_profile_display', 'entry_fee', 'prize_pool', 'platform_commission',
             'prize_after_commission', 'registration_start', 'registration_end',
             'start_date', 'end_date', 'status', 'status_display', 'rules',
-            'best_of', 'is_featured', 'created_by', 'total_participants',
+            'best_of', 'is_featured', 'queued_registration', 'created_by', 'total_participants',
             'total_matches', 'is_full', 'can_register', 'created_at', 'updated_at',
             # Clash Royale integration fields
             'clash_royale_tournament_tag', 'tournament_password', 'auto_tracking_enabled',
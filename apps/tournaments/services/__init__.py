@@ -1,3 +1,50 @@
 from .clash_royale_client import ClashRoyaleClient, get_clash_royale_client
+from .battle_sync import BattleCursorStore, ingest_tournament_battles, get_battle_sync_lock
+from .poll_scheduler import PlayerPollScheduler, get_eliminated_participant_ids
+from .membership import TournamentMembershipTracker
+from .rankings import recalculate_tournament_rankings, apply_battle_deltas
+from .leaderboard import LiveLeaderboard, refresh_live_leaderboard
+from .leaderboard_cache import get_ranking_version, bump_ranking_version, leaderboard_payload_key
+from .ranking_queue import RankingUpdateQueue
+from .scoring import ScoringProfile, SCORING_PROFILES, get_scoring_profile
+from .ranking_history import (
+    record_ranking_snapshot,
+    get_ranking_snapshot_delay,
+    claim_trailing_ranking_snapshot,
+    release_trailing_ranking_snapshot,
+    get_ranking_history,
+    prune_ranking_snapshots,
+)
+from .registration import RegistrationSlots, RegistrationQueue, create_pending_participant, register_participant
 
-__all__ = ['ClashRoyaleClient', 'get_clash_royale_client']
+__all__ = [
+    'ClashRoyaleClient',
+    'get_clash_royale_client',
+    'BattleCursorStore',
+    'ingest_tournament_battles',
+    'get_battle_sync_lock',
+    'PlayerPollScheduler',
+    'get_eliminated_participant_ids',
+    'TournamentMembershipTracker',
+    'recalculate_tournament_rankings',
+    'apply_battle_deltas',
+    'LiveLeaderboard',
+    'refresh_live_leaderboard',
+    'get_ranking_version',
+    'bump_ranking_version',
+    'leaderboard_payload_key',
+    'RankingUpdateQueue',
+    'ScoringProfile',
+    'SCORING_PROFILES',
+    'get_scoring_profile',
+    'record_ranking_snapshot',
+    'get_ranking_snapshot_delay',
+    'claim_trailing_ranking_snapshot',
+    'release_trailing_ranking_snapshot',
+    'get_ranking_history',
+    'prune_ranking_snapshots',
+    'RegistrationSlots',
+    'RegistrationQueue',
+    'create_pending_participant',
+    'register_participant',
+]
@@ -0,0 +1,99 @@
+"""
+Clash Royale API key pool
+Spreads requests over several API keys, each with its own rate budget
+"""
+
+import hashlib
+import itertools
+import logging
+import time
+from typing import Iterable, List, Optional
+
+from .rate_limiter import RedisTokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Short, non-reversible identifier of an API key (safe for logs and Redis keys)"""
+    return hashlib.sha256((api_key or '').encode()).hexdigest()[:16]
+
+
+class ApiKeyPool:
+    """
+    Round-robin pool of API keys
+
+    Every key has its own Redis token bucket, so total throughput grows
+    with the number of keys. A quarantined key simply has its bucket
+    blocked, which every worker sees and skips until the block expires.
+    """
+
+    def __init__(self, api_keys: Iterable[str], rate: float, capacity: int):
+        # Drop blanks and duplicates but keep the configured order
+        self.keys: List[str] = list(dict.fromkeys(key for key in api_keys if key)) or ['']
+
+        self.buckets = {
+            key: RedisTokenBucket(
+                name=f"clash_royale:{key_fingerprint(key)}",
+                rate=rate,
+                capacity=capacity,
+            )
+            for key in self.keys
+        }
+
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Wait until some key has a free request token and take it
+
+        Keys are tried round-robin starting after the last key used, so
+        load is spread evenly and quarantined keys are skipped.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            The API key to use, or None if the timeout expired
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            start = next(self._counter)
+            waits = []
+
+            for offset in range(len(self.keys)):
+                key = self.keys[(start + offset) % len(self.keys)]
+                wait = self.buckets[key].try_acquire()
+                if wait <= 0:
+                    return key
+                waits.append(wait)
+
+            # Sleep until the first key frees up
+            wait = min(waits)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+    def quarantine(self, api_key: str, seconds: float, reason: str = ''):
+        """
+        Stop using a key for a while
+
+        Args:
+            api_key: Key to take out of rotation
+            seconds: Quarantine duration
+            reason: Why the key was quarantined (for logs)
+        """
+        self.buckets[api_key].block_for(seconds)
+        logger.warning(
+            f"Clash Royale API key {key_fingerprint(api_key)} quarantined for {seconds}s"
+            + (f": {reason}" if reason else '')
+        )
@@ -0,0 +1,196 @@
+"""
+Battle log sync pipeline
+Turns fetched Clash Royale battle logs into PlayerBattleLog rows
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.tournaments.models import PlayerBattleLog
+from .locks import LeaseLock
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_player_tag(tag: str) -> str:
+    """Normalize a player tag the way PlayerBattleLog stores it (no '#', upper case)"""
+    return tag.replace('#', '').upper()
+
+
+def get_battle_sync_lock(tournament_id: Optional[int] = None, token: Optional[str] = None) -> LeaseLock:
+    """
+    Get the lock guarding battle syncs
+
+    Args:
+        tournament_id: Tournament synced on its own, or None for the
+            deduplicated cross-tournament sync
+        token: Token of a lock acquired by another task
+
+    Returns:
+        LeaseLock instance
+    """
+    scope = f"tournament_{tournament_id}" if tournament_id else 'all'
+    return LeaseLock(f"battle_sync:{scope}", ttl=settings.CLASH_ROYALE_SYNC_LOCK_TTL, token=token)
+
+
+class BattleCursorStore:
+    """
+    Per (tournament, player) high-water mark of ingested battle times
+
+    Cursors live in the cache so steady-state syncs cost a single cache
+    round trip; on a cache miss they are rebuilt from PlayerBattleLog,
+    which stays the durable source of truth.
+    """
+
+    CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+
+    def __init__(self, tournament):
+        self.tournament = tournament
+
+    def _cache_key(self, player_tag: str) -> str:
+        return f"battle_cursor_{self.tournament.id}_{player_tag}"
+
+    def get_many(self, player_tags: Iterable[str]) -> Dict[str, datetime]:
+        """
+        Get the cursor of each player
+
+        Args:
+            player_tags: Normalized player tags
+
+        Returns:
+            Dictionary mapping player tag to the time of its latest ingested
+            battle (tracking start time if none was ingested yet)
+        """
+        player_tags = list(player_tags)
+        keys = {self._cache_key(tag): tag for tag in player_tags}
+        cached = cache.get_many(keys.keys())
+
+        cursors = {keys[key]: value for key, value in cached.items()}
+        missing = [tag for tag in player_tags if tag not in cursors]
+
+        if missing:
+            latest = PlayerBattleLog.objects.filter(
+                tournament=self.tournament,
+                player_tag__in=missing
+            ).values('player_tag').annotate(latest=Max('battle_time'))
+
+            tracking_start = self.tournament.tracking_started_at or self.tournament.start_date
+            rebuilt = {tag: tracking_start for tag in missing}
+            rebuilt.update({row['player_tag']: row['latest'] for row in latest})
+
+            self.set_many(rebuilt)
+            cursors.update(rebuilt)
+
+        return cursors
+
+    def set_many(self, cursors: Dict[str, datetime]):
+        """Store cursors for several players"""
+        if cursors:
+            cache.set_many(
+                {self._cache_key(tag): value for tag, value in cursors.items()},
+                timeout=self.CACHE_TIMEOUT
+            )
+
+
+def ingest_tournament_battles(client, tournament, participants: List, battle_logs: Dict[str, List[Dict]]) -> List[int]:
+    """
+    Extract and store new battles for a tournament's participants
+
+    Only battles newer than each player's cursor are extracted, and cursors
+    are advanced once the batch has been written, never past a battle that
+    failed to extract.
+
+    Args:
+        client: ClashRoyaleClient used to parse battles
+        tournament: Tournament instance
+        participants: Confirmed participants with a Clash Royale tag
+            (``user`` must be loaded)
+        battle_logs: Raw battle logs keyed by the users' Clash Royale tags
+
+    Returns:
+        Ids of the newly inserted PlayerBattleLog rows
+    """
+    tournament_start = tournament.tracking_started_at or tournament.start_date
+    now = timezone.now()
+
+    cursor_store = BattleCursorStore(tournament)
+    cursors = cursor_store.get_many(
+        normalize_player_tag(participant.user.clash_royale_tag) for participant in participants
+    )
+
+    extracted_battles = []
+    advanced_cursors = {}
+
+    for participant in participants:
+        user = participant.user
+        player_tag = normalize_player_tag(user.clash_royale_tag)
+        battles = battle_logs.get(user.clash_royale_tag)
+
+        if not battles:
+            logger.debug(f"No battles found for {user.username}")
+            continue
+
+        cursor: Optional[datetime] = cursors.get(player_tag)
+        latest_seen = cursor
+        # The cursor must stay before a battle that failed to extract, so
+        # it is retried next run (newer ones are stored again harmlessly)
+        first_failure: Optional[datetime] = None
+        handled_times = []
+
+        for battle_raw in battles:
+            battle_time = None
+            try:
+                battle_time = client.parse_battle_time(battle_raw.get('battleTime'))
+
+                # Already ingested (or seen and filtered) on a previous run
+                if cursor and battle_time <= cursor:
+                    continue
+
+                # Ignore battles reported ahead of our clock
+                if battle_time > now:
+                    continue
+
+                # Only process battles during tournament time
+                if battle_time >= tournament_start:
+                    # Extract battle data
+                    battle_data = client.extract_battle_data(battle_raw, user.clash_royale_tag)
+
+                    if battle_data:
+                        extracted_battles.append(PlayerBattleLog(
+                            tournament=tournament,
+                            participant=participant,
+                            **battle_data
+                        ))
+
+                handled_times.append(battle_time)
+
+            except Exception as e:
+                logger.error(f"Failed to process battle for {user.username}: {str(e)}")
+                # A battle without a readable time can't hold the cursor back
+                if battle_time is not None and (first_failure is None or battle_time < first_failure):
+                    first_failure = battle_time
+                continue
+
+        for battle_time in handled_times:
+            if first_failure is not None and battle_time >= first_failure:
+                continue
+            if latest_seen is None or battle_time > latest_seen:
+                latest_seen = battle_time
+
+        if latest_seen and latest_seen != cursor:
+            advanced_cursors[player_tag] = latest_seen
+
+    # Write all battles in one batch; already stored ones are dropped
+    new_battle_ids = PlayerBattleLog.ingest_battles(extracted_battles)
+
+    # Only move cursors forward once the battles are safely stored
+    cursor_store.set_many(advanced_cursors)
+
+    return new_battle_ids
@@ -5,11 +5,15 @@ Handles all interactions with the official Clash Royale API
 
 import requests
 import logging
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
 from datetime import datetime, timezone as dt_timezone
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from django.core.cache import cache
 
+from .api_keys import ApiKeyPool
+
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,11 @@ class ClashRoyaleAPIError(Exception):
     pass
 
 
+class ClashRoyaleRateLimitError(ClashRoyaleAPIError):
+    """Raised when the API keeps throttling us or no request token was available in time"""
+    pass
+
+
 class ClashRoyaleClient:
     """
     Client for interacting with Clash Royale API
@@ -27,18 +36,46 @@ class ClashRoyaleClient:
     """
 
     def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or settings.CLASH_ROYALE_API_KEY
+        # An explicit key overrides the configured pool
+        if api_key:
+            api_keys = [api_key]
+        else:
+            api_keys = settings.CLASH_ROYALE_API_KEYS or [settings.CLASH_ROYALE_API_KEY]
+
         self.base_url = settings.CLASH_ROYALE_API_URL
 
+        self.timeout = settings.CLASH_ROYALE_REQUEST_TIMEOUT
+        self.max_concurrency = settings.CLASH_ROYALE_SYNC_CONCURRENCY
+
+        # Each key gets its own request budget shared by every worker process
+        self.key_pool = ApiKeyPool(
+            api_keys,
+            rate=settings.CLASH_ROYALE_RATE_LIMIT_PER_SECOND,
+            capacity=settings.CLASH_ROYALE_RATE_LIMIT_BURST,
+        )
+        self.api_key = self.key_pool.keys[0]
+
         if not self.api_key:
             logger.warning("Clash Royale API key not configured")
 
         self.session = requests.Session()
         self.session.headers.update({
-            'Authorization': f'Bearer {self.api_key}',
             'Accept': 'application/json',
         })
 
+        # Size the connection pool so concurrent fetches reuse keep-alive
+        # connections instead of opening a new one per request
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(self.max_concurrency, 10),
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.rate_limit_timeout = settings.CLASH_ROYALE_RATE_LIMIT_TIMEOUT
+        self.max_rate_limit_retries = settings.CLASH_ROYALE_RATE_LIMIT_RETRIES
+        self.key_quarantine_seconds = settings.CLASH_ROYALE_API_KEY_QUARANTINE_SECONDS
+
     def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Dict:
         """
         Make a request to the Clash Royale API
@@ -55,17 +92,50 @@ class ClashRoyaleClient:
         """
         url = f"{self.base_url}{endpoint}"
 
-        try:
-            response = self.session.get(url, params=params, timeout=10)
+        for attempt in range(self.max_rate_limit_retries + 1):
+            # Wait for a request token on any key instead of bursting into a ban
+            api_key = self.key_pool.acquire(timeout=self.rate_limit_timeout)
+            if api_key is None:
+                raise ClashRoyaleRateLimitError("Timed out waiting for a rate limit token")
+
+            try:
+                response = self.session.get(
+                    url,
+                    params=params,
+                    headers={'Authorization': f'Bearer {api_key}'},
+                    timeout=self.timeout
+                )
+            except requests.exceptions.Timeout:
+                raise ClashRoyaleAPIError("Request timed out")
+            except requests.exceptions.ConnectionError:
+                raise ClashRoyaleAPIError("Failed to connect to Clash Royale API")
+            except requests.exceptions.RequestException as e:
+                raise ClashRoyaleAPIError(f"Request failed: {str(e)}")
 
             if response.status_code == 200:
                 return response.json()
             elif response.status_code == 404:
                 raise ClashRoyaleAPIError(f"Resource not found: {endpoint}")
             elif response.status_code == 403:
+                # Revoked key or key not whitelisted for this IP; retry on
+                # another key if we have one
+                self.key_pool.quarantine(api_key, self.key_quarantine_seconds, reason='access denied')
+
+                if len(self.key_pool) > 1 and attempt < self.max_rate_limit_retries:
+                    continue
+
                 raise ClashRoyaleAPIError("Invalid API key or access denied")
             elif response.status_code == 429:
-                raise ClashRoyaleAPIError("Rate limit exceeded")
+                retry_after = self.parse_retry_after(response)
+
+                # Pause this key for every worker; the next acquire() picks
+                # another key or waits out the block
+                self.key_pool.quarantine(api_key, retry_after, reason=f'rate limited on {endpoint}')
+
+                if attempt < self.max_rate_limit_retries:
+                    continue
+
+                raise ClashRoyaleRateLimitError("Rate limit exceeded")
             elif response.status_code == 503:
                 raise ClashRoyaleAPIError("Clash Royale API is currently unavailable")
             else:
@@ -73,12 +143,22 @@ class ClashRoyaleClient:
                     f"API request failed with status {response.status_code}: {response.text}"
                 )
 
-        except requests.exceptions.Timeout:
-            raise ClashRoyaleAPIError("Request timed out")
-        except requests.exceptions.ConnectionError:
-            raise ClashRoyaleAPIError("Failed to connect to Clash Royale API")
-        except requests.exceptions.RequestException as e:
-            raise ClashRoyaleAPIError(f"Request failed: {str(e)}")
+    @staticmethod
+    def parse_retry_after(response, default: float = 1.0) -> float:
+        """
+        Read the Retry-After header of a throttled response
+
+        Args:
+            response: HTTP response
+            default: Seconds to use when the header is missing or invalid
+
+        Returns:
+            Seconds to wait before retrying
+        """
+        try:
+            return max(float(response.headers.get('Retry-After', default)), 0.0)
+        except (TypeError, ValueError):
+            return default
 
     @staticmethod
     def normalize_tag(tag: str) -> str:
@@ -151,6 +231,10 @@ class ClashRoyaleClient:
                 logger.debug(f"Using cached battle log for {player_tag}")
                 return cached_data
 
+        return self._fetch_player_battle_log(player_tag) or []
+
+    def _fetch_player_battle_log(self, player_tag: str) -> Optional[List[Dict]]:
+        """Fetch a player's battle log, None if the request failed"""
         try:
             normalized_tag = self.normalize_tag(player_tag)
             endpoint = f"/players/{normalized_tag}/battlelog"
@@ -161,22 +245,63 @@ class ClashRoyaleClient:
 
             # Cache for 1 minute (battle logs change frequently)
             if battles:
-                cache.set(cache_key, battles, timeout=60)
+                cache.set(f"cr_battles_{player_tag}", battles, timeout=60)
 
             logger.info(f"Successfully fetched {len(battles)} battles for {player_tag}")
             return battles
 
         except ClashRoyaleAPIError as e:
             logger.error(f"Failed to get battle log for {player_tag}: {str(e)}")
-            return []
+            return None
+
+    def get_players_battle_logs(
+        self,
+        player_tags: Iterable[str],
+        max_concurrency: Optional[int] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Fetch battle logs for many players concurrently
+
+        Requests are issued from a bounded thread pool sharing this client's
+        pooled session, so at most ``max_concurrency`` calls are in flight.
+
+        Args:
+            player_tags: Player tags to fetch (duplicates are fetched once)
+            max_concurrency: Maximum parallel requests
+                (default: settings.CLASH_ROYALE_SYNC_CONCURRENCY)
+
+        Returns:
+            Dictionary mapping each player tag to its list of battles.
+            Tags whose fetch failed are left out, so callers can tell a
+            failure from a player without new battles.
+        """
+        tags = list(dict.fromkeys(tag for tag in player_tags if tag))
+        if not tags:
+            return {}
+
+        workers = min(max_concurrency or self.max_concurrency, len(tags))
+
+        if workers <= 1:
+            results = map(self._fetch_player_battle_log, tags)
+            return {tag: battles for tag, battles in zip(tags, results) if battles is not None}
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cr-battlelog') as executor:
+            results = executor.map(self._fetch_player_battle_log, tags)
+            return {tag: battles for tag, battles in zip(tags, results) if battles is not None}
 
-    def get_tournament(self, tournament_tag: str, use_cache: bool = True) -> Optional[Dict]:
+    def get_tournament(
+        self,
+        tournament_tag: str,
+        use_cache: bool = True,
+        cache_timeout: int = 120
+    ) -> Optional[Dict]:
         """
         Get tournament information by tag
 
         Args:
             tournament_tag: Tournament tag (e.g., '#ABC123')
             use_cache: Whether to use cached data (default: True)
+            cache_timeout: Seconds to cache the response (default: 2 minutes)
 
         Returns:
             Tournament data dictionary or None if not found
@@ -195,9 +320,8 @@ class ClashRoyaleClient:
 
             data = self._make_request(endpoint)
 
-            # Cache for 2 minutes
             if data:
-                cache.set(cache_key, data, timeout=120)
+                cache.set(cache_key, data, timeout=cache_timeout)
 
             logger.info(f"Successfully fetched tournament data for {tournament_tag}")
             return data
@@ -0,0 +1,244 @@
+"""
+Local stand-in for the Clash Royale API
+Serves generated fixtures so the sync pipeline can be benchmarked offline
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+
+logger = logging.getLogger(__name__)
+
+
+BATTLE_LOG_SIZE = 25  # the real API returns the last 25 battles
+
+
+def benchmark_tournament_tag(size: int) -> str:
+    """Tag of a fake in-game tournament with ``size`` members"""
+    return f"#B{size}"
+
+
+def benchmark_player_tag(size: int, index: int) -> str:
+    """Tag of the ``index``-th member of a fake tournament"""
+    return f"#B{size}P{index}"
+
+
+class FakeClashRoyaleData:
+    """
+    Deterministic fixtures derived from the requested tag
+
+    Every player battles on a fixed period (1-10 minutes, seeded by the
+    tag), so new battles show up as time passes and a player's tournament
+    score moves whenever they play. Tournament ``#B<n>`` has the members
+    ``#B<n>P0`` .. ``#B<n>P<n-1>``.
+    """
+
+    def __init__(self, battle_type: str = 'tournament'):
+        self.battle_type = battle_type
+
+    @staticmethod
+    def _format_time(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc).strftime('%Y%m%dT%H%M%S.000Z')
+
+    @staticmethod
+    def _period(tag: str) -> int:
+        return random.Random(tag).randint(60, 600)
+
+    def _battle_times(self, tag: str, now: float) -> List[int]:
+        period = self._period(tag)
+        offset = random.Random(f"{tag}:offset").randint(0, period - 1)
+        latest = int((now - offset) // period) * period + offset
+        return [latest - i * period for i in range(BATTLE_LOG_SIZE)]
+
+    def battle_log(self, tag: str, now: Optional[float] = None) -> List[Dict]:
+        now = now or time.time()
+        battles = []
+
+        for battle_time in self._battle_times(tag, now):
+            rng = random.Random(f"{tag}:{battle_time}")
+            opponent_tag = f"#OPP{rng.randint(0, 10 ** 6)}"
+            player_crowns, opponent_crowns = rng.randint(0, 3), rng.randint(0, 3)
+
+            battles.append({
+                'type': self.battle_type,
+                'battleTime': self._format_time(battle_time),
+                'gameMode': {'id': 72000006, 'name': 'Tournament'},
+                'arena': {'id': 54000057, 'name': 'Legendary Arena'},
+                'team': [{
+                    'tag': tag,
+                    'name': f"Player {tag}",
+                    'crowns': player_crowns,
+                    'kingTowerHitPoints': rng.randint(0, 5000),
+                    'princessTowersHitPoints': [rng.randint(0, 3000), rng.randint(0, 3000)],
+                    'cards': [{'name': f"Card {i}", 'id': 26000000 + i, 'level': 11} for i in range(8)],
+                }],
+                'opponent': [{
+                    'tag': opponent_tag,
+                    'name': f"Opponent {opponent_tag}",
+                    'crowns': opponent_crowns,
+                    'kingTowerHitPoints': rng.randint(0, 5000),
+                    'princessTowersHitPoints': [rng.randint(0, 3000), rng.randint(0, 3000)],
+                    'cards': [{'name': f"Card {i}", 'id': 26000000 + i, 'level': 11} for i in range(8)],
+                }],
+            })
+
+        return battles
+
+    def player(self, tag: str) -> Dict:
+        rng = random.Random(tag)
+        return {
+            'tag': tag,
+            'name': f"Player {tag}",
+            'expLevel': rng.randint(30, 60),
+            'trophies': rng.randint(5000, 9000),
+        }
+
+    def tournament(self, tag: str, now: Optional[float] = None) -> Optional[Dict]:
+        try:
+            size = int(tag.lstrip('#').lstrip('B'))
+        except ValueError:
+            return None
+
+        now = now or time.time()
+        members = []
+        for index in range(size):
+            player_tag = benchmark_player_tag(size, index)
+            # Score moves every time the player battles
+            members.append({
+                'tag': player_tag,
+                'name': f"Player {player_tag}",
+                'score': int(now // self._period(player_tag)) % 1000,
+            })
+
+        members.sort(key=lambda member: -member['score'])
+        for rank, member in enumerate(members, start=1):
+            member['rank'] = rank
+
+        return {
+            'tag': tag,
+            'name': f"Benchmark {size}",
+            'status': 'inProgress',
+            'capacity': size,
+            'maxCapacity': size,
+            'membersList': members,
+        }
+
+
+class FakeClashRoyaleServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering like the Clash Royale API
+
+    Args:
+        address: (host, port) to listen on (port 0 picks a free port)
+        latency_ms: Delay added to every response
+        rate_limit_rate: Share of requests answered with 429 (0-1)
+        error_rate: Share of requests answered with 503 (0-1)
+        retry_after: Retry-After seconds sent with 429 responses
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=('127.0.0.1', 8765),
+        latency_ms: float = 0,
+        rate_limit_rate: float = 0,
+        error_rate: float = 0,
+        retry_after: float = 1,
+    ):
+        super().__init__(address, FakeClashRoyaleHandler)
+        self.data = FakeClashRoyaleData()
+        self.latency_ms = latency_ms
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats.clear()
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='fake-clash-royale-api', daemon=True)
+        thread.start()
+        return thread
+
+
+class FakeClashRoyaleHandler(BaseHTTPRequestHandler):
+    """Routes /v1/players/{tag}, /v1/players/{tag}/battlelog and /v1/tournaments/{tag}"""
+
+    server: FakeClashRoyaleServer
+
+    def do_GET(self):
+        server = self.server
+        path = unquote(urlparse(self.path).path)
+
+        if path == '/stats':
+            return self._send(200, dict(server.stats))
+
+        server.count('requests')
+
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+
+        if server.rate_limit_rate and random.random() < server.rate_limit_rate:
+            server.count('429')
+            return self._send(429, {'reason': 'requestThrottled'}, {'Retry-After': str(server.retry_after)})
+
+        if server.error_rate and random.random() < server.error_rate:
+            server.count('503')
+            return self._send(503, {'reason': 'inMaintenance'})
+
+        parts = [part for part in path.split('/') if part]
+        if len(parts) < 3 or parts[0] != 'v1':
+            return self._send(404, {'reason': 'notFound'})
+
+        resource, tag = parts[1], parts[2].upper()
+
+        if resource == 'players' and len(parts) == 4 and parts[3] == 'battlelog':
+            server.count('battlelog')
+            return self._send(200, server.data.battle_log(tag))
+
+        if resource == 'players' and len(parts) == 3:
+            server.count('player')
+            return self._send(200, server.data.player(tag))
+
+        if resource == 'tournaments' and len(parts) == 3:
+            server.count('tournament')
+            data = server.data.tournament(tag)
+            if data is not None:
+                return self._send(200, data)
+
+        return self._send(404, {'reason': 'notFound'})
+
+    def _send(self, status: int, payload, headers: Optional[Dict] = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
@@ -0,0 +1,211 @@
+"""
+Live tournament leaderboard
+Rankings mirrored into a Redis sorted set so reads never touch the database
+"""
+
+import json
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from apps.tournaments.models import TournamentRanking
+
+
+logger = logging.getLogger(__name__)
+
+
+class LiveLeaderboard:
+    """
+    Redis-backed leaderboard of one tournament
+
+    The sorted set score packs (score, wins, crowns) into 53 bits so it
+    stays exact as a double. Ties fall back to the member string, which
+    encodes the inverted last battle time and participant id, so that
+    ZREVRANGE order is exactly the TournamentRanking rank order.
+
+    Keys:
+        leaderboard:{id}          ZSET  member -> packed score
+        leaderboard:{id}:rows     HASH  participant id -> serialized ranking
+        leaderboard:{id}:members  HASH  participant id -> current member
+        leaderboard:{id}:users    HASH  user id -> participant id
+    """
+
+    SCORE_BITS = 21
+    WINS_BITS = 16
+    CROWNS_BITS = 16
+
+    MAX_TIMESTAMP_US = 10 ** 16 - 1
+    MAX_PARTICIPANT_ID = 10 ** 10 - 1
+
+    KEY_TIMEOUT = 60 * 60 * 24 * 7  # 1 week
+
+    def __init__(self, tournament_id: int):
+        self.tournament_id = tournament_id
+        self.key = f"leaderboard:{tournament_id}"
+        self.rows_key = f"leaderboard:{tournament_id}:rows"
+        self.members_key = f"leaderboard:{tournament_id}:members"
+        self.users_key = f"leaderboard:{tournament_id}:users"
+
+    @property
+    def redis(self):
+        return get_redis_connection('default')
+
+    @classmethod
+    def pack_score(cls, ranking: TournamentRanking) -> int:
+        """Pack score, wins and crowns (each clamped to its bit width)"""
+        score = min(ranking.score, 2 ** cls.SCORE_BITS - 1)
+        wins = min(ranking.total_wins, 2 ** cls.WINS_BITS - 1)
+        crowns = min(ranking.total_crowns, 2 ** cls.CROWNS_BITS - 1)
+        return (score << (cls.WINS_BITS + cls.CROWNS_BITS)) | (wins << cls.CROWNS_BITS) | crowns
+
+    @classmethod
+    def member_for(cls, ranking: TournamentRanking) -> str:
+        """
+        Sorted set member of a ranking
+
+        Among equal scores ZREVRANGE returns larger members first, so the
+        earliest last battle (largest inverted time) wins the tie, players
+        without battles come last and lower participant ids go first.
+        """
+        if ranking.last_battle_time:
+            inverted_time = cls.MAX_TIMESTAMP_US - int(ranking.last_battle_time.timestamp() * 10 ** 6)
+        else:
+            inverted_time = 0
+        return f"{inverted_time:016d}:{cls.MAX_PARTICIPANT_ID - ranking.participant_id:010d}"
+
+    @classmethod
+    def participant_id_from_member(cls, member) -> int:
+        if isinstance(member, bytes):
+            member = member.decode()
+        return cls.MAX_PARTICIPANT_ID - int(member.split(':')[1])
+
+    def exists(self) -> bool:
+        return bool(self.redis.exists(self.key))
+
+    def count(self) -> int:
+        return self.redis.zcard(self.key)
+
+    def store(self, rankings: List[TournamentRanking], replace: bool = False):
+        """
+        Write rankings to the leaderboard
+
+        Args:
+            rankings: Rankings with ``participant__user`` loaded
+            replace: Drop everything else first (full rebuild)
+        """
+        from apps.tournaments.serializers import TournamentRankingSerializer
+
+        rows = TournamentRankingSerializer(rankings, many=True).data
+        participant_ids = [ranking.participant_id for ranking in rankings]
+
+        previous_members = [] if replace or not rankings else self.redis.hmget(self.members_key, participant_ids)
+
+        members, rows_by_id, users = {}, {}, {}
+        pipe = self.redis.pipeline(transaction=True)
+
+        if replace:
+            pipe.delete(self.key, self.rows_key, self.members_key, self.users_key)
+
+        for index, (ranking, row) in enumerate(zip(rankings, rows)):
+            member = self.member_for(ranking)
+            previous = previous_members[index] if previous_members else None
+            if previous and previous.decode() != member:
+                pipe.zrem(self.key, previous)
+
+            pipe.zadd(self.key, {member: self.pack_score(ranking)})
+
+            # The rank comes from the sorted set position at read time
+            row = dict(row)
+            row.pop('rank', None)
+            rows_by_id[ranking.participant_id] = json.dumps(row, cls=DjangoJSONEncoder)
+            members[ranking.participant_id] = member
+            users[ranking.participant.user_id] = ranking.participant_id
+
+        if rankings:
+            pipe.hset(self.rows_key, mapping=rows_by_id)
+            pipe.hset(self.members_key, mapping=members)
+            pipe.hset(self.users_key, mapping=users)
+        for key in (self.key, self.rows_key, self.members_key, self.users_key):
+            pipe.expire(key, self.KEY_TIMEOUT)
+        pipe.execute()
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Get rankings in leaderboard order
+
+        Args:
+            offset: Number of top rows to skip
+            limit: Maximum rows (None returns the rest of the leaderboard)
+        """
+        end = offset + limit - 1 if limit is not None else -1
+        return self._rows(self.redis.zrevrange(self.key, offset, end), start_rank=offset + 1)
+
+    def around(self, rank: int, radius: int) -> List[Dict]:
+        """Get the rows from ``rank - radius`` to ``rank + radius``"""
+        offset = max(rank - 1 - radius, 0)
+        return self.page(offset, rank - 1 + radius - offset + 1)
+
+    def get_user_row(self, user_id: int) -> Optional[Dict]:
+        """Get a user's row with its current rank (None if not ranked)"""
+        participant_id = self.redis.hget(self.users_key, user_id)
+        if participant_id is None:
+            return None
+
+        member = self.redis.hget(self.members_key, participant_id)
+        if member is None:
+            return None
+
+        position = self.redis.zrevrank(self.key, member)
+        if position is None:
+            return None
+
+        rows = self._rows([member], start_rank=position + 1)
+        return rows[0] if rows else None
+
+    def _rows(self, members, start_rank: int) -> List[Dict]:
+        if not members:
+            return []
+
+        participant_ids = [self.participant_id_from_member(member) for member in members]
+        raw_rows = self.redis.hmget(self.rows_key, participant_ids)
+
+        rows = []
+        for rank, raw in enumerate(raw_rows, start=start_rank):
+            if raw is None:
+                continue
+            row = json.loads(raw)
+            row['rank'] = rank
+            rows.append(row)
+        return rows
+
+
+def refresh_live_leaderboard(tournament_id: int, participant_ids: Optional[Iterable[int]] = None) -> bool:
+    """
+    Push rankings from the database to the live leaderboard
+
+    Args:
+        tournament_id: Tournament ID
+        participant_ids: Only refresh these participants (the whole
+            leaderboard is rebuilt if None or if it doesn't exist yet)
+
+    Returns:
+        True if the leaderboard was updated
+    """
+    leaderboard = LiveLeaderboard(tournament_id)
+
+    try:
+        replace = participant_ids is None or not leaderboard.exists()
+
+        rankings = TournamentRanking.objects.filter(tournament_id=tournament_id).select_related('participant__user')
+        if not replace:
+            rankings = rankings.filter(participant_id__in=list(participant_ids))
+
+        leaderboard.store(list(rankings), replace=replace)
+        return True
+
+    except RedisError as e:
+        logger.warning(f"Failed to update live leaderboard of tournament {tournament_id}: {str(e)}")
+        return False
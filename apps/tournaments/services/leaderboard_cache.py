@@ -0,0 +1,63 @@
+"""
+Versioned leaderboard payloads
+A per-tournament version bumped on every ranking change keys the rendered responses
+"""
+
+import time
+
+from django.core.cache import cache
+
+from apps.notifications.live import publish_live_event, tournament_channel
+
+
+VERSION_TIMEOUT = 60 * 60 * 24 * 7  # 1 week
+
+
+def _version_key(tournament_id: int) -> str:
+    return f"ranking_version_{tournament_id}"
+
+
+def get_ranking_version(tournament_id: int) -> int:
+    """
+    Get the current ranking version of a tournament
+
+    A missing version starts from the current time in microseconds, so it
+    never repeats a version (or ETag) handed out before the key was lost.
+    """
+    key = _version_key(tournament_id)
+    version = cache.get(key)
+
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, timeout=VERSION_TIMEOUT)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_ranking_version(tournament_id: int) -> int:
+    """
+    Invalidate every cached leaderboard payload of a tournament
+
+    Live streams of the tournament get a ``ranking`` event with the new
+    version, which is also the ETag clients refetch with.
+
+    Returns:
+        The new version
+    """
+    try:
+        version = cache.incr(_version_key(tournament_id))
+    except ValueError:
+        # No version yet: a fresh one is already newer than any old one
+        version = get_ranking_version(tournament_id)
+
+    publish_live_event(
+        tournament_channel(tournament_id),
+        'ranking',
+        {'tournament_id': tournament_id, 'version': version}
+    )
+    return version
+
+
+def leaderboard_payload_key(tournament_id: int, version: int, variant: str) -> str:
+    """Cache key of one rendered leaderboard response"""
+    return f"leaderboard_payload_{tournament_id}_{version}_{variant}"
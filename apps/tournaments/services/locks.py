@@ -0,0 +1,183 @@
+"""
+Redis lease locks
+Keep periodic jobs for the same resource from overlapping across workers
+"""
+
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+
+# Only delete / extend the lock if we still own it. Release also takes the
+# pending rerun, but only when we still owned the lock (otherwise it belongs
+# to the new holder): returns 0 if the lock was lost, 1 if released, 2 if
+# released with a rerun requested.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1 + redis.call('DEL', KEYS[2])
+end
+return 0
+"""
+
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LeaseLock:
+    """
+    Expiring lock held by a single worker at a time
+
+    The lease expires after ``ttl`` seconds so a crashed worker never
+    blocks the resource for good. A run that finds the lock taken can ask
+    the holder to run once more when it finishes (``request_rerun``), so
+    any number of overlapping ticks coalesce into at most one extra run.
+
+    Contention counters are kept per lock in ``lock_stats:{name}``.
+    """
+
+    STATS_TIMEOUT = 60 * 60 * 24 * 7  # 1 week
+
+    def __init__(self, name: str, ttl: int, token: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.key = f"lock:{name}"
+        self.rerun_key = f"lock:{name}:rerun"
+        self.stats_key = f"lock_stats:{name}"
+        # Pass the token of an acquired lock to hand it over to another task
+        self.token: Optional[str] = token
+
+    @property
+    def redis(self):
+        return get_redis_connection('default')
+
+    def acquire(self) -> bool:
+        """
+        Try to take the lock without waiting
+
+        Returns:
+            True if the lock was acquired
+        """
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = bool(self.redis.set(self.key, token, nx=True, px=int(self.ttl * 1000)))
+        except RedisError as e:
+            # Overlapping runs are safe (inserts are idempotent), just wasteful
+            logger.warning(f"Lock {self.name} unavailable, running unlocked: {str(e)}")
+            self.token = token
+            return True
+
+        if acquired:
+            self.token = token
+            self._count('acquired')
+        else:
+            self._count('contended', last_contended_at=time.time())
+        return acquired
+
+    def extend(self) -> bool:
+        """
+        Renew the lease for another ``ttl`` seconds
+
+        Returns:
+            False if the lease had already expired and was lost
+        """
+        if self.token is None:
+            return False
+        try:
+            return bool(self.redis.eval(EXTEND_SCRIPT, 1, self.key, self.token, int(self.ttl * 1000)))
+        except RedisError as e:
+            logger.warning(f"Failed to extend lock {self.name}: {str(e)}")
+            return False
+
+    def release(self) -> bool:
+        """
+        Release the lock if we still hold it
+
+        Returns:
+            True if a rerun was requested while the lock was held. A lease
+            lost to another worker leaves the rerun for the new holder.
+        """
+        if self.token is None:
+            return False
+
+        try:
+            result = self.redis.eval(RELEASE_SCRIPT, 2, self.key, self.rerun_key, self.token)
+            if not result:
+                self._count('expired')
+                logger.warning(f"Lock {self.name} expired before release; consider a longer TTL")
+            return result == 2
+        except RedisError as e:
+            logger.warning(f"Failed to release lock {self.name}: {str(e)}")
+            return False
+        finally:
+            self.token = None
+
+    def request_rerun(self) -> bool:
+        """
+        Ask the current holder to run again once it finishes
+
+        Returns:
+            True if this call queued the rerun, False if one was already queued
+        """
+        try:
+            queued = bool(self.redis.set(self.rerun_key, 1, nx=True, px=int(self.ttl * 1000)))
+        except RedisError as e:
+            logger.warning(f"Failed to request rerun for lock {self.name}: {str(e)}")
+            return False
+
+        self._count('coalesced' if queued else 'skipped')
+        return queued
+
+    def _count(self, field: str, **values):
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hincrby(self.stats_key, field, 1)
+            if values:
+                pipe.hset(self.stats_key, mapping=values)
+            pipe.expire(self.stats_key, self.STATS_TIMEOUT)
+            pipe.execute()
+        except RedisError:
+            pass
+
+    def stats(self) -> Dict:
+        """
+        Get lock state and contention counters
+
+        Returns:
+            Dictionary with ``locked``, ``rerun_pending`` and counters
+            (acquired, contended, coalesced, skipped, expired)
+        """
+        try:
+            pipe = self.redis.pipeline()
+            pipe.pttl(self.key)
+            pipe.exists(self.rerun_key)
+            pipe.hgetall(self.stats_key)
+            lock_ttl, rerun_pending, counters = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to read stats for lock {self.name}: {str(e)}")
+            return {}
+
+        counters = {key.decode(): value.decode() for key, value in counters.items()}
+        last_contended_at = counters.pop('last_contended_at', None)
+
+        data = {
+            'locked': lock_ttl > 0,
+            'lock_expires_in': round(lock_ttl / 1000, 1) if lock_ttl > 0 else None,
+            'rerun_pending': bool(rerun_pending),
+            'last_contended_at': float(last_contended_at) if last_contended_at else None,
+        }
+        for field in ('acquired', 'contended', 'coalesced', 'skipped', 'expired'):
+            data[field] = int(counters.get(field, 0))
+        return data
@@ -0,0 +1,122 @@
+"""
+Membership-driven battle sync
+Uses the in-game tournament's member list to skip players with nothing new
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .battle_sync import normalize_player_tag
+
+
+logger = logging.getLogger(__name__)
+
+
+class TournamentMembershipTracker:
+    """
+    Tracks the in-game member list of a tournament between syncs
+
+    One ``/tournaments/{tag}`` call tells us who actually joined the
+    in-game tournament and their current score and rank. Only members
+    whose score or rank moved since their last battle log fetch are
+    fetched again, plus members not fetched for
+    ``CLASH_ROYALE_MEMBERSHIP_REFRESH_SECONDS`` (a loss doesn't change a
+    player's score, so this picks those battles up eventually).
+    """
+
+    CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+
+    def __init__(self, tournament):
+        self.tournament = tournament
+        self.refresh_seconds = settings.CLASH_ROYALE_MEMBERSHIP_REFRESH_SECONDS
+        self._members: Dict[str, Dict] = {}
+
+    def _cache_key(self, player_tag: str) -> str:
+        # One key per player so concurrent chunk syncs never overwrite each other
+        return f"tournament_member_{self.tournament.id}_{player_tag}"
+
+    def select_tags(self, client, participants: List) -> Optional[List[str]]:
+        """
+        Pick the participants whose battle log should be fetched
+
+        Args:
+            client: ClashRoyaleClient
+            participants: Participants with a Clash Royale tag (``user`` loaded)
+
+        Returns:
+            Clash Royale tags to fetch, or None if the member list is
+            unavailable (callers then fall back to polling everyone)
+        """
+        data = client.get_tournament(
+            self.tournament.clash_royale_tournament_tag,
+            cache_timeout=settings.CLASH_ROYALE_TOURNAMENT_CACHE_SECONDS
+        )
+        if not data or 'membersList' not in data:
+            return None
+
+        self._members = {
+            normalize_player_tag(member.get('tag', '')): member
+            for member in data['membersList']
+        }
+        keys = {
+            self._cache_key(normalize_player_tag(participant.user.clash_royale_tag)):
+                normalize_player_tag(participant.user.clash_royale_tag)
+            for participant in participants
+        }
+        fetched = {keys[key]: value for key, value in cache.get_many(keys.keys()).items()}
+        now = time.time()
+
+        selected = []
+        for participant in participants:
+            tag = participant.user.clash_royale_tag
+            player_tag = normalize_player_tag(tag)
+
+            member = self._members.get(player_tag)
+            if member is None:
+                # Registered on our side but never joined in game
+                continue
+
+            previous = fetched.get(player_tag)
+            if (
+                previous is None
+                or previous['score'] != member.get('score')
+                or previous['rank'] != member.get('rank')
+                or now - previous['fetched_at'] >= self.refresh_seconds
+            ):
+                selected.append(tag)
+
+        logger.info(
+            f"Tournament {self.tournament.id}: {len(self._members)} in-game members, "
+            f"fetching {len(selected)} of {len(participants)} participants"
+        )
+        return selected
+
+    def mark_fetched(self, player_tags: Set[str]):
+        """
+        Remember the member state the given players were fetched at
+
+        Args:
+            player_tags: Clash Royale tags whose battle logs were fetched
+        """
+        if not self._members or not player_tags:
+            return
+
+        now = time.time()
+        fetched = {}
+
+        for tag in player_tags:
+            player_tag = normalize_player_tag(tag)
+            member = self._members.get(player_tag)
+            if member is not None:
+                fetched[self._cache_key(player_tag)] = {
+                    'score': member.get('score'),
+                    'rank': member.get('rank'),
+                    'fetched_at': now,
+                }
+
+        if fetched:
+            cache.set_many(fetched, timeout=self.CACHE_TIMEOUT)
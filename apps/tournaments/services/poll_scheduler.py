@@ -0,0 +1,207 @@
+"""
+Adaptive battle log polling
+Decides which players are worth an API call on each sync cycle
+"""
+
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db.models import F
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from apps.tournaments.models import TournamentRanking
+from .battle_sync import normalize_player_tag
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_eliminated_participant_ids(tournament_ids: Iterable[int]) -> Set[int]:
+    """
+    Get participants who reached their tournament's loss limit
+
+    Args:
+        tournament_ids: Tournament IDs
+
+    Returns:
+        Set of TournamentParticipant IDs
+    """
+    return set(
+        TournamentRanking.objects.filter(
+            tournament_id__in=list(tournament_ids),
+            tournament__max_losses__gt=0,
+            total_losses__gte=F('tournament__max_losses')
+        ).values_list('participant_id', flat=True)
+    )
+
+
+class PlayerPollScheduler:
+    """
+    Per-player poll schedule kept in Redis
+
+    Players who battled recently are polled every ``min_interval`` seconds.
+    Every poll that brings nothing new doubles the player's interval up to
+    ``max_interval``; eliminated players go straight to ``max_interval``.
+    A global budget caps the number of polls handed out per cycle, most
+    overdue players first.
+
+    Keys (``namespace`` separates independent schedules):
+        battle_poll:{namespace}:due     ZSET  tag -> next poll (epoch seconds)
+        battle_poll:{namespace}:latest  HASH  tag -> newest battle seen (epoch seconds)
+        battle_poll:{namespace}:idle    HASH  tag -> consecutive empty polls
+        battle_poll:budget:{cycle}      INT   polls handed out in the cycle
+    """
+
+    STATE_TIMEOUT = 60 * 60 * 24  # 1 day
+
+    def __init__(self, namespace: str = 'all'):
+        self.namespace = namespace
+        self.min_interval = settings.CLASH_ROYALE_POLL_MIN_INTERVAL
+        self.max_interval = settings.CLASH_ROYALE_POLL_MAX_INTERVAL
+        self.active_window = settings.CLASH_ROYALE_POLL_ACTIVE_WINDOW
+        self.cycle_seconds = settings.CLASH_ROYALE_POLL_CYCLE_SECONDS
+        self.budget_per_cycle = settings.CLASH_ROYALE_POLL_BUDGET_PER_CYCLE
+
+        self.due_key = f"battle_poll:{namespace}:due"
+        self.latest_key = f"battle_poll:{namespace}:latest"
+        self.idle_key = f"battle_poll:{namespace}:idle"
+
+    @property
+    def redis(self):
+        return get_redis_connection('default')
+
+    def claim_due(self, player_tags: Iterable[str]) -> List[str]:
+        """
+        Pick the players that should be polled now
+
+        Claimed players are pushed back by ``min_interval`` right away so a
+        concurrent sync doesn't poll them too; ``record_polls`` then sets
+        their real next poll time.
+
+        Args:
+            player_tags: Candidate player tags
+
+        Returns:
+            Tags to poll, most overdue first, limited by the cycle budget
+        """
+        tags = list(dict.fromkeys(tag for tag in player_tags if tag))
+        if not tags:
+            return []
+
+        now = time.time()
+
+        try:
+            due_at = self.redis.zmscore(self.due_key, [normalize_player_tag(tag) for tag in tags])
+
+            # Players never polled before are due immediately
+            due = sorted(
+                (score or 0, tag) for tag, score in zip(tags, due_at)
+                if score is None or score <= now
+            )
+            if not due:
+                return []
+
+            claimed = [tag for _, tag in due[:self._take_budget(len(due), now)]]
+            if claimed:
+                self.redis.zadd(
+                    self.due_key,
+                    {normalize_player_tag(tag): now + self.min_interval for tag in claimed}
+                )
+            return claimed
+
+        except RedisError as e:
+            # Polling everyone is better than polling no one
+            logger.warning(f"Poll scheduler unavailable, polling all players: {str(e)}")
+            return tags
+
+    def _take_budget(self, wanted: int, now: float) -> int:
+        """Reserve up to ``wanted`` polls from the current cycle's budget"""
+        budget_key = f"battle_poll:budget:{int(now // self.cycle_seconds)}"
+
+        pipe = self.redis.pipeline()
+        pipe.incrby(budget_key, wanted)
+        pipe.expire(budget_key, self.cycle_seconds * 2)
+        used = pipe.execute()[0]
+
+        granted = max(0, min(wanted, self.budget_per_cycle - (used - wanted)))
+        if granted < wanted:
+            logger.info(f"Poll budget exhausted, deferring {wanted - granted} players to the next cycle")
+        return granted
+
+    def record_polls(
+        self,
+        client,
+        battle_logs: Dict[str, List[Dict]],
+        eliminated_tags: Optional[Set[str]] = None
+    ):
+        """
+        Schedule the next poll of each player from what the last one found
+
+        Args:
+            client: ClashRoyaleClient used to parse battle times
+            battle_logs: Fetched battle logs keyed by player tag
+            eliminated_tags: Tags of players who can no longer score
+        """
+        if not battle_logs:
+            return
+
+        eliminated = {normalize_player_tag(tag) for tag in (eliminated_tags or ())}
+        now = time.time()
+        tags = [normalize_player_tag(tag) for tag in battle_logs]
+
+        try:
+            previous_latest = self.redis.hmget(self.latest_key, tags)
+            previous_idle = self.redis.hmget(self.idle_key, tags)
+
+            next_due, latest, idle = {}, {}, {}
+
+            for (raw_tag, battles), tag, prev_latest, prev_idle in zip(
+                battle_logs.items(), tags, previous_latest, previous_idle
+            ):
+                prev_latest = float(prev_latest) if prev_latest else None
+                newest = self._newest_battle_time(client, battles) or prev_latest
+
+                if newest is not None and (prev_latest is None or newest > prev_latest):
+                    idle_polls = 0
+                else:
+                    idle_polls = int(prev_idle or 0) + 1
+
+                if tag in eliminated:
+                    interval = self.max_interval
+                elif newest is not None and now - newest <= self.active_window:
+                    interval = self.min_interval
+                else:
+                    interval = min(self.min_interval * 2 ** idle_polls, self.max_interval)
+
+                next_due[tag] = now + interval
+                idle[tag] = idle_polls
+                if newest is not None:
+                    latest[tag] = newest
+
+            pipe = self.redis.pipeline()
+            pipe.zadd(self.due_key, next_due)
+            pipe.hset(self.idle_key, mapping=idle)
+            if latest:
+                pipe.hset(self.latest_key, mapping=latest)
+            for key in (self.due_key, self.idle_key, self.latest_key):
+                pipe.expire(key, self.STATE_TIMEOUT)
+            pipe.execute()
+
+        except RedisError as e:
+            logger.warning(f"Failed to update poll schedule: {str(e)}")
+
+    @staticmethod
+    def _newest_battle_time(client, battles: List[Dict]) -> Optional[float]:
+        """Epoch time of the most recent battle in a log"""
+        newest = None
+        for battle in battles:
+            try:
+                battle_time = client.parse_battle_time(battle.get('battleTime')).timestamp()
+            except Exception:
+                continue
+            if newest is None or battle_time > newest:
+                newest = battle_time
+        return newest
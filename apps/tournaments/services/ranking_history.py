@@ -0,0 +1,249 @@
+"""
+Tournament ranking history
+Compact ranking snapshots written by the ranking job and replayed into time series
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.tournaments.models import TournamentRanking, TournamentRankingSnapshot
+
+
+def _state_cache_key(tournament_id: int) -> str:
+    return f"ranking_snapshot_state_{tournament_id}"
+
+
+def _trailing_cache_key(tournament_id: int) -> str:
+    return f"ranking_snapshot_trailing_{tournament_id}"
+
+
+def record_ranking_snapshot(tournament_id: int, force: bool = False) -> Optional[TournamentRankingSnapshot]:
+    """
+    Snapshot the current rankings of a tournament
+
+    At most one snapshot is written per ``TOURNAMENT_RANKING_SNAPSHOT_INTERVAL``
+    seconds; callers schedule a trailing snapshot for the end of the
+    interval (see ``get_ranking_snapshot_delay``) so the last change of a
+    burst is still recorded. Snapshots only hold the rows that changed since the previous
+    one; every ``TOURNAMENT_RANKING_SNAPSHOT_KEYFRAME_EVERY`` snapshots (or
+    when the previous state is no longer cached) a full keyframe is written.
+    Callers must not run concurrently for the same tournament.
+
+    Args:
+        tournament_id: Tournament ID
+        force: Ignore the snapshot interval
+
+    Returns:
+        The new snapshot, or None if nothing was written
+    """
+    cache_key = _state_cache_key(tournament_id)
+    previous = cache.get(cache_key)
+    now = timezone.now()
+
+    if (
+        previous is not None
+        and not force
+        and (now - previous['at']).total_seconds() < settings.TOURNAMENT_RANKING_SNAPSHOT_INTERVAL
+    ):
+        return None
+
+    rows = list(
+        TournamentRanking.objects.filter(
+            tournament_id=tournament_id
+        ).order_by('rank', 'participant_id').values_list('participant_id', 'rank', 'score')
+    )
+    state = {participant_id: (rank, score) for participant_id, rank, score in rows}
+
+    keyframe = (
+        previous is None
+        or previous['since_keyframe'] + 1 >= settings.TOURNAMENT_RANKING_SNAPSHOT_KEYFRAME_EVERY
+    )
+
+    if keyframe:
+        data = {
+            'p': [participant_id for participant_id, _, _ in rows],
+            's': [score for _, _, score in rows],
+        }
+        since_keyframe = 0
+    else:
+        previous_state = previous['state']
+        changed = [
+            [participant_id, rank, score]
+            for participant_id, (rank, score) in state.items()
+            if previous_state.get(participant_id) != (rank, score)
+        ]
+        removed = [participant_id for participant_id in previous_state if participant_id not in state]
+
+        if not changed and not removed:
+            return None
+
+        data = {'c': changed}
+        if removed:
+            data['r'] = removed
+        since_keyframe = previous['since_keyframe'] + 1
+
+    snapshot = TournamentRankingSnapshot.objects.create(
+        tournament_id=tournament_id,
+        is_keyframe=keyframe,
+        data=data,
+        participant_count=len(rows),
+        created_at=now,
+    )
+
+    cache.set(
+        cache_key,
+        {'state': state, 'since_keyframe': since_keyframe, 'at': now},
+        timeout=60 * 60 * 24
+    )
+    return snapshot
+
+
+def get_ranking_snapshot_delay(tournament_id: int) -> float:
+    """Seconds until the snapshot interval allows the next snapshot (0 if it does now)"""
+    previous = cache.get(_state_cache_key(tournament_id))
+    if previous is None:
+        return 0
+
+    elapsed = (timezone.now() - previous['at']).total_seconds()
+    return max(settings.TOURNAMENT_RANKING_SNAPSHOT_INTERVAL - elapsed, 0)
+
+
+def claim_trailing_ranking_snapshot(tournament_id: int, delay: float) -> bool:
+    """
+    Mark a trailing snapshot as scheduled
+
+    Returns:
+        True if the caller should schedule it, False if one already is
+    """
+    return cache.add(_trailing_cache_key(tournament_id), 1, timeout=int(delay) + 60)
+
+
+def release_trailing_ranking_snapshot(tournament_id: int):
+    """Clear the trailing snapshot mark once it runs"""
+    cache.delete(_trailing_cache_key(tournament_id))
+
+
+def get_ranking_history(
+    tournament_id: int,
+    participant_ids: Iterable[int],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Dict:
+    """
+    Replay snapshots into per-participant rank and score series
+
+    Args:
+        tournament_id: Tournament ID
+        participant_ids: Participants to return series for
+        since: Start of the period (default: first snapshot)
+        until: End of the period (default: now)
+
+    Returns:
+        Dictionary with ``series`` (participant id -> points, a point is
+        only emitted when rank or score changed) and ``leader_changes``
+        (time and participant id of every change of the first place)
+    """
+    participant_ids = set(participant_ids)
+    snapshots = TournamentRankingSnapshot.objects.filter(tournament_id=tournament_id)
+
+    # Start from the last keyframe before the period so the state is complete
+    keyframes = snapshots.filter(is_keyframe=True)
+    base = None
+    if since is not None:
+        base = keyframes.filter(created_at__lte=since).order_by('-created_at', '-id').first()
+    if base is None:
+        base = keyframes.order_by('created_at', 'id').first()
+    if base is None:
+        return {'series': {participant_id: [] for participant_id in participant_ids}, 'leader_changes': []}
+
+    snapshots = snapshots.filter(created_at__gte=base.created_at)
+    if until is not None:
+        snapshots = snapshots.filter(created_at__lte=until)
+
+    series: Dict[int, List[Dict]] = {participant_id: [] for participant_id in participant_ids}
+    leader_changes = []
+    state: Dict[int, tuple] = {}
+    leader = None
+
+    for snapshot in snapshots.order_by('created_at', 'id').iterator():
+        data = snapshot.data
+
+        if snapshot.is_keyframe:
+            state = {
+                participant_id: (rank, score)
+                for rank, (participant_id, score) in enumerate(zip(data['p'], data['s']), start=1)
+            }
+            new_leader = data['p'][0] if data['p'] else None
+        else:
+            new_leader = leader
+            for participant_id, rank, score in data.get('c', []):
+                state[participant_id] = (rank, score)
+                if rank == 1:
+                    new_leader = participant_id
+            for participant_id in data.get('r', []):
+                state.pop(participant_id, None)
+
+        if since is not None and snapshot.created_at < since:
+            leader = new_leader
+            continue
+
+        if new_leader != leader:
+            leader_changes.append({'time': snapshot.created_at, 'participant_id': new_leader})
+            leader = new_leader
+
+        for participant_id, points in series.items():
+            current = state.get(participant_id)
+            if current is None:
+                continue
+            if points and (points[-1]['rank'], points[-1]['score']) == current:
+                continue
+            points.append({'time': snapshot.created_at, 'rank': current[0], 'score': current[1]})
+
+    return {'series': series, 'leader_changes': leader_changes}
+
+
+def prune_ranking_snapshots(tournament_id: Optional[int] = None) -> int:
+    """
+    Delete snapshots older than ``TOURNAMENT_RANKING_SNAPSHOT_RETENTION_DAYS``
+
+    The last keyframe before the cutoff is kept so the remaining deltas
+    can still be replayed.
+
+    Args:
+        tournament_id: Only prune this tournament (default: all)
+
+    Returns:
+        Number of snapshots deleted
+    """
+    retention_days = settings.TOURNAMENT_RANKING_SNAPSHOT_RETENTION_DAYS
+    if not retention_days:
+        return 0
+
+    cutoff = timezone.now() - timedelta(days=retention_days)
+
+    old_snapshots = TournamentRankingSnapshot.objects.filter(created_at__lt=cutoff)
+    if tournament_id is not None:
+        old_snapshots = old_snapshots.filter(tournament_id=tournament_id)
+
+    deleted = 0
+    for snapshot_tournament_id in old_snapshots.order_by().values_list('tournament_id', flat=True).distinct():
+        base = TournamentRankingSnapshot.objects.filter(
+            tournament_id=snapshot_tournament_id,
+            is_keyframe=True,
+            created_at__lte=cutoff
+        ).order_by('-created_at', '-id').first()
+
+        if base is None:
+            continue
+
+        count, _ = TournamentRankingSnapshot.objects.filter(
+            tournament_id=snapshot_tournament_id,
+            created_at__lt=base.created_at
+        ).delete()
+        deleted += count
+
+    return deleted
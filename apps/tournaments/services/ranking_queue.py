@@ -0,0 +1,130 @@
+"""
+Coalesced ranking updates
+Collapses repeated ranking update requests for a tournament into one run
+"""
+
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .locks import LeaseLock
+
+
+logger = logging.getLogger(__name__)
+
+
+# Remove the queued battle ids up to ARGV[1]
+DISCARD_BATTLES_SCRIPT = """
+local removed = 0
+for _, battle_id in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    if tonumber(battle_id) <= tonumber(ARGV[1]) then
+        removed = removed + redis.call('SREM', KEYS[1], battle_id)
+    end
+end
+return removed
+"""
+
+
+class RankingUpdateQueue:
+    """
+    Pending ranking work of one tournament
+
+    Requests only record what needs updating (new battle ids, or a full
+    recompute) and the first one inside ``TOURNAMENT_RANKING_COALESCE_SECONDS``
+    tells the caller to schedule a run. The run takes everything pending
+    at once, so any number of requests in the window cost a single run.
+    Requests arriving while a run is in progress schedule the next one.
+
+    Keys:
+        ranking_queue:{id}:battles    SET  battle ids waiting to be applied
+        ranking_queue:{id}:full       FLAG a full recompute was requested
+        ranking_queue:{id}:scheduled  FLAG a run is already scheduled
+    """
+
+    def __init__(self, tournament_id: int):
+        self.tournament_id = tournament_id
+        self.window = settings.TOURNAMENT_RANKING_COALESCE_SECONDS
+        self.lock_ttl = settings.TOURNAMENT_RANKING_LOCK_TTL
+
+        self.battles_key = f"ranking_queue:{tournament_id}:battles"
+        self.full_key = f"ranking_queue:{tournament_id}:full"
+        self.scheduled_key = f"ranking_queue:{tournament_id}:scheduled"
+
+    @property
+    def redis(self):
+        return get_redis_connection('default')
+
+    @property
+    def lock(self) -> LeaseLock:
+        """Lock held while a run updates the rankings"""
+        return LeaseLock(f"rankings:tournament_{self.tournament_id}", ttl=self.lock_ttl)
+
+    def request(self, battle_ids: Optional[Iterable[int]] = None) -> bool:
+        """
+        Record pending ranking work
+
+        Args:
+            battle_ids: New battles to apply (None requests a full recompute)
+
+        Returns:
+            True if the caller should schedule a run, False if one is
+            already scheduled
+        """
+        battle_ids = list(battle_ids) if battle_ids is not None else None
+        # Safety net: a lost run must not block the tournament for good
+        pending_timeout = self.window + self.lock_ttl
+
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            if battle_ids is None or not settings.TOURNAMENT_RANKING_INCREMENTAL:
+                pipe.set(self.full_key, 1, ex=pending_timeout)
+            elif battle_ids:
+                pipe.sadd(self.battles_key, *battle_ids)
+                pipe.expire(self.battles_key, pending_timeout)
+            pipe.set(self.scheduled_key, 1, nx=True, ex=pending_timeout)
+            return bool(pipe.execute()[-1])
+
+        except RedisError as e:
+            logger.warning(f"Ranking queue unavailable for tournament {self.tournament_id}: {str(e)}")
+            return True
+
+    def take(self) -> Tuple[bool, List[int]]:
+        """
+        Take all pending work and allow the next run to be scheduled
+
+        Returns:
+            Tuple of (full recompute requested, battle ids to apply)
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.smembers(self.battles_key)
+            pipe.get(self.full_key)
+            pipe.delete(self.battles_key, self.full_key, self.scheduled_key)
+            battle_ids, full, _ = pipe.execute()
+
+        except RedisError as e:
+            # Without the queue we don't know what changed
+            logger.warning(f"Ranking queue unavailable for tournament {self.tournament_id}: {str(e)}")
+            return True, []
+
+        return bool(full), sorted(int(battle_id) for battle_id in battle_ids)
+
+    def discard_battles(self, up_to: int) -> int:
+        """
+        Drop queued battles already counted by a full recompute
+
+        Args:
+            up_to: Newest battle id the recompute counted
+
+        Returns:
+            Number of battle ids dropped
+        """
+        try:
+            return self.redis.eval(DISCARD_BATTLES_SCRIPT, 1, self.battles_key, up_to)
+
+        except RedisError as e:
+            logger.warning(f"Ranking queue unavailable for tournament {self.tournament_id}: {str(e)}")
+            return 0
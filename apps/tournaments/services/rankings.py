@@ -0,0 +1,267 @@
+"""
+Tournament ranking computation
+Recomputes a tournament's leaderboard from its battle logs in bulk
+"""
+
+import logging
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.tournaments.models import Tournament, PlayerBattleLog, TournamentRanking
+from .leaderboard import refresh_live_leaderboard
+from .leaderboard_cache import bump_ranking_version
+from .ranking_queue import RankingUpdateQueue
+from .scoring import tournament_score_expression
+
+
+logger = logging.getLogger(__name__)
+
+
+RANKING_STAT_FIELDS = [
+    'total_battles',
+    'total_wins',
+    'total_losses',
+    'total_draws',
+    'total_crowns',
+    'total_crowns_lost',
+    'win_rate',
+    'score',
+    'last_battle_time',
+]
+
+
+def ranking_sort_key(ranking: TournamentRanking):
+    """
+    Leaderboard order: score, wins and crowns descending, then whoever
+    reached it first (players without battles last)
+    """
+    last_battle_time = ranking.last_battle_time
+    return (
+        -ranking.score,
+        -ranking.total_wins,
+        -ranking.total_crowns,
+        last_battle_time is None,
+        last_battle_time.timestamp() if last_battle_time else 0,
+        ranking.participant_id,
+    )
+
+
+def assign_ranks(rankings: List[TournamentRanking]) -> List[TournamentRanking]:
+    """Sort rankings in leaderboard order and number them from 1"""
+    ordered = sorted(rankings, key=ranking_sort_key)
+    for index, ranking in enumerate(ordered, start=1):
+        ranking.rank = index
+    return ordered
+
+
+def recalculate_tournament_rankings(tournament, queue: Optional[RankingUpdateQueue] = None) -> int:
+    """
+    Recompute every confirmed participant's ranking of a tournament
+
+    All stats, and the score of the tournament's scoring profile, come
+    from a single GROUP BY participant aggregate over the counted battle
+    logs, ranks are assigned in memory and the rows are written with one
+    bulk upsert, so the cost doesn't depend on the number of battles per
+    player or on the scoring formula.
+
+    Args:
+        tournament: Tournament instance
+        queue: Pending ranking work of the tournament; battles queued
+            while the recompute ran and already counted by it are dropped
+            so they aren't applied a second time
+
+    Returns:
+        Number of rankings updated
+    """
+    with transaction.atomic():
+        # Lock before aggregating: a concurrent apply_battle_deltas either
+        # committed before (and is in the aggregate) or waits for this write
+        _lock_tournament_rankings(tournament)
+
+        # Participants who left (disqualified, refunded, cancelled) drop out
+        # of the rankings; the live leaderboard is rebuilt without them below
+        removed, _ = TournamentRanking.objects.filter(tournament=tournament).exclude(
+            participant__status='confirmed'
+        ).delete()
+
+        participant_ids = list(
+            tournament.participants.filter(status='confirmed').values_list('id', flat=True)
+        )
+        if not participant_ids and not removed:
+            return 0
+
+        stats_by_participant = {
+            row['participant_id']: row
+            for row in PlayerBattleLog.objects.filter(
+                tournament=tournament,
+                participant__status='confirmed',
+                is_counted=True
+            ).values('participant_id').annotate(
+                **TournamentRanking.battle_stats_aggregates(),
+                last_battle_id=Max('id')
+            ).annotate(
+                score=tournament_score_expression(tournament)
+            ).order_by()
+        }
+
+        if queue is not None and stats_by_participant:
+            # Syncs of a tournament don't overlap and queue their battles
+            # after committing them, so every queued battle up to the
+            # newest one counted here is part of this aggregate
+            queue.discard_battles(max(row['last_battle_id'] for row in stats_by_participant.values()))
+
+        rankings = []
+        for participant_id in participant_ids:
+            ranking = TournamentRanking(tournament=tournament, participant_id=participant_id, rank=0)
+            ranking.apply_stats(stats_by_participant.get(participant_id, {}))
+            rankings.append(ranking)
+
+        assign_ranks(rankings)
+
+        TournamentRanking.objects.bulk_create(
+            rankings,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['tournament', 'participant'],
+            update_fields=RANKING_STAT_FIELDS + ['rank', 'calculated_at'],
+        )
+
+    refresh_live_leaderboard(tournament.id)
+    bump_ranking_version(tournament.id)
+
+    return len(rankings)
+
+
+def apply_battle_deltas(tournament, battle_ids: Iterable[int]) -> int:
+    """
+    Update rankings from newly ingested battles only
+
+    The new battles are aggregated per participant and added to the
+    affected rankings. Ranks are then recomputed in memory from a
+    lightweight projection of the leaderboard, and only the rows inside
+    the span that actually moved are written.
+
+    Args:
+        tournament: Tournament instance
+        battle_ids: IDs of the new PlayerBattleLog rows
+
+    Returns:
+        Number of ranking rows written
+    """
+    battle_ids = list(battle_ids)
+    if not battle_ids:
+        return 0
+
+    deltas = {
+        row['participant_id']: row
+        for row in PlayerBattleLog.objects.filter(
+            id__in=battle_ids,
+            tournament=tournament,
+            participant__status='confirmed',
+            is_counted=True
+        ).values('participant_id').annotate(
+            **TournamentRanking.battle_stats_aggregates()
+        ).order_by()
+    }
+    if not deltas:
+        return 0
+
+    with transaction.atomic():
+        _lock_tournament_rankings(tournament)
+
+        affected = {
+            ranking.participant_id: ranking
+            for ranking in TournamentRanking.objects.filter(
+                tournament=tournament,
+                participant_id__in=deltas.keys()
+            )
+        }
+        # calculate_score reads the scoring profile from the tournament
+        for ranking in affected.values():
+            ranking.tournament = tournament
+
+        created = []
+        for participant_id, delta in deltas.items():
+            ranking = affected.get(participant_id)
+            if ranking is None:
+                ranking = TournamentRanking(tournament=tournament, participant_id=participant_id, rank=0)
+                ranking.apply_stats(delta)
+                affected[participant_id] = ranking
+                created.append(ranking)
+            else:
+                _add_stats(ranking, delta)
+
+        # Everyone else keeps their stats; only their position may shift
+        others = [
+            TournamentRanking(
+                id=row[0], participant_id=row[1], rank=row[2], score=row[3],
+                total_wins=row[4], total_crowns=row[5], last_battle_time=row[6]
+            )
+            for row in TournamentRanking.objects.filter(tournament=tournament).exclude(
+                participant_id__in=affected.keys()
+            ).values_list(
+                'id', 'participant_id', 'rank', 'score', 'total_wins', 'total_crowns', 'last_battle_time'
+            )
+        ]
+
+        old_ranks = {ranking.participant_id: ranking.rank for ranking in others}
+        old_ranks.update({
+            participant_id: ranking.rank
+            for participant_id, ranking in affected.items()
+            if ranking.pk is not None
+        })
+
+        ordered = assign_ranks(list(affected.values()) + others)
+
+        # Rows outside the span between the affected players' old and new
+        # positions keep their rank
+        moved_others = [
+            ranking for ranking in ordered
+            if ranking.participant_id in old_ranks
+            and ranking.participant_id not in affected
+            and ranking.rank != old_ranks[ranking.participant_id]
+        ]
+        existing = [ranking for ranking in affected.values() if ranking.pk is not None]
+
+        if created:
+            TournamentRanking.objects.bulk_create(created, batch_size=500)
+        if existing:
+            TournamentRanking.objects.bulk_update(
+                existing, RANKING_STAT_FIELDS + ['rank', 'calculated_at'], batch_size=500
+            )
+        if moved_others:
+            TournamentRanking.objects.bulk_update(moved_others, ['rank'], batch_size=500)
+
+    # Other players' positions follow from the sorted set on their own
+    refresh_live_leaderboard(tournament.id, affected.keys())
+    bump_ranking_version(tournament.id)
+
+    return len(created) + len(existing) + len(moved_others)
+
+
+def _add_stats(ranking: TournamentRanking, delta):
+    """Add aggregated stats of new battles to a ranking and re-derive its score"""
+    ranking.total_battles += delta['total_battles']
+    ranking.total_wins += delta['total_wins']
+    ranking.total_draws += delta['total_draws']
+    ranking.total_losses = ranking.total_battles - ranking.total_wins - ranking.total_draws
+    ranking.total_crowns += delta['total_crowns'] or 0
+    ranking.total_crowns_lost += delta['total_crowns_lost'] or 0
+
+    if ranking.last_battle_time is None or (
+        delta['last_battle_time'] and delta['last_battle_time'] > ranking.last_battle_time
+    ):
+        ranking.last_battle_time = delta['last_battle_time']
+
+    ranking.calculate_win_rate()
+    ranking.calculate_score()
+    # bulk_update doesn't run auto_now
+    ranking.calculated_at = timezone.now()
+
+
+def _lock_tournament_rankings(tournament):
+    """Serialize ranking writers of a tournament (row lock on the tournament)"""
+    list(Tournament.objects.select_for_update().filter(id=tournament.id).values_list('id', flat=True))
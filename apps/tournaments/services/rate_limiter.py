@@ -0,0 +1,105 @@
+"""
+Distributed rate limiting for outgoing API requests
+Token buckets are kept in Redis so every Celery worker process shares them
+"""
+
+import logging
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+
+# Refill the bucket from the elapsed time and take a token if one is
+# available. Returns 0 when a token was taken, otherwise the number of
+# milliseconds to wait before trying again. Redis' own clock is used so all
+# workers agree on the time.
+TOKEN_BUCKET_SCRIPT = """
+local bucket_key = KEYS[1]
+local blocked_key = KEYS[2]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+
+local blocked_ms = redis.call('PTTL', blocked_key)
+if blocked_ms > 0 then
+    return blocked_ms
+end
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call('HMGET', bucket_key, 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+
+tokens = math.min(capacity, tokens + (now - updated_at) * rate / 1000)
+
+local wait_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait_ms = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', bucket_key, 'tokens', tostring(tokens), 'updated_at', now)
+redis.call('PEXPIRE', bucket_key, math.ceil(capacity * 1000 / rate) + 1000)
+
+return wait_ms
+"""
+
+
+class RedisTokenBucket:
+    """
+    Token bucket rate limiter shared across processes through Redis
+
+    ``rate`` tokens are added per second up to ``capacity``; each request
+    consumes one token. ``try_acquire`` reports how long to wait when none
+    is left (``ApiKeyPool`` waits for the first key to have one).
+    """
+
+    def __init__(self, name: str, rate: float, capacity: int):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.bucket_key = f"rate_limit:{name}"
+        self.blocked_key = f"rate_limit:{name}:blocked"
+        self._script = None
+
+    @property
+    def redis(self):
+        return get_redis_connection('default')
+
+    def _take(self) -> int:
+        if self._script is None:
+            self._script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        return int(self._script(
+            keys=[self.bucket_key, self.blocked_key],
+            args=[self.rate, self.capacity]
+        ))
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available, without waiting
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        try:
+            return self._take() / 1000
+        except RedisError as e:
+            # Don't stop syncing because Redis is briefly unreachable
+            logger.warning(f"Rate limiter {self.name} unavailable, proceeding unthrottled: {str(e)}")
+            return 0
+
+    def block_for(self, seconds: float):
+        """
+        Stop handing out tokens to every worker for a while
+
+        Used to honour the API's Retry-After after a 429 response.
+        """
+        try:
+            self.redis.set(self.blocked_key, 1, px=max(int(seconds * 1000), 1))
+        except RedisError as e:
+            logger.warning(f"Failed to block rate limiter {self.name}: {str(e)}")
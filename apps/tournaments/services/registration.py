@@ -0,0 +1,396 @@
+"""
+Tournament registration
+Places are reserved through a Redis gate backed by a conditional UPDATE on the tournament,
+and registration rushes can be queued and admitted by a worker at a fixed rate
+"""
+
+import logging
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from apps.tournaments.models import Tournament, TournamentParticipant
+
+
+logger = logging.getLogger(__name__)
+
+
+# Take a place if fewer than ARGV[1] are taken. A missing counter is seeded
+# from ARGV[2] (the database count); without a seed -1 asks the caller for one.
+RESERVE_SCRIPT = """
+local taken = redis.call('GET', KEYS[1])
+if not taken then
+    if ARGV[2] == '' then
+        return -1
+    end
+    taken = ARGV[2]
+    redis.call('SET', KEYS[1], taken, 'EX', ARGV[3])
+end
+if tonumber(taken) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+return 1
+"""
+
+# Give a place back unless the counter expired meanwhile (it is reseeded)
+RELEASE_SCRIPT = """
+local taken = tonumber(redis.call('GET', KEYS[1]))
+if taken and taken > 0 then
+    return redis.call('DECR', KEYS[1])
+end
+return -1
+"""
+
+# Issue a ticket unless the user already has an active one (returned instead).
+# KEYS: users hash, issued counter, queue list, taken counter
+# ARGV: user id, new ticket, ttl, ticket key prefix, tournament id, queued, admitted
+ENQUEUE_SCRIPT = """
+local existing = redis.call('HGET', KEYS[1], ARGV[1])
+if existing then
+    local status = redis.call('HGET', ARGV[4] .. existing, 'status')
+    if status == ARGV[6] or status == ARGV[7] then
+        return existing
+    end
+end
+local number = redis.call('INCR', KEYS[2])
+local ticket_key = ARGV[4] .. ARGV[2]
+redis.call('HSET', ticket_key, 'tournament_id', ARGV[5], 'user_id', ARGV[1], 'number', number, 'status', ARGV[6])
+redis.call('EXPIRE', ticket_key, ARGV[3])
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('RPUSH', KEYS[3], ARGV[2])
+for _, key in ipairs(KEYS) do
+    redis.call('EXPIRE', key, ARGV[3])
+end
+return ARGV[2]
+"""
+
+FULL_MESSAGE = 'ظرفیت تورنومنت تکمیل شده است'
+
+
+class RegistrationSlots:
+    """
+    Redis counter of the places taken in one tournament
+
+    Rejects registrations beyond ``max_participants`` in O(1) without
+    touching the database. It only filters the crowd: the authoritative
+    check is the conditional UPDATE on ``Tournament.reserved_slots``. The
+    counter expires after ``KEY_TIMEOUT`` and is reseeded from the
+    database, so any drift heals by itself.
+
+    Keys:
+        registration_slots:{id}  INT  places taken
+    """
+
+    KEY_TIMEOUT = 300  # 5 minutes
+
+    def __init__(self, tournament_id: int):
+        self.tournament_id = tournament_id
+        self.key = f"registration_slots:{tournament_id}"
+        self._reserve_script = None
+        self._release_script = None
+
+    @property
+    def redis(self):
+        return get_redis_connection('default')
+
+    def try_reserve(self, capacity: int) -> bool:
+        """
+        Take a place if the tournament isn't full
+
+        Args:
+            capacity: Tournament max participants
+
+        Returns:
+            True if a place was taken (release it if registration fails)
+        """
+        try:
+            if self._reserve_script is None:
+                self._reserve_script = self.redis.register_script(RESERVE_SCRIPT)
+
+            taken = self._reserve_script(keys=[self.key], args=[capacity, '', self.KEY_TIMEOUT])
+            if taken == -1:
+                seed = Tournament.objects.filter(
+                    pk=self.tournament_id
+                ).values_list('reserved_slots', flat=True).first() or 0
+                taken = self._reserve_script(keys=[self.key], args=[capacity, seed, self.KEY_TIMEOUT])
+
+            return bool(taken)
+
+        except RedisError as e:
+            # The database still enforces the capacity
+            logger.warning(f"Registration slots of tournament {self.tournament_id} unavailable: {str(e)}")
+            return True
+
+    def is_full(self, capacity: int) -> bool:
+        """Check the counter without taking a place (False if unknown)"""
+        try:
+            taken = self.redis.get(self.key)
+        except RedisError:
+            return False
+        return taken is not None and int(taken) >= capacity
+
+    def release(self):
+        """Give a place back"""
+        try:
+            if self._release_script is None:
+                self._release_script = self.redis.register_script(RELEASE_SCRIPT)
+            self._release_script(keys=[self.key])
+
+        except RedisError as e:
+            logger.warning(f"Registration slots of tournament {self.tournament_id} unavailable: {str(e)}")
+
+
+def create_pending_participant(tournament: Tournament, user) -> TournamentParticipant:
+    """
+    Reserve a place and create a pending participant
+
+    Must run inside a transaction: the reservation is an UPDATE on the
+    tournament row that only succeeds while ``reserved_slots`` is below
+    ``max_participants``, so the row stays locked until commit and
+    concurrent registrations can never oversubscribe the tournament.
+
+    Raises:
+        ValidationError: The tournament is full
+    """
+    reserved = Tournament.objects.filter(
+        pk=tournament.pk,
+        reserved_slots__lt=F('max_participants')
+    ).update(reserved_slots=F('reserved_slots') + 1)
+
+    if not reserved:
+        raise ValidationError(FULL_MESSAGE)
+
+    # A cancelled registration (e.g. an expired payment) is registered again
+    participant = TournamentParticipant.objects.filter(
+        tournament=tournament,
+        user=user,
+        status='cancelled'
+    ).first() or TournamentParticipant(tournament=tournament, user=user)
+
+    participant.status = 'pending'
+    participant.payment = None
+    # Tells the signals the place is already counted
+    participant._slot_reserved = True
+    participant.save()
+    return participant
+
+
+def register_participant(tournament: Tournament, user) -> Tuple[TournamentParticipant, Optional[object]]:
+    """
+    Register a user in a tournament
+
+    Free tournaments confirm the registration at once, premium ones get
+    a pending payment. Requests beyond the capacity are rejected by the
+    Redis gate before any database write.
+
+    Args:
+        tournament: Tournament to register in
+        user: User registering
+
+    Returns:
+        Tuple of (participant, payment or None for free tournaments)
+
+    Raises:
+        ValidationError: Registration is closed, full or already done
+    """
+    if not tournament.is_registration_open:
+        raise ValidationError('امکان ثبت‌نام در این تورنومنت وجود ندارد')
+
+    slots = RegistrationSlots(tournament.id)
+    if not slots.try_reserve(tournament.max_participants):
+        raise ValidationError(FULL_MESSAGE)
+
+    try:
+        if TournamentParticipant.objects.filter(
+            tournament=tournament,
+            user=user,
+            status__in=['pending', 'confirmed']
+        ).exists():
+            raise ValidationError('شما قبلاً در این تورنومنت ثبت‌نام کرده‌اید')
+
+        with transaction.atomic():
+            participant = create_pending_participant(tournament, user)
+
+            if tournament.pricable == 'free':
+                participant.confirm_registration()
+                return participant, None
+
+            from apps.payments.models import Payment
+            payment = Payment.objects.create(
+                user=user,
+                amount=tournament.entry_fee,
+                payment_type='tournament_entry',
+                description=f'هزینه ثبت‌نام در تورنومنت {tournament.title}',
+                status='pending'
+            )
+            participant.payment = payment
+            participant.save(update_fields=['payment'])
+            return participant, payment
+
+    except Exception:
+        slots.release()
+        raise
+
+
+class RegistrationQueue:
+    """
+    FIFO of registration requests of one tournament
+
+    Requests are acknowledged at once with a ticket and registered later
+    by ``process_registration_queue``, ``REGISTRATION_QUEUE_BATCH_SIZE``
+    tickets every ``REGISTRATION_QUEUE_INTERVAL_SECONDS``, so the database
+    write rate is set here rather than by the crowd. A user has at most
+    one active ticket per tournament.
+
+    Keys:
+        registration_queue:{id}            LIST  ticket ids in arrival order
+        registration_queue:{id}:users      HASH  user id -> ticket id
+        registration_queue:{id}:issued     INT   tickets issued
+        registration_queue:{id}:taken      INT   tickets taken by the worker
+        registration_queue:{id}:scheduled  FLAG  a worker run is scheduled
+        registration_ticket:{ticket}       HASH  tournament_id, user_id, number, status, result
+    """
+
+    QUEUED = 'queued'
+    ADMITTED = 'admitted'
+    REJECTED = 'rejected'
+
+    TICKET_KEY_PREFIX = 'registration_ticket:'
+
+    def __init__(self, tournament_id: int):
+        self.tournament_id = tournament_id
+        self.batch_size = settings.REGISTRATION_QUEUE_BATCH_SIZE
+        self.interval = settings.REGISTRATION_QUEUE_INTERVAL_SECONDS
+        self.ticket_ttl = settings.REGISTRATION_TICKET_TTL
+
+        self.key = f"registration_queue:{tournament_id}"
+        self.users_key = f"registration_queue:{tournament_id}:users"
+        self.issued_key = f"registration_queue:{tournament_id}:issued"
+        self.taken_key = f"registration_queue:{tournament_id}:taken"
+        self.scheduled_key = f"registration_queue:{tournament_id}:scheduled"
+        self._enqueue_script = None
+
+    @property
+    def redis(self):
+        return get_redis_connection('default')
+
+    @classmethod
+    def ticket_key(cls, ticket: str) -> str:
+        return f"{cls.TICKET_KEY_PREFIX}{ticket}"
+
+    def enqueue(self, user_id: int) -> str:
+        """
+        Queue a registration request
+
+        The "already queued?" check and the new ticket are one script, so
+        a double submit can't issue two tickets.
+
+        Returns:
+            Ticket id (the existing one if the user is already queued or admitted)
+
+        Raises:
+            RedisError: The queue is unavailable
+        """
+        if self._enqueue_script is None:
+            self._enqueue_script = self.redis.register_script(ENQUEUE_SCRIPT)
+
+        ticket = self._enqueue_script(
+            keys=[self.users_key, self.issued_key, self.key, self.taken_key],
+            args=[
+                user_id, uuid.uuid4().hex, self.ticket_ttl, self.TICKET_KEY_PREFIX,
+                self.tournament_id, self.QUEUED, self.ADMITTED,
+            ]
+        )
+        return ticket.decode()
+
+    def get_ticket(self, ticket: str) -> Optional[Dict]:
+        """
+        Get a ticket of this tournament
+
+        Returns:
+            Dictionary with status, user_id, ``ahead`` (tickets in front of
+            it while queued) and the result fields, or None if unknown
+        """
+        raw = self.redis.hgetall(self.ticket_key(ticket))
+        if not raw:
+            return None
+
+        data = {key.decode(): value.decode() for key, value in raw.items()}
+        if int(data['tournament_id']) != self.tournament_id:
+            return None
+
+        data['user_id'] = int(data['user_id'])
+        data['ahead'] = None
+        if data['status'] == self.QUEUED:
+            taken = int(self.redis.get(self.taken_key) or 0)
+            data['ahead'] = max(int(data['number']) - taken - 1, 0)
+        return data
+
+    def take(self) -> List[Dict]:
+        """Take the next batch of tickets (ticket id and user id)"""
+        tickets = [ticket.decode() for ticket in self.redis.lpop(self.key, self.batch_size) or []]
+        if not tickets:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.incrby(self.taken_key, len(tickets))
+        for ticket in tickets:
+            pipe.hget(self.ticket_key(ticket), 'user_id')
+        user_ids = pipe.execute()[1:]
+
+        # Tickets that expired while queued are dropped
+        return [
+            {'ticket': ticket, 'user_id': int(user_id)}
+            for ticket, user_id in zip(tickets, user_ids)
+            if user_id is not None
+        ]
+
+    def requeue(self, tickets: List[str]):
+        """Put taken but unresolved tickets back at the front of the queue, in order"""
+        if not tickets:
+            return
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lpush(self.key, *reversed(tickets))
+        pipe.decrby(self.taken_key, len(tickets))
+        pipe.execute()
+
+    def resolve(self, ticket: str, status: str, **result):
+        """Store the outcome of a ticket"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(self.ticket_key(ticket), mapping={'status': status, **result})
+        pipe.expire(self.ticket_key(ticket), self.ticket_ttl)
+        pipe.execute()
+
+    def schedule(self) -> bool:
+        """
+        Mark a worker run as scheduled
+
+        Returns:
+            True if the caller should schedule it, False if one already is
+        """
+        return bool(self.redis.set(self.scheduled_key, 1, nx=True, ex=self.interval + 300))
+
+    def unschedule(self):
+        """Clear the scheduled flag so the next request schedules a run"""
+        self.redis.delete(self.scheduled_key)
+
+    def has_more(self) -> bool:
+        """
+        Called at the end of a run: True if another run should follow
+
+        The scheduled flag is cleared once the queue is empty, re-checking
+        afterwards so a request queued meanwhile is never left behind.
+        """
+        if self.redis.llen(self.key):
+            return True
+
+        self.unschedule()
+        return bool(self.redis.llen(self.key)) and self.schedule()
@@ -0,0 +1,129 @@
+"""
+Tournament scoring profiles
+Each profile is declared once and evaluated either in SQL or on a single ranking
+"""
+
+from typing import Dict, Optional
+
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
+
+
+class ScoringProfile:
+    """
+    Linear scoring formula over a participant's stats
+
+        score = wins * win_points + draws * draw_points
+                + (crowns // crowns_per_point) * crown_points
+
+    With ``eliminate`` set, participants who reached the tournament's
+    ``max_losses`` score 0, so they drop below everyone still playing and
+    are ordered among themselves by the wins / crowns tie-breaks.
+
+    ``expression()`` and ``score()`` are built from the same declaration,
+    so rankings computed in the database and incremental updates computed
+    in Python always agree.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        name: str,
+        win_points: int = 0,
+        draw_points: int = 0,
+        crown_points: int = 0,
+        crowns_per_point: int = 1,
+        eliminate: bool = False,
+    ):
+        self.key = key
+        self.name = name
+        self.win_points = win_points
+        self.draw_points = draw_points
+        self.crown_points = crown_points
+        self.crowns_per_point = crowns_per_point
+        self.eliminate = eliminate
+
+    def expression(self, max_losses: int = 0):
+        """
+        Database expression of the score
+
+        References ``total_battles``, ``total_wins``, ``total_draws`` and
+        ``total_crowns``, so it works both on TournamentRanking rows and
+        after ``TournamentRanking.battle_stats_aggregates()`` annotations.
+
+        Args:
+            max_losses: Tournament loss limit (only used with ``eliminate``)
+        """
+        wins = Coalesce(F('total_wins'), 0)
+        draws = Coalesce(F('total_draws'), 0)
+        crowns = Coalesce(F('total_crowns'), 0)
+
+        score = Value(0)
+        if self.win_points:
+            score = score + wins * self.win_points
+        if self.draw_points:
+            score = score + draws * self.draw_points
+        if self.crown_points:
+            # Integer division on both PostgreSQL and SQLite
+            score = score + crowns / self.crowns_per_point * self.crown_points
+
+        if self.eliminate and max_losses:
+            losses = Coalesce(F('total_battles'), 0) - wins - draws
+            score = Case(
+                When(GreaterThanOrEqual(losses, max_losses), then=Value(0)),
+                default=score,
+                output_field=IntegerField(),
+            )
+
+        return score
+
+    def score(self, stats, max_losses: int = 0) -> int:
+        """
+        Score of one participant
+
+        Args:
+            stats: Object with total_battles, total_wins, total_draws and
+                total_crowns attributes (e.g. a TournamentRanking)
+            max_losses: Tournament loss limit (only used with ``eliminate``)
+        """
+        wins = stats.total_wins or 0
+        draws = stats.total_draws or 0
+        crowns = stats.total_crowns or 0
+
+        if self.eliminate and max_losses:
+            losses = (stats.total_battles or 0) - wins - draws
+            if losses >= max_losses:
+                return 0
+
+        return (
+            wins * self.win_points
+            + draws * self.draw_points
+            + crowns // self.crowns_per_point * self.crown_points
+        )
+
+
+SCORING_PROFILES: Dict[str, ScoringProfile] = {
+    profile.key: profile
+    for profile in (
+        ScoringProfile('standard', 'استاندارد', win_points=3, draw_points=1, crown_points=1, crowns_per_point=10),
+        ScoringProfile('crown_heavy', 'تاج‌محور', win_points=1, crown_points=1),
+        ScoringProfile('win_only', 'فقط برد', win_points=1),
+        ScoringProfile(
+            'elimination', 'حذفی (حداکثر باخت)',
+            win_points=3, draw_points=1, crown_points=1, crowns_per_point=10, eliminate=True
+        ),
+    )
+}
+
+DEFAULT_SCORING_PROFILE = 'standard'
+
+
+def get_scoring_profile(key: Optional[str]) -> ScoringProfile:
+    """Get a scoring profile by key (unknown keys get the standard profile)"""
+    return SCORING_PROFILES.get(key) or SCORING_PROFILES[DEFAULT_SCORING_PROFILE]
+
+
+def tournament_score_expression(tournament):
+    """Database expression of a tournament's score"""
+    return get_scoring_profile(tournament.scoring_profile).expression(int(tournament.max_losses or 0))
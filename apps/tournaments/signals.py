@@ -1,14 +1,29 @@
 """
 Signals for automatic object creation when tournaments are created or modified.
 """
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from apps.notifications.live import publish_live_event, tournament_chat_channel
 
 from .models import Tournament, TournamentChat, TournamentParticipant
+from .services.leaderboard_cache import bump_ranking_version
+from .services.registration import RegistrationSlots
 
 User = get_user_model()
 
+# Participant statuses that hold a place in the tournament. Pending
+# registrations whose payment fails or expires are cancelled
+# (TournamentParticipant.cancel_unpaid), which gives the place back.
+HOLDING_STATUSES = ('pending', 'confirmed')
+
+# Participant fields shown by the participant leaderboard
+# (TournamentViewSet.leaderboard), which is cached per ranking version
+LEADERBOARD_FIELDS = ('status', 'placement', 'matches_played', 'matches_won', 'prize_won')
+
 
 @receiver(post_save, sender=Tournament)
 def create_tournament_welcome_chat(sender, instance, created, **kwargs):
@@ -131,3 +146,136 @@ def send_tournament_status_notifications(sender, instance, created, **kwargs):
                 delattr(instance, '_pending_start_message')
             except Exception as e:
                 print(f"Error creating start notification: {e}")
+
+
+@receiver(post_save, sender=TournamentParticipant)
+def update_leaderboard_on_withdrawal(sender, instance, **kwargs):
+    """
+    Participants leaving 'confirmed' (disqualified, refunded, cancelled)
+    drop out of the rankings with a recompute, which also invalidates the
+    cached leaderboards. Other saves, like the registrations of a rush,
+    don't change the leaderboard.
+    """
+    if getattr(instance, '_previous_status', None) == 'confirmed' and instance.status != 'confirmed':
+        from .tasks import request_ranking_update
+
+        tournament_id = instance.tournament_id
+        transaction.on_commit(lambda: request_ranking_update(tournament_id))
+
+
+@receiver(post_save, sender=TournamentParticipant)
+def invalidate_participant_leaderboard(sender, instance, **kwargs):
+    """
+    Confirmations, withdrawals and new placements or match counts of
+    confirmed participants change the participant leaderboard, so its
+    cached payloads are out of date.
+    """
+    previous = getattr(instance, '_previous_leaderboard_row', None)
+    was_confirmed = previous is not None and previous['status'] == 'confirmed'
+
+    if instance.status != 'confirmed' and not was_confirmed:
+        return
+    if previous is not None and all(getattr(instance, field) == previous[field] for field in LEADERBOARD_FIELDS):
+        return
+
+    tournament_id = instance.tournament_id
+    transaction.on_commit(lambda: bump_ranking_version(tournament_id))
+
+
+@receiver(post_delete, sender=TournamentParticipant)
+def invalidate_tournament_leaderboard(sender, instance, **kwargs):
+    """
+    Deleting a confirmed participant deletes its ranking row, so the
+    cached leaderboard payloads are out of date.
+    """
+    if instance.status == 'confirmed':
+        bump_ranking_version(instance.tournament_id)
+
+
+@receiver(post_save, sender=TournamentChat)
+def publish_chat_message(sender, instance, created, **kwargs):
+    """
+    Push new and deleted chat messages to the live streams of the tournament.
+    """
+    if created:
+        from .serializers import TournamentChatSerializer
+
+        data = TournamentChatSerializer(instance).data
+        data.pop('can_delete', None)
+        publish_live_event(tournament_chat_channel(instance.tournament_id), 'chat', data)
+
+    elif instance.is_deleted:
+        publish_live_event(
+            tournament_chat_channel(instance.tournament_id),
+            'chat_deleted',
+            {'id': instance.id}
+        )
+
+
+@receiver(pre_save, sender=TournamentParticipant)
+def track_participant_status_changes(sender, instance, **kwargs):
+    """
+    Remember the stored status so post_save can tell confirmations from
+    refunds, disqualifications and cancellations, and the stored
+    leaderboard fields so it can tell whether the leaderboard changed.
+    """
+    instance._previous_status = None
+    instance._previous_leaderboard_row = None
+    if instance.pk:
+        participants = TournamentParticipant.objects.filter(pk=instance.pk)
+        # Inside a transaction, lock the row so concurrent transitions of the
+        # same participant can't both count the same change
+        if transaction.get_connection().in_atomic_block:
+            participants = participants.select_for_update()
+        row = participants.values(*LEADERBOARD_FIELDS).first()
+        if row is not None:
+            instance._previous_status = row['status']
+            instance._previous_leaderboard_row = row
+
+
+def _change_counter(tournament_id, field, delta):
+    tournaments = Tournament.objects.filter(pk=tournament_id)
+    if delta < 0:
+        tournaments = tournaments.filter(**{f'{field}__gte': -delta})
+    tournaments.update(**{field: F(field) + delta})
+
+
+def _release_slot(tournament_id):
+    _change_counter(tournament_id, 'reserved_slots', -1)
+    transaction.on_commit(lambda: RegistrationSlots(tournament_id).release())
+
+
+@receiver(post_save, sender=TournamentParticipant)
+def update_participant_count(sender, instance, **kwargs):
+    """
+    Keep Tournament.total_participants (confirmed participants) and
+    Tournament.reserved_slots (pending and confirmed participants) current
+    with atomic increments and decrements on every status transition.
+    """
+    previous_status = getattr(instance, '_previous_status', None)
+
+    confirmed_delta = (instance.status == 'confirmed') - (previous_status == 'confirmed')
+    if confirmed_delta:
+        _change_counter(instance.tournament_id, 'total_participants', confirmed_delta)
+
+    slot_delta = (instance.status in HOLDING_STATUSES) - (previous_status in HOLDING_STATUSES)
+    if slot_delta > 0 and getattr(instance, '_slot_reserved', False):
+        # Already reserved by the registration service
+        slot_delta = 0
+    if slot_delta > 0:
+        _change_counter(instance.tournament_id, 'reserved_slots', 1)
+    elif slot_delta < 0:
+        _release_slot(instance.tournament_id)
+
+    instance._slot_reserved = False
+
+
+@receiver(post_delete, sender=TournamentParticipant)
+def decrement_participant_count(sender, instance, **kwargs):
+    """
+    Deleting a confirmed or pending participant frees its place.
+    """
+    if instance.status == 'confirmed':
+        _change_counter(instance.tournament_id, 'total_participants', -1)
+    if instance.status in HOLDING_STATUSES:
+        _release_slot(instance.tournament_id)
@@ -3,23 +3,43 @@ Celery tasks for tournament management and Clash Royale API integration
 """
 
 import logging
+from collections import defaultdict
 from datetime import timedelta
-from typing import List
-from celery import shared_task
+from typing import List, Optional
+from celery import chord, shared_task
 from django.utils import timezone
-from django.db import transaction
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from redis.exceptions import RedisError
 
 from apps.tournaments.models import (
     Tournament,
     TournamentParticipant,
     TournamentInvitation,
     PlayerBattleLog,
-    TournamentRanking,
 )
-from apps.tournaments.services import get_clash_royale_client
+from apps.tournaments.services import (
+    get_clash_royale_client,
+    ingest_tournament_battles,
+    PlayerPollScheduler,
+    TournamentMembershipTracker,
+    get_battle_sync_lock,
+    get_eliminated_participant_ids,
+    recalculate_tournament_rankings,
+    apply_battle_deltas,
+    RankingUpdateQueue,
+    record_ranking_snapshot,
+    get_ranking_snapshot_delay,
+    claim_trailing_ranking_snapshot,
+    release_trailing_ranking_snapshot,
+    prune_ranking_snapshots,
+    RegistrationSlots,
+    RegistrationQueue,
+    register_participant,
+)
+from apps.tournaments.services.registration import FULL_MESSAGE
 from apps.notifications.models import Notification
 
 
@@ -260,22 +280,26 @@ def send_tournament_sms(self, user_id: int, tournament_info: dict):
 def sync_tournament_battle_logs(self):
     """
     Sync battle logs for all active tournaments with auto-tracking enabled
-    Runs every 2 minutes
+    Runs every CLASH_ROYALE_POLL_CYCLE_SECONDS; the poll scheduler decides which players are fetched
     """
     try:
         now = timezone.now()
 
         # Find active tournaments with auto-tracking enabled
-        active_tournaments = Tournament.objects.filter(
-            status='ongoing',
-            auto_tracking_enabled=True,
-            clash_royale_tournament_tag__isnull=False
-        ).prefetch_related('participants__user')
+        active_tournaments = _tracked_tournaments()
 
         if not active_tournaments.exists():
             logger.debug("No active tournaments to sync")
             return 0
 
+        # Fetch each player once per cycle and fan the log out to all of
+        # their tournaments instead of syncing tournaments independently
+        if settings.CLASH_ROYALE_SYNC_DEDUPLICATE_PLAYERS:
+            tournament_ids = list(active_tournaments.values_list('id', flat=True))
+            sync_tournaments_battles.delay(tournament_ids)
+            logger.info(f"Queued deduplicated battle sync for {len(tournament_ids)} tournaments")
+            return len(tournament_ids)
+
         total_battles_synced = 0
 
         for tournament in active_tournaments:
@@ -294,17 +318,38 @@ def sync_tournament_battle_logs(self):
         raise self.retry(exc=e, countdown=60)
 
 
+def _tracked_tournaments():
+    """Ongoing tournaments whose battles are synced automatically"""
+    return Tournament.objects.filter(
+        status='ongoing',
+        auto_tracking_enabled=True,
+        clash_royale_tournament_tag__isnull=False
+    )
+
+
 @shared_task(bind=True, max_retries=3)
 def sync_single_tournament_battles(self, tournament_id: int):
     """
     Sync battle logs for a single tournament
 
+    Tournaments with more tracked participants than
+    CLASH_ROYALE_SYNC_CHUNK_SIZE are split into chunks synced in parallel
+    by a Celery chord; ``finalize_tournament_battle_sync`` then completes
+    the sync once.
+
     Args:
         tournament_id: Tournament ID
 
     Returns:
-        Number of new battles synced
+        Number of new battles synced (0 when the sync was fanned out)
     """
+    # Don't let a slow run and the next beat tick sync the same tournament
+    lock = get_battle_sync_lock(tournament_id)
+    if not _acquire_sync_lock(lock):
+        return 0
+
+    lock_handed_off = False
+
     try:
         tournament = Tournament.objects.get(id=tournament_id)
 
@@ -319,146 +364,647 @@ def sync_single_tournament_battles(self, tournament_id: int):
             logger.warning(f"No participants to sync for tournament {tournament_id}")
             return 0
 
-        client = get_clash_royale_client()
-        total_new_battles = 0
+        tracked_participants = []
+        for participant in participants:
+            if not participant.user.clash_royale_tag:
+                logger.debug(f"User {participant.user.username} has no Clash Royale tag")
+                continue
+            tracked_participants.append(participant)
+
+        chunk_size = settings.CLASH_ROYALE_SYNC_CHUNK_SIZE
+        if chunk_size and len(tracked_participants) > chunk_size:
+            # Spread large tournaments over all workers; the callback records
+            # the sync and releases the lock once every chunk is done
+            participant_ids = [participant.id for participant in tracked_participants]
+            chunks = [
+                participant_ids[i:i + chunk_size]
+                for i in range(0, len(participant_ids), chunk_size)
+            ]
+
+            lock_handed_off = True
+            chord(
+                sync_tournament_battles_chunk.s(tournament.id, chunk, lock.token)
+                for chunk in chunks
+            )(finalize_tournament_battle_sync.s(tournament.id, lock.token))
+
+            logger.info(f"Queued battle sync for tournament {tournament.title} in {len(chunks)} chunks")
+            return 0
+
+        new_battle_ids = _sync_participant_battles(get_clash_royale_client(), tournament, tracked_participants, lock)
+
+        return _complete_tournament_sync(tournament, new_battle_ids)
+
+    except Tournament.DoesNotExist:
+        logger.error(f"Tournament {tournament_id} not found")
+        return 0
+    except Exception as e:
+        logger.error(f"Failed to sync battles for tournament {tournament_id}: {str(e)}")
+        raise self.retry(exc=e, countdown=120)
+    finally:
+        # Runs that hit the lock asked for one more pass with fresh data
+        if not lock_handed_off and lock.release():
+            sync_single_tournament_battles.delay(tournament_id)
+
+
+@shared_task(bind=True, max_retries=3)
+def sync_tournament_battles_chunk(self, tournament_id: int, participant_ids: List[int], lock_token: str = None):
+    """
+    Sync battle logs for one chunk of a tournament's participants
+
+    Once retries are exhausted the chunk reports no new battles so the
+    chord still completes; its cursors were not advanced, so the missed
+    battles are ingested the next time those players are polled.
+
+    Args:
+        tournament_id: Tournament ID
+        participant_ids: TournamentParticipant IDs in this chunk
+        lock_token: Token of the tournament's sync lock
+
+    Returns:
+        IDs of the newly inserted battles
+    """
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+
+        participants = list(
+            TournamentParticipant.objects.filter(
+                id__in=participant_ids,
+                status='confirmed'
+            ).select_related('user')
+        )
+
+        lock = get_battle_sync_lock(tournament_id, token=lock_token)
+        return _sync_participant_battles(get_clash_royale_client(), tournament, participants, lock)
+
+    except Tournament.DoesNotExist:
+        logger.error(f"Tournament {tournament_id} not found")
+        return []
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=10)
+        logger.error(f"Failed to sync battle chunk for tournament {tournament_id}: {str(e)}")
+        return []
+
 
+@shared_task(bind=True, max_retries=3)
+def finalize_tournament_battle_sync(self, chunk_results: List[List[int]], tournament_id: int, lock_token: str = None):
+    """
+    Complete a chunked tournament sync (chord callback)
+
+    Args:
+        chunk_results: New battle IDs returned by each chunk
+        tournament_id: Tournament ID
+        lock_token: Token of the tournament's sync lock
+
+    Returns:
+        Number of new battles synced
+    """
+    lock = get_battle_sync_lock(tournament_id, token=lock_token)
+
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+
+        new_battle_ids = [battle_id for chunk in chunk_results for battle_id in chunk]
+        return _complete_tournament_sync(tournament, new_battle_ids)
+
+    except Tournament.DoesNotExist:
+        logger.error(f"Tournament {tournament_id} not found")
+        return 0
+    except Exception as e:
+        logger.error(f"Failed to finalize battle sync for tournament {tournament_id}: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+    finally:
+        if lock.release():
+            sync_single_tournament_battles.delay(tournament_id)
+
+
+@shared_task(bind=True, max_retries=3)
+def sync_tournaments_battles(self, tournament_ids: Optional[List[int]] = None):
+    """
+    Sync battle logs for several tournaments, fetching each player only once
+
+    A player registered in several of the tournaments has their battle log
+    fetched a single time and ingested into every one of them. Each
+    tournament's own sync lock is held too, so a single-tournament sync
+    never ingests the same tournament at the same time; tournaments whose
+    lock is taken are left to the sync holding it.
+
+    Args:
+        tournament_ids: Tournament IDs (default: the tracked tournaments
+            when the task runs)
+
+    Returns:
+        Number of new battles synced across all tournaments
+    """
+    lock = get_battle_sync_lock()
+    if not _acquire_sync_lock(lock):
+        return 0
+
+    tournament_locks = {}
+
+    try:
+        if tournament_ids is None:
+            tournament_ids = list(_tracked_tournaments().values_list('id', flat=True))
+
+        tournaments = {}
+        for tournament in Tournament.objects.filter(
+            id__in=tournament_ids,
+            clash_royale_tournament_tag__isnull=False
+        ):
+            tournament_lock = get_battle_sync_lock(tournament.id)
+            if tournament_lock.acquire():
+                tournament_locks[tournament.id] = tournament_lock
+                tournaments[tournament.id] = tournament
+
+        if not tournaments:
+            logger.warning(f"No tournaments to sync among {tournament_ids}")
+            return 0
+
+        participants = list(
+            TournamentParticipant.objects.filter(
+                tournament_id__in=tournaments.keys(),
+                status='confirmed',
+                user__clash_royale_tag__isnull=False
+            ).exclude(user__clash_royale_tag='').select_related('user')
+        )
+
+        participants_by_tournament = defaultdict(list)
         for participant in participants:
-            user = participant.user
+            participants_by_tournament[participant.tournament_id].append(participant)
 
-            if not user.clash_royale_tag:
-                logger.debug(f"User {user.username} has no Clash Royale tag")
-                continue
+        client = get_clash_royale_client()
 
+        # Each unique tag is fetched once, whatever the number of tournaments
+        battle_logs = _poll_battle_logs(client, tournaments, participants, namespace='all')
+        logger.info(
+            f"Fetched {len(battle_logs)} unique battle logs for "
+            f"{len(participants)} participations in {len(tournaments)} tournaments"
+        )
+        lock.extend()
+        for tournament_lock in tournament_locks.values():
+            tournament_lock.extend()
+
+        total_new_battles = 0
+
+        for tournament_id, tournament_participants in participants_by_tournament.items():
+            tournament = tournaments[tournament_id]
             try:
-                # Fetch battle log from API
-                battles = client.get_player_battle_log(user.clash_royale_tag, use_cache=False)
+                new_battle_ids = ingest_tournament_battles(
+                    client, tournament, tournament_participants, battle_logs
+                )
+                total_new_battles += _complete_tournament_sync(tournament, new_battle_ids)
+            except Exception as e:
+                logger.error(f"Failed to sync battles for tournament {tournament_id}: {str(e)}")
 
-                if not battles:
-                    logger.debug(f"No battles found for {user.username}")
-                    continue
+        return total_new_battles
 
-                # Filter battles that occurred during tournament time
-                tournament_start = tournament.tracking_started_at or tournament.start_date
-                now = timezone.now()
+    except Exception as e:
+        logger.error(f"Failed to sync battles for tournaments {tournament_ids}: {str(e)}")
+        raise self.retry(exc=e, countdown=120)
+    finally:
+        for tournament_id, tournament_lock in tournament_locks.items():
+            if tournament_lock.release():
+                sync_single_tournament_battles.delay(tournament_id)
+        # The rerun reads the tracked tournaments again
+        if lock.release():
+            sync_tournaments_battles.delay()
 
-                new_battles_count = 0
 
-                for battle_raw in battles:
-                    try:
-                        # Extract battle data
-                        battle_data = client.extract_battle_data(battle_raw, user.clash_royale_tag)
+def _sync_participant_battles(client, tournament: Tournament, participants: List[TournamentParticipant], lock) -> List[int]:
+    """
+    Fetch and ingest battle logs for some of a tournament's participants
 
-                        if not battle_data:
-                            continue
+    Args:
+        client: ClashRoyaleClient
+        tournament: Tournament instance
+        participants: Participants with a Clash Royale tag (``user`` loaded)
+        lock: The tournament's sync lock (its lease is renewed after fetching)
 
-                        battle_time = battle_data['battle_time']
+    Returns:
+        IDs of the newly inserted battles
+    """
+    # Fetch the battle logs of players due for a poll
+    battle_logs = _poll_battle_logs(
+        client,
+        {tournament.id: tournament},
+        participants,
+        namespace=f"tournament_{tournament.id}"
+    )
+    lock.extend()
 
-                        # Only process battles during tournament time
-                        if battle_time < tournament_start or battle_time > now:
-                            continue
+    # Extract battles newer than each player's cursor and store them in one batch
+    return ingest_tournament_battles(client, tournament, participants, battle_logs)
 
-                        # Check if battle already exists
-                        existing = PlayerBattleLog.objects.filter(
-                            tournament=tournament,
-                            player_tag=battle_data['player_tag'],
-                            battle_time=battle_time,
-                            opponent_tag=battle_data['opponent_tag']
-                        ).exists()
 
-                        if existing:
-                            continue
+def _acquire_sync_lock(lock) -> bool:
+    """
+    Take a battle sync lock, or coalesce into the run holding it
 
-                        # Create new battle log entry
-                        PlayerBattleLog.objects.create(
-                            tournament=tournament,
-                            participant=participant,
-                            **battle_data
-                        )
+    Returns:
+        True if the caller should run the sync
+    """
+    if lock.acquire():
+        return True
 
-                        new_battles_count += 1
+    if settings.CLASH_ROYALE_SYNC_LOCK_COALESCE and lock.request_rerun():
+        logger.info(f"Sync {lock.name} already running, queued one rerun after it")
+    else:
+        logger.info(f"Sync {lock.name} already running, skipping")
+    return False
 
-                    except Exception as e:
-                        logger.error(f"Failed to process battle for {user.username}: {str(e)}")
-                        continue
 
-                if new_battles_count > 0:
-                    logger.info(f"Synced {new_battles_count} new battles for {user.username}")
-                    total_new_battles += new_battles_count
+def _poll_battle_logs(client, tournaments: dict, participants: List[TournamentParticipant], namespace: str) -> dict:
+    """
+    Fetch battle logs for the participants that are worth an API call
 
-            except Exception as e:
-                logger.error(f"Failed to sync battles for user {user.username}: {str(e)}")
-                continue
+    Tournaments whose in-game member list is available only fetch members
+    whose score or rank moved. The remaining participants go through the
+    adaptive poll scheduler (or are all polled if it is disabled).
 
-        # Update last sync time
-        tournament.last_battle_sync_time = timezone.now()
-        tournament.save(update_fields=['last_battle_sync_time'])
+    Args:
+        client: ClashRoyaleClient
+        tournaments: Tournaments being synced, keyed by ID
+        participants: Participants with a Clash Royale tag (``user`` loaded)
+        namespace: Poll schedule to use
 
-        # Trigger leaderboard calculation if new battles were added
-        if total_new_battles > 0:
-            calculate_tournament_rankings.delay(tournament_id)
+    Returns:
+        Battle logs keyed by Clash Royale tag
+    """
+    participants_by_tournament = defaultdict(list)
+    for participant in participants:
+        participants_by_tournament[participant.tournament_id].append(participant)
+
+    membership_tags = set()
+    trackers = []
+    scheduled_participants = []
+
+    for tournament_id, tournament_participants in participants_by_tournament.items():
+        selected = None
+        if settings.CLASH_ROYALE_SYNC_USE_MEMBERSHIP:
+            tracker = TournamentMembershipTracker(tournaments[tournament_id])
+            selected = tracker.select_tags(client, tournament_participants)
+
+        if selected is None:
+            scheduled_participants.extend(tournament_participants)
+        else:
+            membership_tags.update(selected)
+            trackers.append(tracker)
+
+    scheduled_tags = [participant.user.clash_royale_tag for participant in scheduled_participants]
+
+    if settings.CLASH_ROYALE_ADAPTIVE_POLLING and scheduled_tags:
+        scheduler = PlayerPollScheduler(namespace=namespace)
+        due_tags = scheduler.claim_due(scheduled_tags)
+    else:
+        scheduler = None
+        due_tags = scheduled_tags
+
+    # Fetch all selected battle logs up front under a bounded concurrency limit.
+    # Failed fetches are missing from the result: they are neither marked as
+    # fetched nor recorded as idle polls, so those players are retried soon
+    # (claim_due only pushed them back by the minimum interval).
+    battle_logs = client.get_players_battle_logs(list(membership_tags) + due_tags)
+
+    for tracker in trackers:
+        tracker.mark_fetched(membership_tags & set(battle_logs))
+
+    if scheduler is not None:
+        # A player only backs off as eliminated once out of all their tournaments
+        eliminated_ids = get_eliminated_participant_ids(participants_by_tournament.keys())
+        active_tags = {
+            participant.user.clash_royale_tag
+            for participant in scheduled_participants
+            if participant.id not in eliminated_ids
+        }
+        scheduled_logs = {tag: battle_logs[tag] for tag in due_tags if tag in battle_logs}
+        scheduler.record_polls(client, scheduled_logs, eliminated_tags=set(scheduled_logs) - active_tags)
 
-        logger.info(f"Synced {total_new_battles} total new battles for tournament {tournament.title}")
-        return total_new_battles
+    failed = len(membership_tags.union(due_tags)) - len(battle_logs)
+    logger.info(
+        f"Polled {len(battle_logs)} of {len({p.user.clash_royale_tag for p in participants})} "
+        f"players ({namespace}), {failed} failed"
+    )
+    return battle_logs
+
+
+def _complete_tournament_sync(tournament: Tournament, new_battle_ids: List[int]) -> int:
+    """
+    Record a finished sync and trigger ranking updates if needed
+
+    Returns:
+        Number of new battles synced
+    """
+    total_new_battles = len(new_battle_ids)
+
+    # Update last sync time
+    tournament.last_battle_sync_time = timezone.now()
+    tournament.save(update_fields=['last_battle_sync_time'])
+
+    # Trigger leaderboard calculation if new battles were added
+    if total_new_battles > 0:
+        request_ranking_update(tournament.id, new_battle_ids)
+
+    logger.info(f"Synced {total_new_battles} total new battles for tournament {tournament.title}")
+    return total_new_battles
+
+
+@shared_task
+def calculate_tournament_rankings(tournament_id: int):
+    """
+    Request a full ranking recompute of a tournament
+
+    Kept for callers and queued messages of the old task: the work goes
+    through request_ranking_update so it is coalesced, locked and
+    snapshotted like every other ranking update.
+
+    Args:
+        tournament_id: Tournament ID
+
+    Returns:
+        True if a run was scheduled, False if one was already pending
+    """
+    return request_ranking_update(tournament_id)
+
+
+def request_ranking_update(tournament_id: int, battle_ids: Optional[List[int]] = None) -> bool:
+    """
+    Ask for a (coalesced) ranking update of a tournament
+
+    Requests inside TOURNAMENT_RANKING_COALESCE_SECONDS share one run.
+
+    Args:
+        tournament_id: Tournament ID
+        battle_ids: New battles to apply (None requests a full recompute)
+
+    Returns:
+        True if a run was scheduled, False if one was already pending
+    """
+    queue = RankingUpdateQueue(tournament_id)
+
+    if not queue.request(battle_ids):
+        logger.debug(f"Ranking update for tournament {tournament_id} already scheduled")
+        return False
+
+    update_tournament_rankings.apply_async(args=[tournament_id], countdown=queue.window)
+    return True
+
+
+@shared_task(bind=True, max_retries=3)
+def update_tournament_rankings(self, tournament_id: int):
+    """
+    Apply all pending ranking work of a tournament in one run
+
+    Runs a full recompute if one was requested, otherwise applies the
+    pending battles incrementally (falling back to a full recompute if
+    that fails). A run finding another one in progress leaves a single
+    follow-up run behind it instead of updating in parallel.
+
+    Args:
+        tournament_id: Tournament ID
+
+    Returns:
+        Number of ranking rows written
+    """
+    queue = RankingUpdateQueue(tournament_id)
+    lock = queue.lock
+
+    if not lock.acquire():
+        lock.request_rerun()
+        logger.info(f"Rankings of tournament {tournament_id} are being updated, queued a follow-up run")
+        return 0
+
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+        full, battle_ids = queue.take()
+
+        rows_written = None
+        if not full:
+            try:
+                rows_written = apply_battle_deltas(tournament, battle_ids)
+                logger.info(
+                    f"Applied {len(battle_ids)} new battles to rankings of tournament "
+                    f"{tournament.title} ({rows_written} rows written)"
+                )
+            except Exception as e:
+                logger.error(f"Incremental ranking update failed for tournament {tournament_id}, recomputing: {str(e)}")
+
+        if rows_written is None:
+            rows_written = recalculate_tournament_rankings(tournament, queue)
+            logger.info(f"Updated {rows_written} rankings for tournament {tournament.title}")
+
+        if rows_written:
+            _record_ranking_snapshot(tournament_id)
+        return rows_written
 
     except Tournament.DoesNotExist:
         logger.error(f"Tournament {tournament_id} not found")
         return 0
     except Exception as e:
-        logger.error(f"Failed to sync battles for tournament {tournament_id}: {str(e)}")
-        raise self.retry(exc=e, countdown=120)
+        logger.error(f"Failed to update rankings for tournament {tournament_id}: {str(e)}")
+        # The work was taken off the queue, so retry with a full recompute
+        queue.request()
+        raise self.retry(exc=e, countdown=60)
+    finally:
+        if lock.release():
+            update_tournament_rankings.delay(tournament_id)
 
 
-@shared_task(bind=True, max_retries=3)
-def calculate_tournament_rankings(self, tournament_id: int):
+def _record_ranking_snapshot(tournament_id: int):
     """
-    Calculate and update tournament rankings based on battle logs
+    Snapshot the rankings, or schedule the snapshot for the end of the
+    snapshot interval so the last change of a burst (often the final
+    standings) is recorded too. Call while holding the ranking lock.
+    """
+    delay = get_ranking_snapshot_delay(tournament_id)
+
+    if not delay:
+        record_ranking_snapshot(tournament_id)
+    elif claim_trailing_ranking_snapshot(tournament_id, delay):
+        record_trailing_ranking_snapshot.apply_async(args=[tournament_id], countdown=int(delay) + 1)
+
+
+@shared_task(bind=True, max_retries=5)
+def record_trailing_ranking_snapshot(self, tournament_id: int):
+    """
+    Record the ranking changes throttled by the snapshot interval
 
     Args:
         tournament_id: Tournament ID
+    """
+    lock = RankingUpdateQueue(tournament_id).lock
+
+    # Snapshots of a tournament must not run concurrently with its updates
+    if not lock.acquire():
+        raise self.retry(countdown=5)
+
+    try:
+        release_trailing_ranking_snapshot(tournament_id)
+        _record_ranking_snapshot(tournament_id)
+
+    except Exception as e:
+        logger.error(f"Failed to record ranking snapshot for tournament {tournament_id}: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+    finally:
+        if lock.release():
+            update_tournament_rankings.delay(tournament_id)
+
+
+@shared_task(bind=True, max_retries=3)
+def recalculate_active_tournament_rankings(self):
+    """
+    Fully recompute rankings of ongoing tournaments
+    Consistency check for the incremental updates; runs every 15 minutes
+    """
+    try:
+        tournament_ids = list(
+            Tournament.objects.filter(
+                status='ongoing',
+                auto_tracking_enabled=True
+            ).values_list('id', flat=True)
+        )
+
+        for tournament_id in tournament_ids:
+            request_ranking_update(tournament_id)
+
+        logger.info(f"Queued full ranking recompute for {len(tournament_ids)} tournaments")
+        return len(tournament_ids)
+
+    except Exception as e:
+        logger.error(f"Failed to queue ranking recompute: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+
+
+@shared_task(bind=True, max_retries=3)
+def prune_tournament_ranking_snapshots(self):
+    """
+    Delete ranking snapshots past TOURNAMENT_RANKING_SNAPSHOT_RETENTION_DAYS
+    Runs daily
+    """
+    try:
+        deleted = prune_ranking_snapshots()
+
+        logger.info(f"Deleted {deleted} old ranking snapshots")
+        return deleted
+
+    except Exception as e:
+        logger.error(f"Failed to prune ranking snapshots: {str(e)}")
+        raise self.retry(exc=e, countdown=300)
+
+
+@shared_task(bind=True, max_retries=3)
+def reconcile_tournament_participant_counts(self):
+    """
+    Correct denormalized Tournament.total_participants counters
+    Runs hourly
+    """
+    try:
+        # Unpaid registrations release their places through the signals first
+        TournamentParticipant.cancel_unpaid_registrations()
+        corrected = Tournament.reconcile_participant_counts()
+
+        if corrected:
+            logger.warning(f"Corrected participant count of {corrected} tournaments")
+        return corrected
+
+    except Exception as e:
+        logger.error(f"Failed to reconcile participant counts: {str(e)}")
+        raise self.retry(exc=e, countdown=300)
+
+
+def queue_registration(tournament: Tournament, user) -> str:
+    """
+    Queue a registration request of a tournament with queued registration
+
+    Closed and (known) full tournaments are rejected at once; the rest is
+    registered by process_registration_queue at a controlled rate.
 
     Returns:
-        Number of rankings updated
+        Ticket id to poll
+
+    Raises:
+        ValidationError: Registration is closed or the tournament is full
+        RedisError: The queue is unavailable
     """
+    if not tournament.is_registration_open:
+        raise ValidationError('امکان ثبت‌نام در این تورنومنت وجود ندارد')
+    if RegistrationSlots(tournament.id).is_full(tournament.max_participants):
+        raise ValidationError(FULL_MESSAGE)
+
+    queue = RegistrationQueue(tournament.id)
+    ticket = queue.enqueue(user.id)
+
+    if queue.schedule():
+        process_registration_queue.delay(tournament.id)
+    return ticket
+
+
+@shared_task(bind=True, max_retries=3)
+def process_registration_queue(self, tournament_id: int):
+    """
+    Register the next batch of queued registration requests
+    Runs every REGISTRATION_QUEUE_INTERVAL_SECONDS while the queue isn't empty
+
+    Args:
+        tournament_id: Tournament ID
+    """
+    from apps.accounts.models import User
+
+    queue = RegistrationQueue(tournament_id)
+    tickets, resolved = [], 0
+
     try:
         tournament = Tournament.objects.get(id=tournament_id)
+        tickets = queue.take()
+        users = User.objects.in_bulk([item['user_id'] for item in tickets])
 
-        # Get all participants
-        participants = tournament.participants.filter(status='confirmed')
+        admitted = 0
+        for item in tickets:
+            user = users.get(item['user_id'])
 
-        if not participants.exists():
-            logger.warning(f"No participants for tournament {tournament_id}")
-            return 0
+            try:
+                if user is None:
+                    raise ValidationError('کاربر یافت نشد')
+                participant, payment = register_participant(tournament, user)
 
-        rankings_updated = 0
+            except ValidationError as e:
+                status, result = RegistrationQueue.REJECTED, {'error': e.messages[0]}
 
-        with transaction.atomic():
-            for participant in participants:
-                # Get or create ranking
-                ranking, created = TournamentRanking.objects.get_or_create(
-                    tournament=tournament,
-                    participant=participant,
-                    defaults={'rank': 999999}  # Temporary rank
-                )
+            except Exception as e:
+                logger.error(f"Queued registration {item['ticket']} of tournament {tournament_id} failed: {str(e)}")
+                status, result = RegistrationQueue.REJECTED, {'error': 'خطا در ثبت‌نام، دوباره تلاش کنید'}
 
-                # Update stats from battle logs
-                ranking.update_stats()
-                rankings_updated += 1
+            else:
+                status, result = RegistrationQueue.ADMITTED, {
+                    'participant_id': participant.id,
+                    'payment_id': payment.id if payment else '',
+                }
+                admitted += 1
 
-            # Now assign ranks based on score
-            rankings = TournamentRanking.objects.filter(
-                tournament=tournament
-            ).order_by('-score', '-total_wins', '-total_crowns', 'last_battle_time')
+            queue.resolve(item['ticket'], status, **result)
+            resolved += 1
 
-            for index, ranking in enumerate(rankings, start=1):
-                ranking.rank = index
-                ranking.save(update_fields=['rank'])
+        if tickets:
+            logger.info(f"Registration queue of tournament {tournament_id}: {admitted}/{len(tickets)} admitted")
 
-        logger.info(f"Updated {rankings_updated} rankings for tournament {tournament.title}")
-        return rankings_updated
+        if queue.has_more():
+            process_registration_queue.apply_async(args=[tournament_id], countdown=queue.interval)
+
+        return admitted
 
     except Tournament.DoesNotExist:
         logger.error(f"Tournament {tournament_id} not found")
         return 0
+
     except Exception as e:
-        logger.error(f"Failed to calculate rankings for tournament {tournament_id}: {str(e)}")
-        raise self.retry(exc=e, countdown=60)
+        logger.error(f"Failed to process registration queue of tournament {tournament_id}: {str(e)}")
+
+        try:
+            # Tickets taken but not resolved are processed again by the retry
+            queue.requeue([item['ticket'] for item in tickets[resolved:]])
+            if self.request.retries >= self.max_retries:
+                # No run is scheduled anymore: let the next request schedule one
+                queue.unschedule()
+        except RedisError as redis_error:
+            logger.error(f"Failed to requeue registrations of tournament {tournament_id}: {str(redis_error)}")
+
+        raise self.retry(exc=e, countdown=queue.interval)
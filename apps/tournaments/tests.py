@@ -0,0 +1,363 @@
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import Mock, PropertyMock, patch
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+
+from .models import PlayerBattleLog, Tournament, TournamentParticipant
+from .services import RegistrationSlots, register_participant
+from .services.registration import FULL_MESSAGE
+
+
+TEST_SETTINGS = override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    ALLOWED_HOSTS=['*'],
+    SECURE_SSL_REDIRECT=False,
+)
+
+
+class TournamentTestMixin:
+    """Creates open tournaments with confirmed participants"""
+
+    def _create_tournament(self, index, participants=3, **fields):
+        now = timezone.now()
+        tournament = Tournament.objects.create(**{
+            'title': f'Tournament {index}',
+            'description': 'Test tournament',
+            'max_participants': 10,
+            'level_cap': 11,
+            'max_losses': 3,
+            'entry_fee': 0,
+            'pricable': 'free',
+            'is_featured': True,
+            'registration_start': now - timedelta(hours=1),
+            'registration_end': now + timedelta(hours=1),
+            'start_date': now + timedelta(hours=2),
+            'status': 'registration',
+            **fields,
+        })
+
+        for number in range(participants):
+            user = User.objects.create(
+                username=f'player_{index}_{number}',
+                phone_number=f'091{index:04d}{number:04d}',
+            )
+            TournamentParticipant.objects.create(tournament=tournament, user=user, status='confirmed')
+
+        return tournament
+
+
+@TEST_SETTINGS
+class TournamentQueryCountTests(TournamentTestMixin, TestCase):
+    """
+    Tournament list, featured and detail must not query per tournament
+    (the confirmed participant count used to be a COUNT per row)
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='viewer', phone_number='09000000000')
+        self.tournaments = [self._create_tournament(index) for index in range(2)]
+
+    def _count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def _assert_constant_queries(self, url):
+        """The query count doesn't grow with the number of tournaments"""
+        few, _ = self._count_queries(url)
+
+        for index in range(2, 8):
+            self.tournaments.append(self._create_tournament(index))
+
+        many, data = self._count_queries(url)
+        self.assertEqual(few, many)
+        return data
+
+    def test_list(self):
+        data = self._assert_constant_queries('/api/tournaments/')
+
+        self.assertEqual(len(data['results']), 8)
+        for tournament in data['results']:
+            self.assertEqual(tournament['current_participants'], 3)
+            self.assertFalse(tournament['is_full'])
+            self.assertTrue(tournament['can_register'])
+
+    def test_featured(self):
+        self.client.force_authenticate(self.user)
+        data = self._assert_constant_queries('/api/tournaments/featured/')
+
+        self.assertEqual(len(data), 6)
+        self.assertEqual(data[0]['current_participants'], 3)
+
+    def test_retrieve(self):
+        tournament = self.tournaments[0]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/tournaments/{tournament.slug}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['current_participants'], 3)
+
+
+@TEST_SETTINGS
+@patch('apps.tournaments.services.leaderboard_cache.publish_live_event')
+class TournamentLeaderboardTests(TournamentTestMixin, TestCase):
+    """The participant leaderboard is cached per ranking version"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tournament = self._create_tournament(0)
+        self.url = f'/api/tournaments/{self.tournament.slug}/leaderboard/'
+
+    def _get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, **headers)
+
+    def test_confirmation_changes_etag(self, publish):
+        response = self._get()
+        self.assertEqual(len(response.json()), 3)
+
+        user = User.objects.create(username='late_player', phone_number='09200000000')
+        with self.captureOnCommitCallbacks(execute=True):
+            TournamentParticipant.objects.create(tournament=self.tournament, user=user, status='confirmed')
+
+        response = self._get(response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 4)
+
+    def test_placement_change_changes_etag(self, publish):
+        etag = self._get()['ETag']
+
+        participant = self.tournament.participants.first()
+        participant.placement = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            participant.save()
+
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(1, [row['placement'] for row in response.json()])
+
+    def test_unchanged_leaderboard_is_not_modified(self, publish):
+        etag = self._get()['ETag']
+
+        participant = self.tournament.participants.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            participant.save()
+
+        self.assertEqual(self._get(etag).status_code, 304)
+
+    def test_redis_down(self, publish):
+        with patch('apps.tournaments.views.get_ranking_version', side_effect=RedisError('down')):
+            response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+
+def _redis_available():
+    try:
+        return bool(get_redis_connection('default').ping())
+    except Exception:
+        return False
+
+
+class RegistrationTestsMixin(TournamentTestMixin):
+    """
+    register_participant admits exactly ``max_participants`` registrations
+    and keeps the tournament counters in line with the participants
+    """
+
+    CAPACITY = 3
+
+    def setUp(self):
+        # Withdrawals request a ranking update (Celery)
+        ranking_update = patch('apps.tournaments.tasks.request_ranking_update')
+        ranking_update.start()
+        self.addCleanup(ranking_update.stop)
+
+        self.free = self._create_tournament(0, participants=0, max_participants=self.CAPACITY)
+        self.premium = self._create_tournament(
+            1, participants=0, max_participants=self.CAPACITY, pricable='premium', entry_fee=50000
+        )
+        self.users = [
+            User.objects.create(username=f'registering_{number}', phone_number=f'0930000{number:04d}')
+            for number in range(self.CAPACITY + 1)
+        ]
+
+    def _register(self, tournament, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return register_participant(Tournament.objects.get(pk=tournament.pk), user)
+
+    def _assert_counters(self, tournament):
+        tournament.refresh_from_db()
+        participants = tournament.participants
+        self.assertEqual(tournament.total_participants, participants.filter(status='confirmed').count())
+        self.assertEqual(
+            tournament.reserved_slots,
+            participants.filter(status__in=['pending', 'confirmed']).count()
+        )
+
+    def test_admits_up_to_capacity(self):
+        for user in self.users[:self.CAPACITY]:
+            participant, payment = self._register(self.free, user)
+            self.assertEqual(participant.status, 'confirmed')
+            self.assertIsNone(payment)
+
+        with self.assertRaisesMessage(ValidationError, FULL_MESSAGE):
+            self._register(self.free, self.users[-1])
+
+        self._assert_counters(self.free)
+        self.assertEqual(self.free.total_participants, self.CAPACITY)
+        self.assertFalse(self.free.participants.filter(user=self.users[-1]).exists())
+
+    def test_cancel_frees_place(self):
+        participants = [self._register(self.free, user)[0] for user in self.users[:self.CAPACITY]]
+
+        participants[0].status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            participants[0].save()
+
+        participant, _ = self._register(self.free, self.users[-1])
+        self.assertEqual(participant.status, 'confirmed')
+        self._assert_counters(self.free)
+        self.assertEqual(self.free.total_participants, self.CAPACITY)
+
+    def test_unpaid_registration_frees_place(self):
+        registrations = [self._register(self.premium, user) for user in self.users[:self.CAPACITY]]
+
+        with self.assertRaisesMessage(ValidationError, FULL_MESSAGE):
+            self._register(self.premium, self.users[-1])
+
+        participant, payment = registrations[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.mark_as_failed('test')
+
+        # The user whose payment failed registers again in the same row
+        registered, new_payment = self._register(self.premium, self.users[0])
+        self.assertEqual(registered.pk, participant.pk)
+        self.assertEqual(registered.status, 'pending')
+        self.assertNotEqual(new_payment.pk, payment.pk)
+
+        with self.assertRaisesMessage(ValidationError, FULL_MESSAGE):
+            self._register(self.premium, self.users[-1])
+
+        self._assert_counters(self.premium)
+        self.assertEqual(self.premium.reserved_slots, self.CAPACITY)
+        self.assertEqual(self.premium.total_participants, 0)
+
+
+@TEST_SETTINGS
+class RegistrationDatabaseTests(RegistrationTestsMixin, TestCase):
+    """Without Redis the conditional UPDATE alone enforces the capacity"""
+
+    def setUp(self):
+        for redis_down in (
+            patch.object(RegistrationSlots, 'redis', new_callable=PropertyMock, side_effect=RedisError('down')),
+            patch('apps.notifications.live.get_redis_connection', side_effect=RedisError('down')),
+        ):
+            redis_down.start()
+            self.addCleanup(redis_down.stop)
+        super().setUp()
+
+
+@skipUnless(_redis_available(), 'Redis is not available')
+@override_settings(ALLOWED_HOSTS=['*'], SECURE_SSL_REDIRECT=False)
+class RegistrationSlotsTests(RegistrationTestsMixin, TestCase):
+    """The Redis gate rejects registrations beyond the capacity"""
+
+    def setUp(self):
+        super().setUp()
+        for tournament in (self.free, self.premium):
+            slots = RegistrationSlots(tournament.id)
+            slots.redis.delete(slots.key)
+
+    def test_full_rejected_before_database(self):
+        for user in self.users[:self.CAPACITY]:
+            self._register(self.free, user)
+
+        tournament = Tournament.objects.get(pk=self.free.pk)
+        with self.assertNumQueries(0), self.assertRaisesMessage(ValidationError, FULL_MESSAGE):
+            register_participant(tournament, self.users[-1])
+
+        self.assertTrue(RegistrationSlots(self.free.id).is_full(self.CAPACITY))
+
+
+class PlayerBattleLogIngestTests(TournamentTestMixin, TestCase):
+    """ingest_battles stores new battles once and returns only their ids"""
+
+    def setUp(self):
+        self.tournament = self._create_tournament(0, participants=1)
+        self.participant = self.tournament.participants.get()
+        self.now = timezone.now().replace(microsecond=0)
+
+    def _battle(self, minutes_ago, opponent_tag='#OPPONENT'):
+        return PlayerBattleLog(
+            tournament=self.tournament,
+            participant=self.participant,
+            battle_time=self.now - timedelta(minutes=minutes_ago),
+            player_tag='#PLAYER',
+            player_name='player',
+            opponent_tag=opponent_tag,
+            opponent_name='opponent',
+        )
+
+    def test_duplicates_skipped(self):
+        first_ids = PlayerBattleLog.ingest_battles([self._battle(1), self._battle(2)])
+        self.assertEqual(len(first_ids), 2)
+
+        # Two stored battles again, a new one and a duplicate inside the batch
+        ids = PlayerBattleLog.ingest_battles([
+            self._battle(1), self._battle(3), self._battle(2), self._battle(3),
+        ])
+
+        new_battle = PlayerBattleLog.objects.get(battle_time=self.now - timedelta(minutes=3))
+        self.assertEqual(ids, [new_battle.id])
+        self.assertEqual(PlayerBattleLog.objects.count(), 3)
+        self.assertEqual(PlayerBattleLog.ingest_battles([self._battle(3)]), [])
+
+    def test_same_time_different_opponent(self):
+        ids = PlayerBattleLog.ingest_battles([self._battle(1), self._battle(1, opponent_tag='#OTHER')])
+
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(set(ids), set(PlayerBattleLog.objects.values_list('id', flat=True)))
+
+    def test_empty(self):
+        self.assertEqual(PlayerBattleLog.ingest_battles([]), [])
+
+
+class TournamentAdminSaveTests(TournamentTestMixin, TestCase):
+    """Admin edits don't write back the participant counters of the form"""
+
+    def test_counters_kept(self):
+        tournament = self._create_tournament(0)
+        edited = Tournament.objects.get(pk=tournament.pk)
+
+        # A registration lands while the admin form is open
+        user = User.objects.create(username='late_player', phone_number='09200000000')
+        TournamentParticipant.objects.create(tournament=tournament, user=user, status='confirmed')
+
+        edited.title = 'Renamed'
+        form = Mock(changed_data=['title'])
+        admin.site._registry[Tournament].save_model(Mock(user=user), edited, form, change=True)
+
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.title, 'Renamed')
+        self.assertEqual(tournament.total_participants, 4)
+        self.assertEqual(tournament.reserved_slots, 4)
@@ -12,12 +12,13 @@ from .views import (
 app_name = 'tournaments'
 
 router = DefaultRouter()
-router.register(r'', TournamentViewSet, basename='tournament')
 router.register(r'participants', TournamentParticipantViewSet, basename='participant')
 router.register(r'invitations', TournamentInvitationViewSet, basename='invitation')
 router.register(r'battle-logs', PlayerBattleLogViewSet, basename='battle-log')
 router.register(r'rankings', TournamentRankingViewSet, basename='ranking')
 router.register(r'chat', TournamentChatViewSet, basename='chat')
+# Last, so its {slug}/ routes don't shadow the prefixes above
+router.register(r'', TournamentViewSet, basename='tournament')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,12 +1,22 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from django.db.models import Q, Count, Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
+from django.utils.cache import add_never_cache_headers
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import transaction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
 
 from .models import (
     Tournament, TournamentParticipant, TournamentInvitation,
@@ -21,7 +31,86 @@ from .serializers import (
     TournamentBattleStatsSerializer, TournamentChatSerializer
 )
 from .filters import TournamentFilter, ParticipantFilter
-from .pagination import TournamentPagination, ParticipantPagination
+from .pagination import TournamentPagination, ParticipantListPagination, BattleLogPagination, ChatPagination
+from .services import (
+    get_battle_sync_lock,
+    LiveLeaderboard,
+    refresh_live_leaderboard,
+    get_ranking_history,
+    get_ranking_version,
+    leaderboard_payload_key,
+    create_pending_participant,
+    register_participant,
+    RegistrationQueue,
+)
+
+
+# Raised by the Redis cache (ConnectionInterrupted) and raw Redis clients
+REDIS_ERRORS = (RedisError, ConnectionInterrupted)
+
+
+def _get_tournament_id(tournament_slug):
+    """Resolve a tournament slug to its ID (cached, from the database if Redis is down)"""
+    cache_key = f"tournament_id_{tournament_slug}"
+    tournament = Tournament.objects.only('id')
+
+    try:
+        tournament_id = cache.get(cache_key)
+    except REDIS_ERRORS:
+        return get_object_or_404(tournament, slug=tournament_slug).id
+
+    if tournament_id is None:
+        tournament_id = get_object_or_404(tournament, slug=tournament_slug).id
+        cache.set(cache_key, tournament_id, timeout=60 * 60)
+
+    return tournament_id
+
+
+def _versioned_json_response(request, tournament_id, variant, build):
+    """
+    Serve a leaderboard payload rendered once per ranking version
+
+    The ETag is the tournament's ranking version, so polling clients get a
+    bodiless 304 until the rankings change, and everyone else gets the
+    JSON bytes cached for this version and variant (page, params...).
+
+    Args:
+        request: Current request
+        tournament_id: Tournament ID
+        variant: Identifies the response among those of the same version
+        build: Callable returning (data, extra headers) on a cache miss
+    """
+    version = get_ranking_version(tournament_id)
+    etag = f'"{tournament_id}-{version}"'
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+    else:
+        response = _cached_payload(tournament_id, version, variant, build)
+
+    response['ETag'] = etag
+    # Clients may keep the payload but must revalidate it; max-age=0 also
+    # keeps the site-wide page cache from serving a stale version
+    response['Cache-Control'] = 'max-age=0, no-cache'
+    return response
+
+
+def _cached_payload(tournament_id, version, variant, build):
+    """Rendered payload of one ranking version, from cache or built"""
+    cache_key = leaderboard_payload_key(tournament_id, version, variant)
+    payload = cache.get(cache_key)
+
+    if payload is None:
+        data, headers = build()
+        payload = (JSONRenderer().render(data), headers)
+        cache.set(cache_key, payload, timeout=settings.LEADERBOARD_PAYLOAD_CACHE_SECONDS)
+
+    body, headers = payload
+    response = HttpResponse(body, content_type='application/json')
+    for name, value in headers.items():
+        response[name] = value
+    return response
 
 
 class TournamentViewSet(viewsets.ReadOnlyModelViewSet):
@@ -43,6 +132,8 @@ class TournamentViewSet(viewsets.ReadOnlyModelViewSet):
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'stats', 'leaderboard', 'participants']:
             return [AllowAny()]
+        if self.action == 'sync_status':
+            return [IsAdminUser()]
         return [IsAuthenticated()]
     
     def get_queryset(self):
@@ -72,7 +163,12 @@ class TournamentViewSet(viewsets.ReadOnlyModelViewSet):
                 registration_start__lte=now,
                 registration_end__gte=now
             )
-        
+
+        # Serializers read the confirmed count up to three times per tournament;
+        # actions that change participants keep counting live
+        if self.action in ['list', 'retrieve', 'featured']:
+            queryset = Tournament.with_confirmed_count(queryset)
+
         return queryset
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
@@ -80,73 +176,107 @@ class TournamentViewSet(viewsets.ReadOnlyModelViewSet):
         """Register user for tournament"""
         tournament = self.get_object()
         
-        # Check if tournament allows registration
-        if not tournament.can_register:
-            return Response(
-                {'error': 'امکان ثبت‌نام در این تورنومنت وجود ندارد'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Check if already registered
-        existing = TournamentParticipant.objects.filter(
-            tournament=tournament,
-            user=request.user,
-            status__in=['pending', 'confirmed']
-        ).first()
-        
-        if existing:
-            return Response(
-                {'error': 'شما قبلاً در این تورنومنت ثبت‌نام کرده‌اید'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        try:
-            with transaction.atomic():
-                # Create participant
-                participant = TournamentParticipant.objects.create(
-                    tournament=tournament,
-                    user=request.user,
-                    status='pending'
-                )
-                
-                # Handle free tournaments
-                if tournament.pricable == 'free':
-                    participant.confirm_registration()
-                    return Response(
-                        {
-                            'message': 'ثبت‌نام شما با موفقیت انجام شد',
-                            'participant_id': participant.id
-                        },
-                        status=status.HTTP_201_CREATED
-                    )
-                
-                # Create payment for premium tournaments
-                from apps.payments.models import Payment
-                payment = Payment.objects.create(
-                    user=request.user,
-                    amount=tournament.entry_fee,
-                    payment_type='tournament_entry',
-                    description=f'هزینه ثبت‌نام در تورنومنت {tournament.title}',
-                    status='pending'
+        if tournament.queued_registration:
+            from .tasks import queue_registration
+            
+            try:
+                ticket = queue_registration(tournament, request.user)
+            except DjangoValidationError as e:
+                return Response(
+                    {'error': e.messages[0]},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-                participant.payment = payment
-                participant.save()
-                
+            except RedisError:
+                # Without the queue, register directly
+                ticket = None
+            
+            if ticket is not None:
                 return Response(
                     {
-                        'message': 'لطفاً هزینه ثبت‌نام را پرداخت کنید',
-                        'participant_id': participant.id,
-                        'payment_id': payment.id,
-                        'amount': str(tournament.entry_fee),
-                        'payment_url': f'/payments/{payment.id}/pay/'
+                        'message': 'درخواست ثبت‌نام شما در صف قرار گرفت',
+                        'ticket': ticket,
+                        'status_url': f'/api/tournaments/{tournament.slug}/registration-status/{ticket}/'
                     },
-                    status=status.HTTP_201_CREATED
+                    status=status.HTTP_202_ACCEPTED
                 )
+        
+        try:
+            participant, payment = register_participant(tournament, request.user)
+        except DjangoValidationError as e:
+            return Response(
+                {'error': e.messages[0]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        # Free tournaments are confirmed at once
+        if payment is None:
+            return Response(
+                {
+                    'message': 'ثبت‌نام شما با موفقیت انجام شد',
+                    'participant_id': participant.id
+                },
+                status=status.HTTP_201_CREATED
+            )
+        
+        return Response(
+            {
+                'message': 'لطفاً هزینه ثبت‌نام را پرداخت کنید',
+                'participant_id': participant.id,
+                'payment_id': payment.id,
+                'amount': str(tournament.entry_fee),
+                'payment_url': f'/payments/{payment.id}/pay/'
+            },
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(
+        detail=True,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        url_path=r'registration-status/(?P<ticket>[0-9a-f]{32})'
+    )
+    def registration_status(self, request, slug=None, ticket=None):
+        """Get the status of a queued registration request"""
+        tournament = self.get_object()
+        
+        try:
+            data = RegistrationQueue(tournament.id).get_ticket(ticket)
+        except RedisError:
+            return Response(
+                {'error': 'وضعیت ثبت‌نام در حال حاضر در دسترس نیست'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        if data is None or data['user_id'] != request.user.id:
+            return Response(
+                {'error': 'درخواست ثبت‌نام یافت نشد'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        response = {'ticket': ticket, 'status': data['status']}
+        
+        if data['status'] == RegistrationQueue.QUEUED:
+            response['ahead'] = data['ahead']
+        elif data['status'] == RegistrationQueue.ADMITTED:
+            response['participant_id'] = int(data['participant_id'])
+            if data.get('payment_id'):
+                response.update({
+                    'payment_id': int(data['payment_id']),
+                    'amount': str(tournament.entry_fee),
+                    'payment_url': f"/payments/{data['payment_id']}/pay/"
+                })
+        else:
+            response['error'] = data.get('error')
+        
+        # Per-user data must stay out of the site-wide page cache
+        response = Response(response)
+        add_never_cache_headers(response)
+        return response
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def cancel_registration(self, request, slug=None):
@@ -203,14 +333,25 @@ class TournamentViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['get'])
     def leaderboard(self, request, slug=None):
-        """Get tournament leaderboard"""
-        tournament = self.get_object()
-        participants = tournament.participants.filter(
-            status='confirmed'
-        ).select_related('user').order_by('placement', '-matches_won', '-matches_played')
-        
-        serializer = TournamentLeaderboardSerializer(participants, many=True)
-        return Response(serializer.data)
+        """Get tournament leaderboard (cached per ranking version)"""
+        tournament_id = _get_tournament_id(slug)
+
+        def build():
+            participants = TournamentParticipant.objects.filter(
+                tournament_id=tournament_id,
+                status='confirmed'
+            ).select_related('user').order_by('placement', '-matches_won', '-matches_played')
+
+            serializer = TournamentLeaderboardSerializer(participants, many=True)
+            return serializer.data, {}
+
+        try:
+            return _versioned_json_response(request, tournament_id, 'participants', build)
+
+        except REDIS_ERRORS:
+            # Redis unavailable: serve straight from the database
+            data, _ = build()
+            return Response(data)
     
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def my_participation(self, request, slug=None):
@@ -280,6 +421,29 @@ class TournamentViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = TournamentParticipantSerializer(participations, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'], permission_classes=[IsAdminUser], url_path='sync-status')
+    def sync_status(self, request, slug=None):
+        """Get battle sync health (staff only)"""
+        tournament = self.get_object()
+
+        # The deduplicated sync runs all tournaments under one lock
+        if settings.CLASH_ROYALE_SYNC_DEDUPLICATE_PLAYERS:
+            lock = get_battle_sync_lock()
+        else:
+            lock = get_battle_sync_lock(tournament.id)
+
+        last_sync = tournament.last_battle_sync_time
+
+        return Response({
+            'auto_tracking_enabled': tournament.auto_tracking_enabled,
+            'last_battle_sync_time': last_sync,
+            'seconds_since_last_sync': (
+                int((timezone.now() - last_sync).total_seconds()) if last_sync else None
+            ),
+            'lock': lock.name,
+            **lock.stats(),
+        })
+
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured tournaments"""
@@ -297,7 +461,7 @@ class TournamentParticipantViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = ParticipantFilter
     ordering_fields = ['joined_at', 'placement', 'matches_played', 'matches_won']
     ordering = ['-joined_at']
-    pagination_class = ParticipantPagination
+    pagination_class = ParticipantListPagination
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -351,12 +515,12 @@ class TournamentInvitationViewSet(viewsets.ReadOnlyModelViewSet):
                         user=request.user,
                         status__in=['pending', 'confirmed']
                     ).exists():
-                        # Create participant
-                        TournamentParticipant.objects.create(
-                            tournament=tournament,
-                            user=request.user,
-                            status='pending'
-                        )
+                        # Create participant (if a place is still free)
+                        try:
+                            with transaction.atomic():
+                                create_pending_participant(tournament, request.user)
+                        except DjangoValidationError:
+                            pass
                 
                 return Response(
                     {'message': 'دعوتنامه با موفقیت پذیرفته شد'},
@@ -400,6 +564,7 @@ class PlayerBattleLogViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     ordering_fields = ['battle_time', 'player_crowns', 'opponent_crowns']
     ordering = ['-battle_time']
+    pagination_class = BattleLogPagination
 
     def get_queryset(self):
         """Filter battle logs based on user permissions"""
@@ -478,15 +643,177 @@ class TournamentRankingViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='tournament/(?P<tournament_slug>[^/.]+)')
     def tournament_leaderboard(self, request, tournament_slug=None):
-        """Get leaderboard for a specific tournament"""
-        tournament = get_object_or_404(Tournament, slug=tournament_slug)
+        """
+        Get leaderboard for a specific tournament
 
-        rankings = TournamentRanking.objects.filter(
-            tournament=tournament
-        ).select_related('participant__user').order_by('rank')
+        Served from the live Redis leaderboard. Query params:
+            limit, offset: page of the leaderboard (default: everything)
+            around_rank, radius: rows around a given rank
+        """
+        try:
+            offset = self._int_param('offset', 0, minimum=0)
+            limit = self._int_param('limit', None, minimum=1, maximum=500)
+            around_rank = self._int_param('around_rank', None, minimum=1)
+            radius = self._int_param('radius', 10, minimum=0, maximum=100)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = self.get_serializer(rankings, many=True)
-        return Response(serializer.data)
+        tournament_id = _get_tournament_id(tournament_slug)
+        leaderboard = LiveLeaderboard(tournament_id)
+
+        def build():
+            if not leaderboard.exists():
+                refresh_live_leaderboard(tournament_id)
+
+            if around_rank is not None:
+                rows = leaderboard.around(around_rank, radius)
+            else:
+                rows = leaderboard.page(offset, limit)
+
+            return rows, {'X-Total-Count': leaderboard.count()}
+
+        if around_rank is not None:
+            variant = f"around_{around_rank}_{radius}"
+        else:
+            variant = f"page_{offset}_{limit}"
+
+        try:
+            return _versioned_json_response(request, tournament_id, variant, build)
+
+        except REDIS_ERRORS:
+            # Redis unavailable: serve straight from the database
+            rankings = TournamentRanking.objects.filter(
+                tournament_id=tournament_id
+            ).select_related('participant__user').order_by('rank')
+
+            if around_rank is not None:
+                offset = max(around_rank - 1 - radius, 0)
+                limit = around_rank + radius - offset
+            rankings = rankings[offset:offset + limit] if limit else rankings[offset:]
+
+            serializer = self.get_serializer(rankings, many=True)
+            return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='tournament/(?P<tournament_slug>[^/.]+)/me')
+    def tournament_my_rank(self, request, tournament_slug=None):
+        """Get current user's row in a tournament leaderboard"""
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'احراز هویت لازم است'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        tournament_id = _get_tournament_id(tournament_slug)
+        leaderboard = LiveLeaderboard(tournament_id)
+
+        try:
+            if not leaderboard.exists():
+                refresh_live_leaderboard(tournament_id)
+            row = leaderboard.get_user_row(request.user.id)
+
+        except REDIS_ERRORS:
+            ranking = TournamentRanking.objects.filter(
+                tournament_id=tournament_id,
+                participant__user=request.user
+            ).select_related('participant__user').first()
+            row = self.get_serializer(ranking).data if ranking else None
+
+        if row is None:
+            return Response(
+                {'error': 'شما در رتبه‌بندی این تورنومنت حضور ندارید'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Per-user data must stay out of the site-wide page cache
+        response = Response(row)
+        add_never_cache_headers(response)
+        return response
+
+    @action(detail=False, methods=['get'], url_path='tournament/(?P<tournament_slug>[^/.]+)/history')
+    def tournament_history(self, request, tournament_slug=None):
+        """
+        Get rank and score over time in a tournament
+
+        Query params:
+            participant: Comma separated participant IDs (default: current top players)
+            top: Number of top players when no participant is given (default 10)
+            since, until: ISO 8601 datetimes bounding the period
+        """
+        tournament_id = _get_tournament_id(tournament_slug)
+
+        try:
+            top = self._int_param('top', 10, minimum=1, maximum=50)
+            period = {name: self._datetime_param(name) for name in ('since', 'until')}
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        participant_param = request.query_params.get('participant')
+        if participant_param:
+            try:
+                participant_ids = [int(value) for value in participant_param.split(',') if value.strip()][:50]
+            except ValueError:
+                return Response(
+                    {'error': 'پارامتر participant باید لیست شناسه‌های عددی باشد'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            participant_ids = list(
+                TournamentRanking.objects.filter(
+                    tournament_id=tournament_id
+                ).order_by('rank').values_list('participant_id', flat=True)[:top]
+            )
+
+        history = get_ranking_history(tournament_id, participant_ids, **period)
+
+        usernames = dict(
+            TournamentParticipant.objects.filter(
+                id__in=participant_ids,
+                tournament_id=tournament_id
+            ).values_list('id', 'user__username')
+        )
+
+        return Response({
+            'series': [
+                {
+                    'participant_id': participant_id,
+                    'username': usernames[participant_id],
+                    'points': history['series'][participant_id],
+                }
+                for participant_id in participant_ids
+                if participant_id in usernames
+            ],
+            'leader_changes': history['leader_changes'],
+        })
+
+    def _int_param(self, name, default, minimum=None, maximum=None):
+        """Read an integer query parameter within bounds"""
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return default
+
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValueError(f'پارامتر {name} باید عدد صحیح باشد')
+
+        if minimum is not None and value < minimum:
+            raise ValueError(f'پارامتر {name} نباید کمتر از {minimum} باشد')
+        if maximum is not None and value > maximum:
+            value = maximum
+        return value
+
+    def _datetime_param(self, name):
+        """Read an ISO 8601 datetime query parameter"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f'پارامتر {name} باید تاریخ معتبر باشد')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
 
     @action(detail=False, methods=['get'], url_path='my-ranking')
     def my_ranking(self, request):
@@ -517,6 +844,7 @@ class TournamentChatViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     ordering = ['created_at']
+    pagination_class = ChatPagination
 
     def get_queryset(self):
         """Get chat messages for tournaments user is participating in"""
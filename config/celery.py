@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from django.conf import settings
 
 # Set default Django settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -70,10 +71,30 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=8, minute=0),
     },
 
-    # Sync Clash Royale battle logs every 2 minutes for active tournaments
+    # Sync Clash Royale battle logs for active tournaments every
+    # CLASH_ROYALE_POLL_CYCLE_SECONDS (30 seconds with adaptive polling, which
+    # only fetches players due for a poll, 2 minutes without it)
     'sync-tournament-battle-logs': {
         'task': 'apps.tournaments.tasks.sync_tournament_battle_logs',
-        'schedule': crontab(minute='*/2'),
+        'schedule': float(settings.CLASH_ROYALE_POLL_CYCLE_SECONDS),
+    },
+
+    # Full ranking recompute as a consistency check for incremental updates
+    'recalculate-tournament-rankings': {
+        'task': 'apps.tournaments.tasks.recalculate_active_tournament_rankings',
+        'schedule': crontab(minute='*/15'),
+    },
+
+    # Delete ranking snapshots past their retention daily at 4:30 AM
+    'prune-tournament-ranking-snapshots': {
+        'task': 'apps.tournaments.tasks.prune_tournament_ranking_snapshots',
+        'schedule': crontab(hour=4, minute=30),
+    },
+
+    # Correct drifted tournament participant counters every hour
+    'reconcile-tournament-participant-counts': {
+        'task': 'apps.tournaments.tasks.reconcile_tournament_participant_counts',
+        'schedule': crontab(minute=15),
     },
 }
 
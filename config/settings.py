@@ -472,7 +472,86 @@ RATELIMIT_USE_CACHE = "default"
 
 # Clash Royale API (if you want to integrate)
 CLASH_ROYALE_API_KEY = env("CLASH_ROYALE_API_KEY", default="")
+# Optional pool of keys; requests are spread across them (falls back to CLASH_ROYALE_API_KEY)
+CLASH_ROYALE_API_KEYS = env.list("CLASH_ROYALE_API_KEYS", default=[])
 CLASH_ROYALE_API_URL = "https://api.clashroyale.com/v1"
+CLASH_ROYALE_REQUEST_TIMEOUT = env.int("CLASH_ROYALE_REQUEST_TIMEOUT", default=10)
+
+# Token bucket shared by all workers through Redis (per API key)
+CLASH_ROYALE_RATE_LIMIT_PER_SECOND = env.float("CLASH_ROYALE_RATE_LIMIT_PER_SECOND", default=10)
+CLASH_ROYALE_RATE_LIMIT_BURST = env.int("CLASH_ROYALE_RATE_LIMIT_BURST", default=10)
+CLASH_ROYALE_RATE_LIMIT_TIMEOUT = env.int("CLASH_ROYALE_RATE_LIMIT_TIMEOUT", default=30)  # max seconds to wait for a token
+CLASH_ROYALE_RATE_LIMIT_RETRIES = env.int("CLASH_ROYALE_RATE_LIMIT_RETRIES", default=3)  # retries after HTTP 403/429
+CLASH_ROYALE_API_KEY_QUARANTINE_SECONDS = env.int("CLASH_ROYALE_API_KEY_QUARANTINE_SECONDS", default=300)  # after HTTP 403
+
+# Maximum number of battle logs fetched in parallel during a sync
+CLASH_ROYALE_SYNC_CONCURRENCY = env.int("CLASH_ROYALE_SYNC_CONCURRENCY", default=16)
+
+# Adaptive polling: players who battled within the active window are polled
+# every cycle, idle ones back off exponentially up to the max interval
+CLASH_ROYALE_ADAPTIVE_POLLING = env.bool("CLASH_ROYALE_ADAPTIVE_POLLING", default=True)
+CLASH_ROYALE_POLL_MIN_INTERVAL = env.int("CLASH_ROYALE_POLL_MIN_INTERVAL", default=30)  # seconds
+CLASH_ROYALE_POLL_MAX_INTERVAL = env.int("CLASH_ROYALE_POLL_MAX_INTERVAL", default=600)  # seconds
+CLASH_ROYALE_POLL_ACTIVE_WINDOW = env.int("CLASH_ROYALE_POLL_ACTIVE_WINDOW", default=600)  # seconds since last battle
+# Interval of the sync-tournament-battle-logs beat task. Without adaptive
+# polling every player is fetched on every run, so keep a 2 minute cadence
+CLASH_ROYALE_POLL_CYCLE_SECONDS = 30 if CLASH_ROYALE_ADAPTIVE_POLLING else 120
+CLASH_ROYALE_POLL_BUDGET_PER_CYCLE = env.int("CLASH_ROYALE_POLL_BUDGET_PER_CYCLE", default=300)  # API calls
+
+# Only fetch players whose score/rank moved in the in-game tournament's
+# member list; unchanged members are re-fetched after the refresh interval
+CLASH_ROYALE_SYNC_USE_MEMBERSHIP = env.bool("CLASH_ROYALE_SYNC_USE_MEMBERSHIP", default=True)
+CLASH_ROYALE_TOURNAMENT_CACHE_SECONDS = env.int("CLASH_ROYALE_TOURNAMENT_CACHE_SECONDS", default=15)
+CLASH_ROYALE_MEMBERSHIP_REFRESH_SECONDS = env.int("CLASH_ROYALE_MEMBERSHIP_REFRESH_SECONDS", default=300)
+
+# Lease lock per tournament sync; runs hitting a held lock queue (at most)
+# one rerun after it instead of syncing in parallel
+CLASH_ROYALE_SYNC_LOCK_TTL = env.int("CLASH_ROYALE_SYNC_LOCK_TTL", default=300)  # seconds
+CLASH_ROYALE_SYNC_LOCK_COALESCE = env.bool("CLASH_ROYALE_SYNC_LOCK_COALESCE", default=True)
+
+# Tournaments with more tracked participants than this are synced in
+# parallel chunks (Celery chord) across workers; 0 disables chunking
+CLASH_ROYALE_SYNC_CHUNK_SIZE = env.int("CLASH_ROYALE_SYNC_CHUNK_SIZE", default=100)
+
+# Fetch each player once per sync cycle and share the log between all of
+# their active tournaments (instead of one independent sync per tournament)
+CLASH_ROYALE_SYNC_DEDUPLICATE_PLAYERS = env.bool("CLASH_ROYALE_SYNC_DEDUPLICATE_PLAYERS", default=False)
+
+# Apply new battles to rankings incrementally after each sync; a full
+# recompute still runs every 15 minutes as a consistency check
+TOURNAMENT_RANKING_INCREMENTAL = env.bool("TOURNAMENT_RANKING_INCREMENTAL", default=True)
+
+# Ranking update requests for a tournament inside this window collapse into
+# one run; requests during a run leave exactly one follow-up run
+TOURNAMENT_RANKING_COALESCE_SECONDS = env.int("TOURNAMENT_RANKING_COALESCE_SECONDS", default=5)
+TOURNAMENT_RANKING_LOCK_TTL = env.int("TOURNAMENT_RANKING_LOCK_TTL", default=300)  # seconds
+
+# Ranking history: at most one snapshot per interval, a full keyframe every
+# N snapshots (deltas in between), snapshots kept for N days (0 = forever)
+TOURNAMENT_RANKING_SNAPSHOT_INTERVAL = env.int("TOURNAMENT_RANKING_SNAPSHOT_INTERVAL", default=60)  # seconds
+TOURNAMENT_RANKING_SNAPSHOT_KEYFRAME_EVERY = env.int("TOURNAMENT_RANKING_SNAPSHOT_KEYFRAME_EVERY", default=30)
+TOURNAMENT_RANKING_SNAPSHOT_RETENTION_DAYS = env.int("TOURNAMENT_RANKING_SNAPSHOT_RETENTION_DAYS", default=30)
+
+# Rendered leaderboard responses are cached per ranking version (bumped by
+# every ranking update) and served with an ETag of that version
+LEADERBOARD_PAYLOAD_CACHE_SECONDS = env.int("LEADERBOARD_PAYLOAD_CACHE_SECONDS", default=600)
+
+# Live events (Server-Sent Events, served by ASGI workers only): heartbeat
+# comments keep proxies from closing idle streams, streams end after the max
+# duration so clients reconnect (after the retry delay) and rebalance
+LIVE_EVENTS_HEARTBEAT_SECONDS = env.int("LIVE_EVENTS_HEARTBEAT_SECONDS", default=15)
+LIVE_EVENTS_MAX_STREAM_SECONDS = env.int("LIVE_EVENTS_MAX_STREAM_SECONDS", default=1800)
+LIVE_EVENTS_RETRY_MS = env.int("LIVE_EVENTS_RETRY_MS", default=3000)
+
+# Queued registration (tournaments with queued_registration): a worker admits
+# BATCH_SIZE queued requests every INTERVAL, tickets are kept for TTL seconds
+REGISTRATION_QUEUE_BATCH_SIZE = env.int("REGISTRATION_QUEUE_BATCH_SIZE", default=20)
+REGISTRATION_QUEUE_INTERVAL_SECONDS = env.int("REGISTRATION_QUEUE_INTERVAL_SECONDS", default=1)
+REGISTRATION_TICKET_TTL = env.int("REGISTRATION_TICKET_TTL", default=3600)
+
+# High-volume lists (participants, battle logs, chat, notifications, payments)
+# accept ?cursor= for keyset pagination; True makes it the default there
+API_CURSOR_PAGINATION_DEFAULT = env.bool("API_CURSOR_PAGINATION_DEFAULT", default=False)
 
 # Sentry (Error Tracking) - Optional
 SENTRY_DSN = env("SENTRY_DSN", default="")